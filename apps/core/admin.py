@@ -2,9 +2,10 @@
 DJANGO ADMIN PANEL
 Registruoja modelius admin panelėje su custom displays
 """
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import UserProfile, Report, Transaction, ReportPackage, APILog
+from .models import UserProfile, Report, Transaction, ReportPackage, APILog, BalanceHold, BalanceLedger, RequestProfile
+from .cheapcarfax import get_limits_snapshot
 
 
 @admin.register(UserProfile)
@@ -41,6 +42,67 @@ class UserProfileAdmin(admin.ModelAdmin):
         )
     balance_display.short_description = 'Balance'
 
+    def save_model(self, request, obj, form, change):
+        """
+        Balanso pakeitimas admin'e - per ledger ('adjustment') skirtumu,
+        kiti laukai įrašomi be balance (neperrašomi lygiagretūs pirkimai)
+        """
+        if not change:
+            return super().save_model(request, obj, form, change)
+
+        fields = [name for name in form.changed_data if name != 'balance']
+        if fields:
+            obj.save(update_fields=fields + ['updated_at'])
+
+        if 'balance' in form.changed_data:
+            difference = obj.balance - form.initial['balance']
+            reference = f'admin:{request.user.username}'
+            if difference > 0:
+                obj.add_balance(difference, kind='adjustment', reference=reference)
+            elif not obj.deduct_balance(-difference, kind='adjustment', reference=reference):
+                self.message_user(request, 'Balance was not reduced: insufficient funds.', level=messages.WARNING)
+
+
+@admin.register(BalanceLedger)
+class BalanceLedgerAdmin(admin.ModelAdmin):
+    """
+    BalanceLedger admin (tik skaitymas - append-only)
+    Rodo: user, amount, balance_after, kind, reference
+    """
+    list_display = ('id', 'user', 'amount', 'balance_after', 'kind', 'reference', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('user__username', 'reference')
+    list_select_related = ('user',)
+    show_full_result_count = False  # Didelė lentelė - be COUNT(*)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BalanceHold)
+class BalanceHoldAdmin(admin.ModelAdmin):
+    """
+    BalanceHold admin (tik skaitymas)
+    Rodo: user, amount, captured, status, expires_at
+    """
+    list_display = ('id', 'user', 'amount', 'captured_amount', 'status', 'reference', 'expires_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('user__username', 'reference')
+    list_select_related = ('user',)
+    readonly_fields = ('user', 'amount', 'captured_amount', 'status', 'reference', 'expires_at', 'created_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
@@ -51,7 +113,7 @@ class ReportAdmin(admin.ModelAdmin):
     list_display = ('vin', 'user', 'report_type', 'score_display', 'accidents', 'owners', 'price_paid', 'created_at')
     list_filter = ('report_type', 'created_at')
     search_fields = ('vin', 'user__username', 'user__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'html_available')
     date_hierarchy = 'created_at'
 
     fieldsets = (
@@ -59,7 +121,7 @@ class ReportAdmin(admin.ModelAdmin):
             'fields': ('user', 'vin', 'report_type')
         }),
         ('Report Data', {
-            'fields': ('score', 'accidents', 'owners', 'report_data')
+            'fields': ('score', 'accidents', 'owners', 'html_available', 'report_data')
         }),
         ('Financial', {
             'fields': ('price_paid',)
@@ -70,6 +132,12 @@ class ReportAdmin(admin.ModelAdmin):
         }),
     )
 
+    def changelist_view(self, request, extra_context=None):
+        """Rodyti CheapCarfax limits snapshot (iš cache, be API užklausos)"""
+        extra_context = extra_context or {}
+        extra_context['upstream_limits'] = get_limits_snapshot()
+        return super().changelist_view(request, extra_context=extra_context)
+
     def score_display(self, obj):
         """Rodyti score su spalva pagal reikšmę"""
         if obj.score is None:
@@ -158,8 +226,8 @@ class APILogAdmin(admin.ModelAdmin):
     """
     APILog admin konfigūracija
     """
-    list_display = ('provider', 'vin', 'user', 'success_display', 'status_code', 'created_at')
-    list_filter = ('provider', 'success', 'created_at')
+    list_display = ('provider', 'endpoint', 'vin', 'user', 'success_display', 'status_code', 'latency_ms', 'created_at')
+    list_filter = ('provider', 'endpoint', 'success', 'created_at')
     search_fields = ('vin', 'user__username', 'error_message')
     readonly_fields = ('created_at',)
     date_hierarchy = 'created_at'
@@ -172,6 +240,40 @@ class APILogAdmin(admin.ModelAdmin):
     success_display.short_description = 'Status'
 
 
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    RequestProfile admin (tik skaitymas)
+    Rūšiuojama pagal wall / SQL / upstream laiką - lėčiausi view'ai viršuje
+    """
+    list_display = (
+        'view_name', 'method', 'status_code', 'wall_ms', 'cpu_ms', 'sql_count', 'sql_ms',
+        'upstream_ms', 'sampled_by', 'user', 'created_at',
+    )
+    list_filter = ('sampled_by', 'method', 'view_name')
+    search_fields = ('path', 'view_name', 'user__username')
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    readonly_fields = (
+        'user', 'method', 'path', 'view_name', 'status_code', 'sampled_by', 'wall_ms', 'cpu_ms',
+        'sql_count', 'sql_ms', 'upstream_count', 'upstream_ms', 'profile_display', 'created_at',
+    )
+    exclude = ('profile',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def profile_display(self, obj):
+        """cProfile ataskaita kaip preformatuotas tekstas"""
+        if not obj.profile:
+            return '-'
+        return format_html('<pre style="font-size: 11px; white-space: pre;">{}</pre>', obj.profile)
+    profile_display.short_description = 'cProfile'
+
+
 # Admin site customization
 admin.site.site_header = "AutoInfo Administration"
 admin.site.site_title = "AutoInfo Admin"
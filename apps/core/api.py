@@ -9,33 +9,161 @@
 """
 
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.utils import timezone
 import logging
-from .cheapcarfax import CheapCarfaxAPI
+from .cheapcarfax import CheapCarfaxAPI, note_report_consumed
+from .cheapcarfax_async import AsyncCheapCarfaxAPI
+from . import report_cache
+from . import singleflight
 
 logger = logging.getLogger(__name__)
 
+# Provideriai, kurių reportai dalinami tarp vartotojų per report_cache
+CACHEABLE_PROVIDERS = ('carfax', 'autocheck')
 
-def fetch_vehicle_report(vin, report_type):
+# Laukai, kurie NEsaugomi Report.report_data (HTML saugomas tik ReportContent)
+UNSTORED_FIELDS = ('html', 'raw_data', 'cached')
+
+
+class ReportFetchError(Exception):
+    """
+    Upstream reporto gauti nepavyko
+
+    Attributes:
+        status_code (int): CheapCarfax HTTP statusas, 0 - atsakymo negauta
+        retryable (bool): ar saugu kartoti (upstream užklausos tikrai neapmokėjo)
+    """
+
+    def __init__(self, message, status_code=0, retryable=False):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retryable = retryable
+
+    @classmethod
+    def from_result(cls, result):
+        """CheapCarfaxAPI nepavykęs rezultatas -> klaida"""
+        return cls(
+            result.get('error', 'Unknown error'),
+            status_code=result.get('status_code', 0),
+            retryable=result.get('retryable', False),
+        )
+
+
+def fetch_vehicle_report(vin, report_type, refresh=False):
     """
     Pagrindinis entry point - gauna ataskaitą pagal tipą
+    Carfax/Autocheck pirma ieškomi report_cache (Redis -> Report lentelė)
 
     Args:
         vin (str): 17 simbolių VIN numeris
         report_type (str): 'carfax', 'autocheck' arba 'nmvtis'
+        refresh (bool): praleisti report_cache (Redis ir DB) - visada upstream,
+            rezultatas perrašo cache
 
     Returns:
-        dict: Ataskaitos duomenys arba None
+        dict: Ataskaitos duomenys arba None (nežinomas report_type)
+
+    Raises:
+        ReportFetchError: upstream klaida (su statusu ir ar saugu kartoti)
     """
-    if report_type == 'carfax':
-        return fetch_carfax_report(vin)
-    elif report_type == 'autocheck':
-        return fetch_autocheck_report(vin)
-    elif report_type == 'nmvtis':
+    if report_type in CACHEABLE_PROVIDERS:
+        if not refresh:
+            cached = report_cache.get_report(vin, report_type)
+            if cached is not None:
+                return cached
+
+        # Tas pats VIN+provider vienu metu - tik vienas upstream fetch
+        # (refresh - atskiras flight'as, kad negautų cache'into rezultato)
+        key = f'{report_type}:{vin.upper()}'
+        wait_timeout = getattr(settings, 'REPORT_FETCH_LOCK_TIMEOUT', 45)
+        try:
+            report = singleflight.do(
+                f'{key}:refresh' if refresh else key,
+                lambda: _fetch_and_cache(vin, report_type, refresh),
+                wait_timeout,
+            )
+        except singleflight.InFlightTimeout as e:
+            raise _in_flight_error(e)
+        return dict(report) if report is not None else None
+
+    if report_type == 'nmvtis':
         return fetch_nmvtis_report(vin)
-    else:
-        logger.error(f"Unknown report type: {report_type}")
-        return None
+
+    logger.error(f"Unknown report type: {report_type}")
+    return None
+
+
+def _in_flight_error(error):
+    """
+    Kitas (apmokamas) to paties VIN fetch'as dar vyksta -> retryable klaida
+    Antras fetch nesiunčiamas; kartojant rezultatas bus report_cache.
+    """
+    logger.warning(f"Report fetch for {error.key} still in flight, not fetching again")
+    return ReportFetchError('Report is still being fetched', retryable=True)
+
+
+def _fetch_and_cache(vin, report_type, refresh=False):
+    """
+    Single-flight lyderio darbas: Redis lock -> dar kartą cache -> upstream -> cache
+    Kiti worker'iai laukia lock'o ir gauna rezultatą iš cache.
+    refresh=True - cache netikrinamas, upstream kviečiamas visada.
+    """
+    key = f'{report_type}:{vin.upper()}'
+    lock_timeout = getattr(settings, 'REPORT_FETCH_LOCK_TIMEOUT', 45)
+
+    with singleflight.distributed_lock(key, timeout=lock_timeout, blocking_timeout=lock_timeout):
+        cached = None if refresh else report_cache.get_report(vin, report_type, record_stats=False)
+        if cached is not None:
+            logger.info(f"Single-flight: {key} filled by another worker")
+            return cached
+
+        if report_type == 'carfax':
+            report = fetch_carfax_report(vin)
+        else:
+            report = fetch_autocheck_report(vin)
+
+        if report is not None:
+            report_cache.set_report(vin, report_type, report)
+        return report
+
+
+def _upstream_metadata(result, provider):
+    """Mažas upstream įrašas vietoj viso CheapCarfax atsakymo"""
+    return {
+        'id': result.get('id', ''),
+        'yearMakeModel': result.get('yearMakeModel', ''),
+        'provider': provider,
+        'fetched_at': timezone.now().isoformat(),
+    }
+
+
+def storable_report_data(report):
+    """
+    fetch_vehicle_report rezultatas -> Report.report_data
+
+    Išmeta HTML (jis saugomas tik ReportContent) ir seną raw_data,
+    palieka išparsintus faktus + upstream metadata.
+
+    Args:
+        report (dict): fetch_vehicle_report() arba sena report_data reikšmė
+
+    Returns:
+        dict
+    """
+    data = {key: value for key, value in report.items() if key not in UNSTORED_FIELDS}
+
+    # Seni įrašai: metadata iš raw_data
+    raw = report.get('raw_data')
+    if 'upstream' not in data and isinstance(raw, dict) and not report.get('demo'):
+        data['upstream'] = {
+            'id': raw.get('id', ''),
+            'yearMakeModel': raw.get('yearMakeModel', report.get('yearMakeModel', '')),
+            'provider': raw.get('provider', report.get('provider', '')),
+        }
+    return data
 
 
 def fetch_carfax_report(vin):
@@ -54,42 +182,16 @@ def fetch_carfax_report(vin):
         result = api.get_carfax_html(vin)  # ✅ FIXED: Naudojam get_carfax_html
 
         if result['success']:
-            # ✅ FIXED: Išsaugome HTML ir visus duomenis
-            return {
-                'vin': vin,
-                'provider': 'carfax',
-                'score': result['report_data'].get('score', 72),
-                'accidents': result['report_data'].get('accidents', 0),
-                'owners': result['report_data'].get('owners', 1),
-                'service_records': result.get('report_data', {}).get('service_records', 0),
-                'title_info': result.get('report_data', {}).get('title_info', 'Unknown'),
-                'yearMakeModel': result.get('yearMakeModel', ''),  # ✅ Vehicle info
-                'html': result.get('html', ''),  # ✅ SVARBIAUSIA - HTML reportas!
-                'raw_data': result,  # ✅ Visi duomenys
-                'demo': False
-            }
+            note_report_consumed('carfax')
+            return _carfax_report(vin, result)
         else:
             logger.error(f"CheapCarfax API error: {result.get('error')}")
-            return None
+            raise ReportFetchError.from_result(result)
 
     # DEMO MODE - test duomenys
     else:
         logger.info(f"Carfax DEMO mode for VIN: {vin}")
-        return {
-            'vin': vin,
-            'provider': 'carfax',
-            'score': 72,
-            'accidents': 0,
-            'owners': 2,
-            'service_records': 15,
-            'title_info': 'Clean',
-            'html': '<h1>Demo Report</h1><p>This is a demo report. Enable API to see real data.</p>',
-            'mileage_records': [
-                {'date': '2023-01-15', 'odometer': 45000, 'source': 'Service'},
-                {'date': '2022-06-20', 'odometer': 38000, 'source': 'Inspection'},
-            ],
-            'demo': True
-        }
+        return _carfax_demo_report(vin)
 
 
 def fetch_autocheck_report(vin):
@@ -103,37 +205,88 @@ def fetch_autocheck_report(vin):
         result = api.get_autocheck_html(vin)  # ✅ FIXED
 
         if result['success']:
-            # ✅ FIXED: Išsaugome HTML
-            return {
-                'vin': vin,
-                'provider': 'autocheck',
-                'score': result['report_data'].get('score', 80),
-                'accidents': result['report_data'].get('accidents', 0),
-                'owners': result['report_data'].get('owners', 1),
-                'title_info': result.get('report_data', {}).get('title_info', 'Unknown'),
-                'yearMakeModel': result.get('yearMakeModel', ''),
-                'html': result.get('html', ''),  # ✅ HTML reportas
-                'raw_data': result,
-                'demo': False
-            }
+            note_report_consumed('autocheck')
+            return _autocheck_report(vin, result)
         else:
             logger.error(f"Autocheck API error: {result.get('error')}")
-            return None
+            raise ReportFetchError.from_result(result)
 
     # DEMO MODE
     else:
         logger.info(f"Autocheck DEMO mode for VIN: {vin}")
-        return {
-            'vin': vin,
-            'provider': 'autocheck',
-            'score': 85,
-            'accidents': 1,
-            'owners': 1,
-            'title_info': 'Clean',
-            'vehicle_use': 'Personal',
-            'html': '<h1>Demo Autocheck Report</h1><p>Enable API to see real data.</p>',
-            'demo': True
-        }
+        return _autocheck_demo_report(vin)
+
+
+def _carfax_report(vin, result):
+    """CheapCarfax Carfax atsakymas -> report dict"""
+    # ✅ FIXED: Išsaugome HTML ir visus duomenis
+    return {
+        'vin': vin,
+        'provider': 'carfax',
+        'score': result['report_data'].get('score', 72),
+        'accidents': result['report_data'].get('accidents', 0),
+        'owners': result['report_data'].get('owners', 1),
+        'service_records': result.get('report_data', {}).get('service_records', 0),
+        'title_info': result.get('report_data', {}).get('title_info', 'Unknown'),
+        'title_brands': result['report_data'].get('title_brands', []),
+        'odometer': result['report_data'].get('odometer', {}),
+        'yearMakeModel': result.get('yearMakeModel', ''),  # ✅ Vehicle info
+        'html': result.get('html', ''),  # ✅ SVARBIAUSIA - HTML reportas!
+        'upstream': _upstream_metadata(result, 'carfax'),
+        'demo': False
+    }
+
+
+def _carfax_demo_report(vin):
+    return {
+        'vin': vin,
+        'provider': 'carfax',
+        'score': 72,
+        'accidents': 0,
+        'owners': 2,
+        'service_records': 15,
+        'title_info': 'Clean',
+        'html': '<h1>Demo Report</h1><p>This is a demo report. Enable API to see real data.</p>',
+        'mileage_records': [
+            {'date': '2023-01-15', 'odometer': 45000, 'source': 'Service'},
+            {'date': '2022-06-20', 'odometer': 38000, 'source': 'Inspection'},
+        ],
+        'demo': True
+    }
+
+
+def _autocheck_report(vin, result):
+    """CheapCarfax Autocheck atsakymas -> report dict"""
+    # ✅ FIXED: Išsaugome HTML
+    return {
+        'vin': vin,
+        'provider': 'autocheck',
+        'score': result['report_data'].get('score', 80),
+        'accidents': result['report_data'].get('accidents', 0),
+        'owners': result['report_data'].get('owners', 1),
+        'service_records': result['report_data'].get('service_records', 0),
+        'title_info': result.get('report_data', {}).get('title_info', 'Unknown'),
+        'title_brands': result['report_data'].get('title_brands', []),
+        'odometer': result['report_data'].get('odometer', {}),
+        'yearMakeModel': result.get('yearMakeModel', ''),
+        'html': result.get('html', ''),  # ✅ HTML reportas
+        'upstream': _upstream_metadata(result, 'autocheck'),
+        'demo': False
+    }
+
+
+def _autocheck_demo_report(vin):
+    return {
+        'vin': vin,
+        'provider': 'autocheck',
+        'score': 85,
+        'accidents': 1,
+        'owners': 1,
+        'title_info': 'Clean',
+        'vehicle_use': 'Personal',
+        'html': '<h1>Demo Autocheck Report</h1><p>Enable API to see real data.</p>',
+        'demo': True
+    }
 
 
 def fetch_nmvtis_report(vin):
@@ -162,3 +315,92 @@ def fetch_nmvtis_report(vin):
 
     # TODO: Pridėti tikrą NMVTIS API integraciją
     return None
+
+
+# ═══════════════════════════════════════════════════════
+# ASYNC VARIANTAI (ASGI views)
+# ═══════════════════════════════════════════════════════
+# Tas pats kelias kaip fetch_vehicle_report, bet upstream laukiama
+# event loop'e (AsyncCheapCarfaxAPI), o ne užimtame worker thread'e.
+
+async def afetch_vehicle_report(vin, report_type):
+    """
+    fetch_vehicle_report() async variantas
+
+    Returns:
+        dict: Ataskaitos duomenys arba None (nežinomas report_type)
+
+    Raises:
+        ReportFetchError: upstream klaida
+    """
+    if report_type in CACHEABLE_PROVIDERS:
+        cached = await sync_to_async(report_cache.get_report)(vin, report_type)
+        if cached is not None:
+            return cached
+
+        key = f'{report_type}:{vin.upper()}'
+        wait_timeout = getattr(settings, 'REPORT_FETCH_LOCK_TIMEOUT', 45)
+        try:
+            report = await singleflight.ado(key, lambda: _afetch_and_cache(vin, report_type), wait_timeout)
+        except singleflight.InFlightTimeout as e:
+            raise _in_flight_error(e)
+        return dict(report) if report is not None else None
+
+    if report_type == 'nmvtis':
+        return fetch_nmvtis_report(vin)  # Demo duomenys, be I/O
+
+    logger.error(f"Unknown report type: {report_type}")
+    return None
+
+
+async def _afetch_and_cache(vin, report_type):
+    """_fetch_and_cache() async variantas"""
+    key = f'{report_type}:{vin.upper()}'
+    lock_timeout = getattr(settings, 'REPORT_FETCH_LOCK_TIMEOUT', 45)
+
+    async with singleflight.adistributed_lock(key, timeout=lock_timeout, blocking_timeout=lock_timeout):
+        cached = await sync_to_async(report_cache.get_report)(vin, report_type, record_stats=False)
+        if cached is not None:
+            logger.info(f"Single-flight: {key} filled by another worker")
+            return cached
+
+        if report_type == 'carfax':
+            report = await afetch_carfax_report(vin)
+        else:
+            report = await afetch_autocheck_report(vin)
+
+        if report is not None:
+            await sync_to_async(report_cache.set_report)(vin, report_type, report)
+        return report
+
+
+async def afetch_carfax_report(vin):
+    """fetch_carfax_report() async variantas"""
+    if not settings.CHEAPCARFAX_API_KEY:
+        logger.info(f"Carfax DEMO mode for VIN: {vin}")
+        return _carfax_demo_report(vin)
+
+    logger.info(f"Fetching Carfax report for VIN: {vin}")
+    result = await AsyncCheapCarfaxAPI().get_carfax_html(vin)
+    if not result['success']:
+        logger.error(f"CheapCarfax API error: {result.get('error')}")
+        raise ReportFetchError.from_result(result)
+
+    await sync_to_async(note_report_consumed, thread_sensitive=False)('carfax')
+    return _carfax_report(vin, result)
+
+
+async def afetch_autocheck_report(vin):
+    """fetch_autocheck_report() async variantas"""
+    if not settings.CHEAPCARFAX_API_KEY:
+        logger.info(f"Autocheck DEMO mode for VIN: {vin}")
+        return _autocheck_demo_report(vin)
+
+    logger.info(f"Fetching Autocheck report for VIN: {vin}")
+    result = await AsyncCheapCarfaxAPI().get_autocheck_html(vin)
+    if not result['success']:
+        logger.error(f"Autocheck API error: {result.get('error')}")
+        raise ReportFetchError.from_result(result)
+
+    await sync_to_async(note_report_consumed, thread_sensitive=False)('autocheck')
+    return _autocheck_report(vin, result)
@@ -0,0 +1,307 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  API LOG WRITER                                          ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/api_log.py               ║
+║  PASKIRTIS: Neblokuojantis APILog rašymas (buferis +    ║
+║  bulk_create) ir mėnesinės api_logs particijos          ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from datetime import datetime
+import atexit
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+VIN_IN_PATH_RE = re.compile(r'/([A-HJ-NPR-Z0-9]{17})(?:/|$)')
+PARTITION_NAME_RE = re.compile(r'^api_logs_(\d{4})(\d{2})$')
+DEFAULT_PARTITION = 'api_logs_default'
+
+
+def provider_for_endpoint(endpoint):
+    """CheapCarfax endpoint'o vardas -> APILog.provider"""
+    if endpoint.startswith('carfax'):
+        return 'carfax'
+    if endpoint.startswith('autocheck'):
+        return 'autocheck'
+    return 'cheapcarfax'
+
+
+# ═══════════════════════════════════════════════════════
+# BUFFERED WRITER
+# ═══════════════════════════════════════════════════════
+# record() tik įdeda dict'ą į atminties eilę - jokio DB darbo
+# užklausos thread'e. Fono thread'as rašo bulk_create kas
+# APILOG_BATCH_SIZE įrašų arba kas APILOG_FLUSH_INTERVAL_MS.
+# Eilei persipildžius (DB nepasiekiama) nauji įrašai išmetami.
+
+class APILogWriter:
+    """Procesui bendras APILog buferis su fono flush thread'u"""
+
+    def __init__(self, background=True):
+        self.background = background
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self.dropped = 0
+
+    @property
+    def batch_size(self):
+        return max(1, getattr(settings, 'APILOG_BATCH_SIZE', 200))
+
+    @property
+    def interval(self):
+        return getattr(settings, 'APILOG_FLUSH_INTERVAL_MS', 1000) / 1000
+
+    def _ensure_started(self):
+        """Eilė ir thread'as kuriami tingiai; po fork'o (gunicorn preload) - iš naujo"""
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=getattr(settings, 'APILOG_MAX_QUEUE', 10000))
+                if self.background:
+                    self._thread = threading.Thread(target=self._run, name='apilog-writer', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+                self._pid = os.getpid()
+        return self._queue
+
+    def record(self, **fields):
+        """
+        Įdėti įrašą į eilę (niekada neblokuoja ir nemeta klaidų)
+
+        Returns:
+            bool: False - logging išjungtas arba eilė pilna
+        """
+        if not getattr(settings, 'APILOG_ENABLED', True):
+            return False
+        fields.setdefault('created_at', timezone.now())
+        try:
+            self._ensure_started().put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        except Exception as e:
+            logger.warning(f"API log enqueue failed: {str(e)}")
+            return False
+        return True
+
+    def pending(self):
+        return self._queue.qsize() if self._pid == os.getpid() else 0
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Sinchroniškai įrašyti viską, kas eilėje (testams / worker'io išjungimui)"""
+        if self._pid != os.getpid():
+            return 0
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if not self._write(batch):
+                # Nutrūkusi jungtis - kitas batch'as jungsis iš naujo
+                connection.close()
+
+    def _write(self, batch):
+        from .models import APILog
+
+        try:
+            APILog.objects.bulk_create([APILog(**fields) for fields in batch], batch_size=self.batch_size)
+            return len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.warning(f"API log flush failed, {len(batch)} entries dropped: {str(e)}")
+            return 0
+
+
+writer = APILogWriter()
+
+
+def log_upstream_call(endpoint, path, status_code, latency, attempt=1, error='', response_size=None):
+    """
+    Užregistruoti vieną CheapCarfax HTTP bandymą
+
+    Args:
+        endpoint (str): endpoint'o vardas ('carfax_html', 'user_limits', ...)
+        path (str): kelias po base_url
+        status_code (int): HTTP statusas, 0 - transporto klaida
+        latency (float): trukmė sekundėmis
+        attempt (int): retry bandymo numeris
+        error (str): klaidos tekstas
+        response_size (int): atsakymo dydis baitais
+    """
+    match = VIN_IN_PATH_RE.search(path)
+    response_data = {'bytes': response_size} if response_size is not None else {}
+    return writer.record(
+        provider=provider_for_endpoint(endpoint),
+        endpoint=endpoint,
+        vin=match.group(1) if match else '',
+        request_data={'path': path, 'attempt': attempt},
+        response_data=response_data,
+        status_code=status_code,
+        success=200 <= status_code < 300,
+        error_message=error[:500],
+        latency_ms=int(latency * 1000),
+    )
+
+
+# ═══════════════════════════════════════════════════════
+# MONTHLY PARTITIONS (PostgreSQL)
+# ═══════════════════════════════════════════════════════
+# api_logs yra PARTITION BY RANGE (created_at) lentelė su
+# api_logs_YYYYMM particijomis (žr. migraciją 0010). Senų įrašų
+# valymas = DETACH + DROP visos particijos, be DELETE ir VACUUM.
+
+def month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(month):
+    return f'api_logs_{month:%Y%m}'
+
+
+def is_partitioned():
+    """Ar api_logs šioje DB yra particionuota lentelė"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = 'api_logs' AND relkind = 'p'")
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """
+    Mėnesinės particijos
+
+    Returns:
+        list: [(pavadinimas, mėnesio pradžia), ...] chronologine tvarka
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'api_logs'"
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            month = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.get_current_timezone())
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def create_partition(cursor, month):
+    """CREATE TABLE IF NOT EXISTS api_logs_YYYYMM PARTITION OF api_logs"""
+    month = month_start(month)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF api_logs '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [month, add_months(month, 1)],
+    )
+
+
+def ensure_partitions(months_ahead=None):
+    """
+    Iš anksto sukurti einamo ir ateinančių mėnesių particijas
+    (kad įrašai nepatektų į api_logs_default)
+
+    Returns:
+        int: patikrintų particijų skaičius, 0 - ne PostgreSQL
+    """
+    if not is_partitioned():
+        return 0
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'APILOG_PARTITIONS_AHEAD', 2)
+    current = month_start(timezone.localtime())
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            create_partition(cursor, add_months(current, offset))
+    return months_ahead + 1
+
+
+def retention_cutoff(months=None):
+    """Seniausio saugomo mėnesio pradžia"""
+    if months is None:
+        months = getattr(settings, 'APILOG_RETENTION_MONTHS', 6)
+    return add_months(month_start(timezone.localtime()), -months)
+
+
+def prune_partitions(cutoff, dry_run=False):
+    """
+    Pašalinti particijas, kurios visos yra senesnės už cutoff
+
+    Returns:
+        list: pašalintų (arba dry_run - šalintinų) particijų vardai
+    """
+    doomed = [name for name, month in list_partitions() if add_months(month, 1) <= cutoff]
+    if dry_run:
+        return doomed
+    with connection.cursor() as cursor:
+        for name in doomed:
+            cursor.execute(f'ALTER TABLE api_logs DETACH PARTITION {name}')
+            cursor.execute(f'DROP TABLE {name}')
+            logger.info(f"API log partition dropped: {name}")
+        # Retkarčiais į default particiją patekę seni įrašai
+        cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE created_at < %s', [cutoff])
+    return doomed
+
+
+def delete_before(cutoff, batch_size=5000):
+    """
+    Ne-PostgreSQL (dev / testai): batch'inis DELETE
+
+    Returns:
+        int: ištrintų įrašų skaičius
+    """
+    from .models import APILog
+
+    deleted = 0
+    while True:
+        ids = list(APILog.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += APILog.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,233 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  ASYNC VIEWS (ASGI)                                      ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/async_views.py           ║
+║  PASKIRTIS: Ilgai trunkantys / laukiantys endpoint'ai   ║
+║  (ASYNC_VIEWS=True - upstream laukiama event loop'e)    ║
+║  Paleidimas: uvicorn config.asgi:application            ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+
+from . import job_events
+from .cheapcarfax import has_upstream_quota
+from .models import Report, ReportJob, ReportPackage, UserProfile
+from .services import PurchaseError, apurchase_report, report_price, report_summary
+from .views import REPORT_HISTORY_MAX_PAGE_SIZE, _enqueue_report_job, job_summary
+
+logger = logging.getLogger(__name__)
+
+
+def _auth_required():
+    return JsonResponse({'success': False, 'message': 'Authentication required.'}, status=401)
+
+
+def _sse(event, data):
+    """Vienas Server-Sent Events pranešimas"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+# ═══════════════════════════════════════════════════════
+# REPORT JOB EVENTS (SSE)
+# ═══════════════════════════════════════════════════════
+
+async def report_job_events(request):
+    """
+    ReportJob būsenų stream'as (text/event-stream)
+
+    Query params:
+        job: (optional) vieno job'o ID - stream'as baigiasi kai job'as saved/failed
+
+    Be ?job= siunčiami visi vartotojo job'ų perėjimai iki
+    REPORT_JOB_EVENTS_MAX_DURATION (EventSource pats persijungia).
+    Vienas Redis pub/sub kanalas vartotojui - jokio DB polling'o.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _auth_required()
+
+    job_id = request.GET.get('job')
+    if job_id:
+        try:
+            job_id = str(uuid.UUID(job_id))
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Invalid job id.'}, status=400)
+        if not await ReportJob.objects.filter(id=job_id, user_id=user.id).aexists():
+            return JsonResponse({'success': False, 'message': 'Job not found.'}, status=404)
+
+    heartbeat = getattr(settings, 'REPORT_JOB_EVENTS_HEARTBEAT', 15)
+    max_duration = getattr(settings, 'REPORT_JOB_EVENTS_MAX_DURATION', 300)
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_duration
+
+        # Pirma prenumerata, tada DB snapshot - perėjimai tarp jų neprarandami
+        async with job_events.subscribe(user.id) as pubsub:
+            jobs = ReportJob.objects.filter(user_id=user.id)
+            if job_id:
+                jobs = jobs.filter(id=job_id)
+            else:
+                jobs = jobs.exclude(status__in=ReportJob.FINAL_STATUSES).order_by('-created_at')[:50]
+
+            async for job in jobs:
+                yield _sse('job', job_events.job_event(job))
+                if job_id and job.is_final:
+                    return
+
+            while loop.time() < deadline:
+                timeout = min(heartbeat, max(0, deadline - loop.time()))
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+                if message is None:
+                    yield ': keepalive\n\n'
+                    continue
+
+                event = json.loads(message['data'])
+                if job_id and event['id'] != job_id:
+                    continue
+                yield _sse('job', event)
+                if job_id and event['status'] in ReportJob.FINAL_STATUSES:
+                    return
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx - nebuferizuoti
+    return response
+
+
+# ═══════════════════════════════════════════════════════
+# VIN SEARCH & API ENDPOINTS (async variantai)
+# ═══════════════════════════════════════════════════════
+# Tie patys atsakymai kaip views.search_vin / api_balance / api_recent_reports.
+# urls.py juos naudoja kai ASYNC_VIEWS=True (uvicorn); WSGI lieka sync views.
+
+@require_http_methods(["POST"])
+async def search_vin(request):
+    """
+    views.search_vin() async variantas
+
+    Laukimas CheapCarfax atsakymo (iki ~30s) neužima worker thread'o -
+    vienas ASGI procesas aptarnauja daug lygiagrečių pirkimų.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _auth_required()
+
+    try:
+        data = json.loads(request.body)
+        vin = data.get('vin', '').upper()
+        report_type = data.get('reportType', 'carfax')
+
+        # Validacija
+        if len(vin) != 17:
+            return JsonResponse({
+                'success': False,
+                'message': 'Invalid VIN format. VIN must be 17 characters.'
+            }, status=400)
+
+        price = report_price(report_type)
+
+        # Patikrinti balansą (galutinis patikrinimas - rezervuojant); paketo kreditai - be balanso
+        profile = await UserProfile.objects.only('balance').aget(user_id=user.id)
+        has_credits = await ReportPackage.active_for(user.id, report_type).aexists()
+        if not has_credits and not profile.has_sufficient_balance(price):
+            return JsonResponse({
+                'success': False,
+                'message': f'Insufficient balance. You need {price} PLN. Please add funds.'
+            }, status=400)
+
+        if not await sync_to_async(has_upstream_quota)(report_type):
+            logger.warning(f"Upstream daily limit exhausted for {report_type}")
+            return JsonResponse({
+                'success': False,
+                'message': f'{report_type.capitalize()} reports are temporarily unavailable. Please try again later.'
+            }, status=503)
+
+        if data.get('async', getattr(settings, 'REPORT_PURCHASE_ASYNC', False)):
+            # job_summary gali skaityti job.report (ORM) - tame pačiame thread'e
+            summary = await sync_to_async(lambda: job_summary(
+                _enqueue_report_job(user, vin, report_type, price, data.get('idempotencyKey', ''))
+            ))()
+            return JsonResponse({
+                'success': True,
+                'job': summary,
+            }, status=202)
+
+        try:
+            report = await apurchase_report(user, vin, report_type)
+        except PurchaseError as e:
+            return JsonResponse({
+                'success': False,
+                'message': e.message
+            }, status=e.status)
+
+        return JsonResponse({
+            'success': True,
+            'report': report_summary(report)
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid request format.'
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Search VIN error: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'message': f'An error occurred: {str(e)}'
+        }, status=500)
+
+
+async def api_balance(request):
+    """Gauti dabartinį balansą (JSON)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _auth_required()
+
+    profile = await UserProfile.objects.only('balance').aget(user_id=user.id)
+    return JsonResponse({
+        'balance': float(profile.balance),
+        'currency': 'PLN'
+    })
+
+
+async def api_recent_reports(request):
+    """Gauti paskutines ataskaitas (JSON)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _auth_required()
+
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    limit = max(1, min(limit, REPORT_HISTORY_MAX_PAGE_SIZE))
+    reports = (
+        Report.objects
+        .filter(user_id=user.id)
+        .only('id', 'vin', 'report_type', 'score', 'price_paid', 'html_available', 'created_at')
+        .order_by('-created_at')[:limit]
+    )
+
+    data = [{
+        'id': r.id,
+        'vin': r.vin,
+        'type': r.get_report_type_display(),
+        'score': r.score,
+        'price': float(r.price_paid),
+        'has_html': r.has_html,
+        'created_at': r.created_at.isoformat()
+    } async for r in reports]
+
+    return JsonResponse({'reports': data})
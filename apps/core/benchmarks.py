@@ -0,0 +1,308 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  HOT-PATH BENCHMARKS                                     ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/benchmarks.py            ║
+║  PASKIRTIS: View'ų, ORM, upstream kliento ir balanso    ║
+║  operacijų benchmark'ai + SQL užklausų biudžetai        ║
+║  Paleidimas: python manage.py bench_hotpaths            ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from contextlib import ExitStack, contextmanager
+from decimal import Decimal
+from pathlib import Path
+import itertools
+import json
+import platform
+import statistics
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from . import api_log, tasks
+from .cheapcarfax import CheapCarfaxAPI
+from .models import BalanceHold, Report, ReportContent
+from .sample_reports import generate_report_html
+from .upstream_metrics import UpstreamMetrics
+
+BASELINE_PATH = Path(__file__).with_name('bench_baseline.json')
+
+# Triukšmo riba: mažesni nei tiek ms pokyčiai niekada nelaikomi regresija
+MIN_DELTA_MS = 1.0
+
+# Transakcijų valdymas neskaičiuojamas: sqlite BEGIN/COMMIT siunčia per execute,
+# PostgreSQL - ne; TestCase kiekvieną atomic() paverčia savepoint'u
+TRANSACTION_PREFIXES = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper: SQL užklausų skaičius be transakcijų valdymo -
+    vienodas testuose, bench_hotpaths komandoje, sqlite ir PostgreSQL
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(TRANSACTION_PREFIXES):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+# ═══════════════════════════════════════════════════════
+# OFFLINE ENVIRONMENT
+# ═══════════════════════════════════════════════════════
+
+class FakeUpstreamResponse:
+    """requests.Response pakaitalas CheapCarfax HTML atsakymui"""
+
+    def __init__(self, payload):
+        self.status_code = 200
+        self.content = json.dumps(payload).encode()
+        self._payload = payload
+        self.text = ''
+
+    def json(self):
+        return self._payload
+
+
+class FakeUpstreamSession:
+    """get_http_session() pakaitalas: tas pats iš anksto sugeneruotas reportas be tinklo"""
+
+    def __init__(self, html):
+        self.html = html
+
+    def get(self, url, headers=None, timeout=None):
+        return FakeUpstreamResponse({'yearMakeModel': '2019 Honda Accord', 'id': 'bench', 'html': self.html})
+
+
+@contextmanager
+def offline_environment(html):
+    """
+    Settings ir patch'ai, kad benchmark'ai veiktų be tinklo, Redis ir collectstatic:
+    locmem cache, fake CheapCarfax sesija, metrikos / API logai tik atmintyje,
+    Celery limits refresh neplanuojamas (nėra broker'io)
+    """
+    with ExitStack() as stack:
+        stack.enter_context(override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            CHEAPCARFAX_API_KEY='bench-key',
+            CHEAPCARFAX_API_URL='http://cheapcarfax.invalid/api',
+            REPORT_PURCHASE_ASYNC=False,
+            PROFILING_SAMPLE_RATE=0,
+        ))
+        stack.enter_context(mock.patch('apps.core.cheapcarfax.get_http_session', return_value=FakeUpstreamSession(html)))
+        stack.enter_context(mock.patch('apps.core.cheapcarfax.metrics', UpstreamMetrics(background=False)))
+        stack.enter_context(mock.patch.object(api_log, 'writer', api_log.APILogWriter(background=False)))
+        stack.enter_context(mock.patch.object(tasks.refresh_upstream_limits, 'apply_async'))
+        yield
+
+
+class BenchContext:
+    """Benchmark'ų duomenys: vartotojas su balansu, reportai su HTML, prisijungęs Client"""
+
+    def __init__(self, reports=30, html_bytes=200_000):
+        self.user = User.objects.create_user(username='bench-user', password='bench-pass')
+        self.user.profile.add_balance(Decimal('1000000.00'), kind='adjustment', reference='bench')
+
+        self.carfax_html = generate_report_html('1HGBH41JXMN109186', 'carfax', html_bytes, seed=1)
+        self.autocheck_html = generate_report_html('1HGBH41JXMN109186', 'autocheck', html_bytes, seed=2)
+
+        for seed in range(reports):
+            report = Report.objects.create(
+                user=self.user, vin=f'1HGBH41JX{seed:08d}', report_type='carfax',
+                price_paid=Decimal('14.99'), html_available=True, report_data={'score': 70},
+            )
+            ReportContent.objects.create(report=report, **ReportContent.build_fields(self.carfax_html))
+        self.report = Report.objects.filter(user=self.user).latest('id')
+
+        self.client = Client()
+        self.client.force_login(self.user)
+        self._vins = itertools.count(1)
+
+    def next_vin(self):
+        """Naujas (necache'intas) VIN kiekvienam search_vin iškvietimui"""
+        return f'5YJ3E1EA{next(self._vins):09d}'
+
+
+# ═══════════════════════════════════════════════════════
+# CASES
+# ═══════════════════════════════════════════════════════
+# max_queries - SQL biudžetas (tikrinamas testuose ir komandoje)
+
+CASES = {}
+
+
+def benchmark(name, max_queries):
+    def register(func):
+        CASES[name] = {'func': func, 'max_queries': max_queries}
+        return func
+    return register
+
+
+def _expect_ok(response):
+    if response.status_code != 200:
+        raise AssertionError(f'HTTP {response.status_code}: {response.content[:200]!r}')
+
+
+@benchmark('search_vin', max_queries=20)
+def bench_search_vin(ctx):
+    """Pilnas pirkimas: view -> CheapCarfax klientas (fake) -> parse -> save_report"""
+    _expect_ok(ctx.client.post(
+        '/api/search-vin/', json.dumps({'vin': ctx.next_vin(), 'reportType': 'carfax'}),
+        content_type='application/json',
+    ))
+
+
+@benchmark('dashboard', max_queries=5)
+def bench_dashboard(ctx):
+    _expect_ok(ctx.client.get('/dashboard/'))
+
+
+@benchmark('view_report', max_queries=3)
+def bench_view_report(ctx):
+    _expect_ok(ctx.client.get(f'/report/{ctx.report.id}/'))
+
+
+@benchmark('api_recent_reports', max_queries=3)
+def bench_api_recent_reports(ctx):
+    _expect_ok(ctx.client.get('/api/recent-reports/'))
+
+
+@benchmark('upstream_carfax_html', max_queries=0)
+def bench_upstream_carfax_html(ctx):
+    """CheapCarfaxAPI.get_carfax_html: retry / breaker / metrikos / parse be tinklo"""
+    result = CheapCarfaxAPI().get_carfax_html('1HGBH41JXMN109186')
+    if not result['success']:
+        raise AssertionError(result['error'])
+
+
+@benchmark('parse_carfax', max_queries=0)
+def bench_parse_carfax(ctx):
+    CheapCarfaxAPI()._parse_carfax_data({'html': ctx.carfax_html})
+
+
+@benchmark('parse_autocheck', max_queries=0)
+def bench_parse_autocheck(ctx):
+    CheapCarfaxAPI()._parse_autocheck_data({'html': ctx.autocheck_html})
+
+
+@benchmark('balance_add', max_queries=3)
+def bench_balance_add(ctx):
+    ctx.user.profile.add_balance(Decimal('1.00'), kind='adjustment', reference='bench')
+
+
+@benchmark('balance_deduct', max_queries=3)
+def bench_balance_deduct(ctx):
+    ctx.user.profile.deduct_balance(Decimal('1.00'), reference='bench')
+
+
+@benchmark('balance_hold_capture', max_queries=7)
+def bench_balance_hold_capture(ctx):
+    hold = BalanceHold.place(ctx.user, Decimal('14.99'), reference='bench')
+    hold.capture()
+
+
+# ═══════════════════════════════════════════════════════
+# RUNNER + COMPARISON
+# ═══════════════════════════════════════════════════════
+
+def run_case(name, ctx, rounds=30, warmup=2):
+    """
+    Vienas benchmark'as
+
+    Returns:
+        dict: {'p50_ms', 'p95_ms', 'queries'} (queries - daugiausiai per iteraciją)
+    """
+    func = CASES[name]['func']
+    for _ in range(warmup):
+        func(ctx)
+
+    timings = []
+    queries = 0
+    for _ in range(rounds):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            func(ctx)
+            timings.append(time.perf_counter() - started)
+        queries = max(queries, counter.count)
+
+    quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    return {
+        'p50_ms': round(quantiles[49] * 1000, 3),
+        'p95_ms': round(quantiles[94] * 1000, 3),
+        'queries': queries,
+    }
+
+
+def run_all(ctx, names=None, rounds=30, warmup=2):
+    return {name: run_case(name, ctx, rounds, warmup) for name in (names or CASES)}
+
+
+def environment_meta(rounds):
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'database': connection.vendor,
+        'rounds': rounds,
+        'created_at': timezone.now().isoformat(timespec='seconds'),
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_baseline(results, rounds, path=BASELINE_PATH):
+    data = {'meta': environment_meta(rounds), 'results': results}
+    Path(path).write_text(json.dumps(data, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+    return data
+
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Rezultatai vs baseline
+
+    Returns:
+        list: [{'name', 'baseline_ms', 'current_ms', 'change', 'queries', 'status'}, ...]
+        status: 'ok', 'faster', 'slower' (regresija), 'queries' (viršytas biudžetas
+        arba daugiau užklausų nei baseline), 'new' (nėra baseline)
+    """
+    base_results = (baseline or {}).get('results', {})
+    rows = []
+    for name, current in results.items():
+        base = base_results.get(name)
+        budget = CASES[name]['max_queries']
+        row = {
+            'name': name,
+            'baseline_ms': base['p50_ms'] if base else None,
+            'current_ms': current['p50_ms'],
+            'change': None,
+            'queries': current['queries'],
+            'status': 'new' if base is None else 'ok',
+        }
+        if base:
+            delta = current['p50_ms'] - base['p50_ms']
+            row['change'] = delta / base['p50_ms'] if base['p50_ms'] else 0.0
+            if abs(delta) >= MIN_DELTA_MS and row['change'] > threshold:
+                row['status'] = 'slower'
+            elif abs(delta) >= MIN_DELTA_MS and row['change'] < -threshold:
+                row['status'] = 'faster'
+        if current['queries'] > budget or (base and current['queries'] > base['queries']):
+            row['status'] = 'queries'
+        rows.append(row)
+    return rows
@@ -9,19 +9,105 @@
 ╚══════════════════════════════════════════════════════════╝
 """
 
+import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 import logging
 
+from .report_parser import compute_score, extract_report_facts
+from .api_log import log_upstream_call
+from .resilience import CircuitOpenError, RetryPolicy, get_breaker, is_retryable_failure, is_upstream_failure
+from .upstream_metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 
+# ═══════════════════════════════════════════════════════
+# POOLED HTTP TRANSPORT (keep-alive)
+# ═══════════════════════════════════════════════════════
+# Viena requests.Session per procesą (gunicorn worker'į) - TCP/TLS
+# jungtys į panel.cheapcarfax.net pernaudojamos tarp užklausų.
+
+_session = None
+_session_pid = None
+_session_last_used = 0.0
+_session_lock = threading.Lock()
+
+
+def _build_http_session():
+    """Sukurti naują Session su keep-alive connection pool"""
+    pool_size = getattr(settings, 'CHEAPCARFAX_POOL_SIZE', 10)
+    session = requests.Session()
+    # max_retries=0: retry logika valdoma kliento lygyje, ne adapteryje
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        pool_block=False,
+        max_retries=0,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def _session_is_healthy():
+    """
+    Health check prieš pernaudojant pool'ą:
+    - po fork'o (gunicorn preload) socket'ai negali būti dalinami su tėviniu procesu
+    - ilgai nenaudotas pool'as greičiausiai turi serverio uždarytas jungtis
+    Pavienius nutrūkusius socket'us urllib3 patikrina pats prieš pernaudojimą.
+    """
+    if _session is None or _session_pid != os.getpid():
+        return False
+    idle_timeout = getattr(settings, 'CHEAPCARFAX_POOL_IDLE_TIMEOUT', 60)
+    return (time.monotonic() - _session_last_used) < idle_timeout
+
+
+def get_http_session():
+    """
+    Grąžina procesui bendrą HTTP sesiją CheapCarfax užklausoms
+
+    Returns:
+        requests.Session: pooled keep-alive sesija
+    """
+    global _session, _session_pid, _session_last_used
+
+    with _session_lock:
+        if not _session_is_healthy():
+            if _session is not None and _session_pid == os.getpid():
+                _session.close()
+            _session = _build_http_session()
+            _session_pid = os.getpid()
+            logger.info(f"CheapCarfax HTTP pool created (pid={_session_pid})")
+        _session_last_used = time.monotonic()
+        return _session
+
+
+def close_http_session():
+    """Uždaryti bendrą sesiją (pvz. testuose ar worker'io išjungime)"""
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
 class CheapCarfaxAPI:
     """CheapCarfax API Client"""
 
     def __init__(self):
         self.api_key = settings.CHEAPCARFAX_API_KEY
-        self.base_url = 'https://panel.cheapcarfax.net/api'
+        self.base_url = getattr(settings, 'CHEAPCARFAX_API_URL', 'https://panel.cheapcarfax.net/api')
+        self.connect_timeout = getattr(settings, 'CHEAPCARFAX_CONNECT_TIMEOUT', 5)
 
         # ✅ FIXED: Headers pagal API dokumentaciją
         # API dokumentacija: "Every request to the API must include the x-api-key header"
@@ -31,6 +117,76 @@ class CheapCarfaxAPI:
             'Accept': 'application/json'
         }
 
+    def _request(self, endpoint, path, timeout):
+        """
+        GET užklausa per bendrą pooled sesiją
+        Su circuit breaker'iu ir retry (tik saugiems, neapmokėtiems atvejams)
+
+        Args:
+            endpoint (str): endpoint'o vardas (breaker'iui / logams / metrikoms)
+            path (str): kelias po base_url, pvz. '/user/limits'
+            timeout (int): read timeout sekundėmis
+
+        Returns:
+            requests.Response
+
+        Raises:
+            CircuitOpenError: breaker'is atidarytas - upstream nekviestas
+            requests.exceptions.RequestException: galutinė transporto klaida
+        """
+        breaker = get_breaker(endpoint)
+        policy = RetryPolicy()
+        deadline_at = time.monotonic() + policy.deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            probe = breaker.before_call()
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f'Deadline exceeded for {endpoint}')
+
+            started = time.monotonic()
+            try:
+                with metrics.in_flight(endpoint):
+                    response = get_http_session().get(
+                        f'{self.base_url}{path}',
+                        headers=self.headers,
+                        timeout=(min(self.connect_timeout, remaining), min(timeout, remaining))
+                    )
+            except requests.exceptions.RequestException as e:
+                latency = time.monotonic() - started
+                metrics.observe(endpoint, 0, latency, timeout=isinstance(e, requests.exceptions.Timeout))
+                log_upstream_call(endpoint, path, 0, latency, attempt, error=str(e))
+                breaker.record_failure(probe)
+                delay = policy.backoff(attempt, deadline_at) if policy.should_retry_exception(e, endpoint) else None
+                if delay is None:
+                    raise
+                logger.warning(f"{endpoint} attempt {attempt} failed ({str(e)}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            latency = time.monotonic() - started
+            metrics.observe(endpoint, response.status_code, latency)
+            log_upstream_call(
+                endpoint, path, response.status_code, latency, attempt,
+                error='' if response.status_code < 400 else response.text[:500],
+                response_size=len(response.content),
+            )
+
+            if is_upstream_failure(response.status_code):
+                breaker.record_failure(probe)
+                delay = policy.backoff(attempt, deadline_at) if policy.should_retry_status(response.status_code, endpoint) else None
+                if delay is not None:
+                    logger.warning(f"{endpoint} attempt {attempt} got {response.status_code}, retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                    continue
+            else:
+                breaker.record_success(latency, probe)
+
+            return response
+
     def get_report_info(self, vin):
         """
         GET /api/reports/{VIN}
@@ -46,33 +202,10 @@ class CheapCarfaxAPI:
             }
         """
         try:
-            url = f'{self.base_url}/reports/{vin.upper()}'
             logger.info(f"Getting report info for VIN: {vin}")
 
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=10
-            )
-
-            logger.info(f"Report info response: {response.status_code}")
-
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"Report info retrieved for VIN: {vin}")
-                return {
-                    'success': True,
-                    'vehicle': data.get('vehicle', {}),
-                    'carfax_records': data.get('carfax_records', 0),
-                    'autocheck_records': data.get('autocheck_records', 0),
-                    'sticker': data.get('sticker', 'false')
-                }
-            elif response.status_code == 401:
-                logger.error("Unauthorized - check API key")
-                return {'success': False, 'error': 'Invalid API key'}
-            else:
-                logger.error(f"Report info failed: {response.status_code} - {response.text}")
-                return {'success': False, 'error': f'HTTP {response.status_code}'}
+            response = self._request('report_info', f'/reports/{vin.upper()}', timeout=10)
+            return self._report_info_result(response, vin)
 
         except Exception as e:
             logger.error(f"Report info exception: {str(e)}")
@@ -92,32 +225,10 @@ class CheapCarfaxAPI:
             }
         """
         try:
-            url = f'{self.base_url}/user'
             logger.info(f"Getting user info")
 
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=10
-            )
-
-            logger.info(f"User info response: {response.status_code}")
-
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"User info retrieved")
-                return {
-                    'success': True,
-                    '_id': data.get('_id'),
-                    'email': data.get('email'),
-                    'role': data.get('role')
-                }
-            elif response.status_code == 401:
-                logger.error("Unauthorized - check API key")
-                return {'success': False, 'error': 'Invalid API key'}
-            else:
-                logger.error(f"User info failed: {response.status_code} - {response.text}")
-                return {'success': False, 'error': f'HTTP {response.status_code}'}
+            response = self._request('user', '/user', timeout=10)
+            return self._user_info_result(response)
 
         except Exception as e:
             logger.error(f"User info exception: {str(e)}")
@@ -138,33 +249,10 @@ class CheapCarfaxAPI:
             }
         """
         try:
-            url = f'{self.base_url}/user/limits'
             logger.info(f"Getting user limits")
 
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=10
-            )
-
-            logger.info(f"User limits response: {response.status_code}")
-
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"User limits: {data.get('credits', 0)} credits remaining")
-                return {
-                    'success': True,
-                    'daily_limit': data.get('daily_limit', 0),
-                    'carfax_reports_left_today': data.get('carfax_reports_left_today', 0),
-                    'autocheck_reports_left_today': data.get('autocheck_reports_left_today', 0),
-                    'credits': data.get('credits', 0)
-                }
-            elif response.status_code == 401:
-                logger.error("Unauthorized - check API key")
-                return {'success': False, 'error': 'Invalid API key'}
-            else:
-                logger.error(f"User limits failed: {response.status_code} - {response.text}")
-                return {'success': False, 'error': f'HTTP {response.status_code}'}
+            response = self._request('user_limits', '/user/limits', timeout=10)
+            return self._user_limits_result(response)
 
         except Exception as e:
             logger.error(f"User limits exception: {str(e)}")
@@ -189,65 +277,20 @@ class CheapCarfaxAPI:
             }
         """
         try:
-            url = f'{self.base_url}/carfax/vin/{vin.upper()}/html'
             logger.info(f"Getting Carfax HTML for VIN: {vin}")
 
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=30
-            )
-
-            logger.info(f"Carfax HTML response: {response.status_code}")
-
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"Carfax HTML generated for VIN: {vin}")
+            response = self._request('carfax_html', f'/carfax/vin/{vin.upper()}/html', timeout=30)
+            return self._html_result(response, vin, 'carfax')
 
-                # Parse the report data
-                parsed_data = self._parse_carfax_data(data)
-
-                return {
-                    'success': True,
-                    'vin': vin,
-                    'yearMakeModel': data.get('yearMakeModel', ''),
-                    'id': data.get('id', ''),
-                    'html': data.get('html', ''),
-                    'report_data': parsed_data,
-                    'provider': 'carfax',
-                    'raw_data': data
-                }
-            elif response.status_code == 404:
-                logger.warning(f"VIN not found: {vin}")
-                return {
-                    'success': False,
-                    'error': 'VIN not found in database'
-                }
-            elif response.status_code == 402:
-                logger.error("Insufficient credits")
-                return {
-                    'success': False,
-                    'error': 'Insufficient API credits'
-                }
-            elif response.status_code == 401:
-                logger.error("Unauthorized")
-                return {
-                    'success': False,
-                    'error': 'Invalid API key'
-                }
-            else:
-                logger.error(f"Carfax HTML failed: {response.status_code} - {response.text}")
-                return {
-                    'success': False,
-                    'error': f'API Error: {response.status_code}'
-                }
-
-        except requests.exceptions.Timeout:
+        except CircuitOpenError as e:
+            logger.warning(f"Carfax circuit open, skipping VIN: {vin}")
+            return self._failure('Service temporarily unavailable', exc=e)
+        except requests.exceptions.Timeout as e:
             logger.error(f"Timeout for VIN: {vin}")
-            return {'success': False, 'error': 'Request timeout'}
+            return self._failure('Request timeout', exc=e)
         except Exception as e:
             logger.error(f"Carfax HTML exception for VIN {vin}: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            return self._failure(str(e), exc=e)
 
     def get_autocheck_html(self, vin):
         """
@@ -268,65 +311,20 @@ class CheapCarfaxAPI:
             }
         """
         try:
-            url = f'{self.base_url}/autocheck/vin/{vin.upper()}/html'
             logger.info(f"Getting Autocheck HTML for VIN: {vin}")
 
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=30
-            )
-
-            logger.info(f"Autocheck HTML response: {response.status_code}")
-
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"Autocheck HTML generated for VIN: {vin}")
+            response = self._request('autocheck_html', f'/autocheck/vin/{vin.upper()}/html', timeout=30)
+            return self._html_result(response, vin, 'autocheck')
 
-                # Parse the report data
-                parsed_data = self._parse_autocheck_data(data)
-
-                return {
-                    'success': True,
-                    'vin': vin,
-                    'yearMakeModel': data.get('yearMakeModel', ''),
-                    'id': data.get('id', ''),
-                    'html': data.get('html', ''),
-                    'report_data': parsed_data,
-                    'provider': 'autocheck',
-                    'raw_data': data
-                }
-            elif response.status_code == 404:
-                logger.warning(f"VIN not found: {vin}")
-                return {
-                    'success': False,
-                    'error': 'VIN not found in database'
-                }
-            elif response.status_code == 402:
-                logger.error("Insufficient credits")
-                return {
-                    'success': False,
-                    'error': 'Insufficient API credits'
-                }
-            elif response.status_code == 401:
-                logger.error("Unauthorized")
-                return {
-                    'success': False,
-                    'error': 'Invalid API key'
-                }
-            else:
-                logger.error(f"Autocheck HTML failed: {response.status_code} - {response.text}")
-                return {
-                    'success': False,
-                    'error': f'API Error: {response.status_code}'
-                }
-
-        except requests.exceptions.Timeout:
+        except CircuitOpenError as e:
+            logger.warning(f"Autocheck circuit open, skipping VIN: {vin}")
+            return self._failure('Service temporarily unavailable', exc=e)
+        except requests.exceptions.Timeout as e:
             logger.error(f"Timeout for VIN: {vin}")
-            return {'success': False, 'error': 'Request timeout'}
+            return self._failure('Request timeout', exc=e)
         except Exception as e:
             logger.error(f"Autocheck HTML exception for VIN {vin}: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            return self._failure(str(e), exc=e)
 
     def get_report(self, vin, report_type='carfax'):
         """
@@ -349,6 +347,128 @@ class CheapCarfaxAPI:
                 'error': f'Unknown report type: {report_type}'
             }
 
+    # ═══════════════════════════════════════════════════════
+    # RESPONSE -> RESULT DICT (bendra sync ir async klientams)
+    # ═══════════════════════════════════════════════════════
+    # response gali būti requests.Response arba httpx.Response -
+    # abu turi status_code, json() ir text.
+
+    def _report_info_result(self, response, vin):
+        """Report info atsakymas -> result dict"""
+        logger.info(f"Report info response: {response.status_code}")
+
+        if response.status_code == 200:
+            data = response.json()
+            logger.info(f"Report info retrieved for VIN: {vin}")
+            return {
+                'success': True,
+                'vehicle': data.get('vehicle', {}),
+                'carfax_records': data.get('carfax_records', 0),
+                'autocheck_records': data.get('autocheck_records', 0),
+                'sticker': data.get('sticker', 'false')
+            }
+        elif response.status_code == 401:
+            logger.error("Unauthorized - check API key")
+            return {'success': False, 'error': 'Invalid API key'}
+        else:
+            logger.error(f"Report info failed: {response.status_code} - {response.text}")
+            return {'success': False, 'error': f'HTTP {response.status_code}'}
+
+    def _user_info_result(self, response):
+        """User info atsakymas -> result dict"""
+        logger.info(f"User info response: {response.status_code}")
+
+        if response.status_code == 200:
+            data = response.json()
+            logger.info(f"User info retrieved")
+            return {
+                'success': True,
+                '_id': data.get('_id'),
+                'email': data.get('email'),
+                'role': data.get('role')
+            }
+        elif response.status_code == 401:
+            logger.error("Unauthorized - check API key")
+            return {'success': False, 'error': 'Invalid API key'}
+        else:
+            logger.error(f"User info failed: {response.status_code} - {response.text}")
+            return {'success': False, 'error': f'HTTP {response.status_code}'}
+
+    def _user_limits_result(self, response):
+        """User limits atsakymas -> result dict"""
+        logger.info(f"User limits response: {response.status_code}")
+
+        if response.status_code == 200:
+            data = response.json()
+            logger.info(f"User limits: {data.get('credits', 0)} credits remaining")
+            return {
+                'success': True,
+                'daily_limit': data.get('daily_limit', 0),
+                'carfax_reports_left_today': data.get('carfax_reports_left_today', 0),
+                'autocheck_reports_left_today': data.get('autocheck_reports_left_today', 0),
+                'credits': data.get('credits', 0)
+            }
+        elif response.status_code == 401:
+            logger.error("Unauthorized - check API key")
+            return {'success': False, 'error': 'Invalid API key'}
+        else:
+            logger.error(f"User limits failed: {response.status_code} - {response.text}")
+            return {'success': False, 'error': f'HTTP {response.status_code}'}
+
+    def _html_result(self, response, vin, provider):
+        """Carfax/Autocheck HTML atsakymas -> result dict"""
+        label = 'Carfax' if provider == 'carfax' else 'Autocheck'
+        logger.info(f"{label} HTML response: {response.status_code}")
+
+        if response.status_code == 200:
+            data = response.json()
+            logger.info(f"{label} HTML generated for VIN: {vin}")
+
+            # Parse the report data
+            if provider == 'carfax':
+                parsed_data = self._parse_carfax_data(data)
+            else:
+                parsed_data = self._parse_autocheck_data(data)
+
+            return {
+                'success': True,
+                'vin': vin,
+                'yearMakeModel': data.get('yearMakeModel', ''),
+                'id': data.get('id', ''),
+                'html': data.get('html', ''),
+                'report_data': parsed_data,
+                'provider': provider,
+                'raw_data': data
+            }
+        elif response.status_code == 404:
+            logger.warning(f"VIN not found: {vin}")
+            return self._failure('VIN not found in database', status_code=404)
+        elif response.status_code == 402:
+            logger.error("Insufficient credits")
+            return self._failure('Insufficient API credits', status_code=402)
+        elif response.status_code == 401:
+            logger.error("Unauthorized")
+            return self._failure('Invalid API key', status_code=401)
+        else:
+            logger.error(f"{label} HTML failed: {response.status_code} - {response.text}")
+            return self._failure(f'API Error: {response.status_code}', status_code=response.status_code)
+
+    @staticmethod
+    def _failure(error, status_code=0, exc=None):
+        """
+        Nepavykusio HTML fetch'o rezultatas
+
+        Returns:
+            dict: {'success': False, 'error': str, 'status_code': int (0 - be atsakymo),
+                   'retryable': bool (žr. resilience.is_retryable_failure)}
+        """
+        return {
+            'success': False,
+            'error': error,
+            'status_code': status_code,
+            'retryable': is_retryable_failure(status_code, exc),
+        }
+
     def _parse_carfax_data(self, data):
         """
         Parse Carfax HTML data into standardized format
@@ -359,21 +479,7 @@ class CheapCarfaxAPI:
         Returns:
             dict: Standardized report data
         """
-        # Extract key metrics from HTML if possible
-        # For now, return basic structure
-        parsed = {
-            'score': 75,  # Default score
-            'accidents': 0,
-            'owners': 1,
-            'service_records': 0,
-            'title_info': 'Unknown',
-            'vehicle_info': {
-                'yearMakeModel': data.get('yearMakeModel', ''),
-                'id': data.get('id', ''),
-            }
-        }
-
-        return parsed
+        return self._parse_report_html(data)
 
     def _parse_autocheck_data(self, data):
         """
@@ -385,21 +491,26 @@ class CheapCarfaxAPI:
         Returns:
             dict: Standardized report data
         """
-        # Extract key metrics from HTML if possible
-        # For now, return basic structure
-        parsed = {
-            'score': 80,  # Default score
-            'accidents': 0,
-            'owners': 1,
-            'title_info': 'Unknown',
+        return self._parse_report_html(data)
+
+    def _parse_report_html(self, data):
+        """Bendras Carfax/Autocheck HTML -> faktai (report_parser)"""
+        facts = extract_report_facts(data.get('html') or '')
+
+        return {
+            'score': compute_score(facts),
+            'accidents': facts['accidents'] or 0,
+            'owners': facts['owners'],  # None - nežinoma (ne 0 savininkų)
+            'service_records': facts['service_records'] or 0,
+            'title_info': facts['title_info'],
+            'title_brands': facts['title_brands'],
+            'odometer': facts['odometer'],
             'vehicle_info': {
                 'yearMakeModel': data.get('yearMakeModel', ''),
                 'id': data.get('id', ''),
             }
         }
 
-        return parsed
-
 
 # Helper functions for easy use
 def get_carfax_report(vin):
@@ -440,7 +551,7 @@ def get_autocheck_report(vin):
     return api.get_autocheck_html(vin)
 
 
-def check_api_limits():
+def check_api_limits(fresh=False):
     """
     Check current API limits and credits
 
@@ -448,8 +559,119 @@ def check_api_limits():
         limits = check_api_limits()
         print(f"Credits remaining: {limits['credits']}")
 
+    Args:
+        fresh (bool): ignoruoti cache snapshot ir kreiptis į API
+
     Returns:
-        dict: Limits information
+        dict: Limits information (iš cache snapshot, jei yra)
     """
+    if not fresh:
+        snapshot = get_limits_snapshot()
+        if snapshot is not None:
+            return snapshot
+
     api = CheapCarfaxAPI()
-    return api.get_user_limits()
+    limits = api.get_user_limits()
+    if limits['success']:
+        snapshot = dict(limits, fetched_at=timezone.now().isoformat())
+        cache.set(LIMITS_CACHE_KEY, snapshot, timeout=getattr(settings, 'CHEAPCARFAX_LIMITS_TTL', 60 * 30))
+        return snapshot
+    return limits
+
+
+# ═══════════════════════════════════════════════════════
+# UPSTREAM LIMITS SNAPSHOT (cache)
+# ═══════════════════════════════════════════════════════
+# Atnaujinamas fone (Celery beat) ir po kiekvieno pirkimo,
+# kad search_vin / admin nedarytų tinklo užklausos.
+
+LIMITS_CACHE_KEY = 'cheapcarfax:limits'
+LIMITS_REFRESH_GUARD_KEY = 'cheapcarfax:limits:refresh-scheduled'
+
+LIMIT_FIELDS = {
+    'carfax': 'carfax_reports_left_today',
+    'autocheck': 'autocheck_reports_left_today',
+}
+
+
+def refresh_limits_snapshot():
+    """
+    Gauti /api/user/limits ir išsaugoti cache
+
+    Returns:
+        dict: snapshot arba None jei API klaida
+    """
+    limits = check_api_limits(fresh=True)
+    if not limits['success']:
+        logger.error(f"Limits snapshot refresh failed: {limits.get('error')}")
+        return None
+    return limits
+
+
+def _consumed_key(snapshot, field):
+    """Po snapshot'o nupirktų reportų skaitiklis (naujas snapshot - naujas raktas)"""
+    return f"{LIMITS_CACHE_KEY}:consumed:{snapshot.get('fetched_at', '')}:{field}"
+
+
+def get_limits_snapshot():
+    """
+    Paskutinis žinomas limits snapshot (be tinklo užklausos),
+    atėmus po jo nupirktus reportus
+
+    Returns:
+        dict arba None jei snapshot dar nėra
+    """
+    snapshot = cache.get(LIMITS_CACHE_KEY)
+    if snapshot is None:
+        return None
+
+    keys = {field: _consumed_key(snapshot, field) for field in LIMIT_FIELDS.values() if field in snapshot}
+    consumed = cache.get_many(list(keys.values())) if keys else {}
+    for field, key in keys.items():
+        if consumed.get(key):
+            snapshot[field] = max(0, snapshot[field] - int(consumed[key]))
+    return snapshot
+
+
+def has_upstream_quota(report_type):
+    """
+    Ar pagal snapshot dar galima pirkti šio tipo reportą
+
+    Nežinoma būsena (nėra snapshot) laikoma leidžiama - neblokuojame pirkimų
+    vien dėl to, kad fone dar neatnaujinta.
+    """
+    field = LIMIT_FIELDS.get(report_type)
+    snapshot = get_limits_snapshot()
+    if field is None or snapshot is None:
+        return True
+    return snapshot.get(field, 0) > 0
+
+
+def note_report_consumed(report_type):
+    """
+    Po sėkmingo pirkimo: iškart sumažinti snapshot ir suplanuoti tikrą atnaujinimą
+
+    Mažinama atominiu skaitikliu (Redis INCR), ne get/set visam snapshot'ui.
+    Atnaujinimas - vienas per CHEAPCARFAX_LIMITS_REFRESH_DEBOUNCE, ne kiekvienam pirkimui.
+    """
+    field = LIMIT_FIELDS.get(report_type)
+    snapshot = cache.get(LIMITS_CACHE_KEY)
+    if field and snapshot and field in snapshot:
+        key = _consumed_key(snapshot, field)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, timeout=getattr(settings, 'CHEAPCARFAX_LIMITS_TTL', 60 * 30)):
+                cache.incr(key)
+
+    debounce = getattr(settings, 'CHEAPCARFAX_LIMITS_REFRESH_DEBOUNCE', 10)
+    if not cache.add(LIMITS_REFRESH_GUARD_KEY, 1, timeout=debounce):
+        return
+
+    try:
+        from .tasks import refresh_upstream_limits
+        # countdown - vienas atnaujinimas apima visus lango pirkimus
+        refresh_upstream_limits.apply_async(countdown=debounce, retry=False)
+    except Exception as e:
+        cache.delete(LIMITS_REFRESH_GUARD_KEY)
+        logger.warning(f"Could not schedule limits refresh: {str(e)}")
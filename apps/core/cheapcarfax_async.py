@@ -0,0 +1,267 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  CHEAPCARFAX ASYNC API CLIENT                            ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/cheapcarfax_async.py     ║
+║  PASKIRTIS: asyncio CheapCarfax klientas + fan-out      ║
+║  DOCS: https://panel.cheapcarfax.net/api/docs           ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+
+import httpx
+from django.conf import settings
+
+from .cheapcarfax import CheapCarfaxAPI
+from .api_log import log_upstream_call
+from .resilience import CircuitOpenError, RetryPolicy, get_breaker, is_upstream_failure
+from .upstream_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# ═══════════════════════════════════════════════════════
+# POOLED ASYNC TRANSPORT
+# ═══════════════════════════════════════════════════════
+# httpx.AsyncClient negali būti dalinamas tarp event loop'ų,
+# todėl laikomas vienas klientas kiekvienam loop'ui.
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def _build_async_client():
+    """Sukurti httpx.AsyncClient su keep-alive pool"""
+    pool_size = getattr(settings, 'CHEAPCARFAX_POOL_SIZE', 10)
+    idle_timeout = getattr(settings, 'CHEAPCARFAX_POOL_IDLE_TIMEOUT', 60)
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=idle_timeout,
+    )
+    return httpx.AsyncClient(limits=limits)
+
+
+def get_async_http_client():
+    """
+    Grąžina einamam event loop'ui bendrą httpx.AsyncClient
+
+    Returns:
+        httpx.AsyncClient
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _build_async_client()
+        _clients[loop] = client
+    return client
+
+
+async def close_async_http_client():
+    """Uždaryti einamo loop'o klientą"""
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+class AsyncCheapCarfaxAPI(CheapCarfaxAPI):
+    """
+    CheapCarfax API Client (asyncio)
+    Tie patys endpoint'ai, result dict'ai ir _parse_*_data kaip CheapCarfaxAPI
+    """
+
+    async def _arequest(self, endpoint, path, timeout):
+        """
+        Async GET užklausa per bendrą pooled klientą
+
+        Args:
+            endpoint (str): endpoint'o vardas (logams / metrikoms)
+            path (str): kelias po base_url
+            timeout (int): read timeout sekundėmis
+
+        Returns:
+            httpx.Response
+
+        Raises:
+            CircuitOpenError: breaker'is atidarytas - upstream nekviestas
+            httpx.HTTPError: galutinė transporto klaida
+        """
+        breaker = get_breaker(endpoint)
+        policy = RetryPolicy()
+        deadline_at = time.monotonic() + policy.deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            probe = await breaker.abefore_call()
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise httpx.TimeoutException(f'Deadline exceeded for {endpoint}')
+
+            started = time.monotonic()
+            try:
+                with metrics.in_flight(endpoint):
+                    response = await get_async_http_client().get(
+                        f'{self.base_url}{path}',
+                        headers=self.headers,
+                        timeout=httpx.Timeout(min(timeout, remaining), connect=min(self.connect_timeout, remaining))
+                    )
+            except httpx.TransportError as e:
+                latency = time.monotonic() - started
+                metrics.observe(endpoint, 0, latency, timeout=isinstance(e, httpx.TimeoutException))
+                log_upstream_call(endpoint, path, 0, latency, attempt, error=str(e))
+                await breaker.arecord_failure(probe)
+                delay = policy.backoff(attempt, deadline_at) if policy.should_retry_exception(e, endpoint) else None
+                if delay is None:
+                    raise
+                logger.warning(f"{endpoint} attempt {attempt} failed ({str(e)}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            latency = time.monotonic() - started
+            metrics.observe(endpoint, response.status_code, latency)
+            log_upstream_call(
+                endpoint, path, response.status_code, latency, attempt,
+                error='' if response.status_code < 400 else response.text[:500],
+                response_size=len(response.content),
+            )
+
+            if is_upstream_failure(response.status_code):
+                await breaker.arecord_failure(probe)
+                delay = policy.backoff(attempt, deadline_at) if policy.should_retry_status(response.status_code, endpoint) else None
+                if delay is not None:
+                    logger.warning(f"{endpoint} attempt {attempt} got {response.status_code}, retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+            else:
+                await breaker.arecord_success(latency, probe)
+
+            return response
+
+    async def get_report_info(self, vin):
+        """GET /api/reports/{VIN}"""
+        try:
+            logger.info(f"Getting report info for VIN: {vin}")
+
+            response = await self._arequest('report_info', f'/reports/{vin.upper()}', timeout=10)
+            return self._report_info_result(response, vin)
+
+        except Exception as e:
+            logger.error(f"Report info exception: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    async def get_user_info(self):
+        """GET /api/user"""
+        try:
+            logger.info(f"Getting user info")
+
+            response = await self._arequest('user', '/user', timeout=10)
+            return self._user_info_result(response)
+
+        except Exception as e:
+            logger.error(f"User info exception: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    async def get_user_limits(self):
+        """GET /api/user/limits"""
+        try:
+            logger.info(f"Getting user limits")
+
+            response = await self._arequest('user_limits', '/user/limits', timeout=10)
+            return self._user_limits_result(response)
+
+        except Exception as e:
+            logger.error(f"User limits exception: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    async def get_carfax_html(self, vin):
+        """GET /api/carfax/vin/:vin/html"""
+        return await self._get_html(vin, 'carfax')
+
+    async def get_autocheck_html(self, vin):
+        """GET /api/autocheck/vin/:vin/html"""
+        return await self._get_html(vin, 'autocheck')
+
+    async def _get_html(self, vin, provider):
+        """Bendras Carfax/Autocheck HTML užklausos kelias"""
+        label = 'Carfax' if provider == 'carfax' else 'Autocheck'
+        try:
+            logger.info(f"Getting {label} HTML for VIN: {vin}")
+
+            response = await self._arequest(f'{provider}_html', f'/{provider}/vin/{vin.upper()}/html', timeout=30)
+            # JSON decode + HTML parse (~1 s dideliam reportui) - ne event loop'e
+            return await asyncio.to_thread(self._html_result, response, vin, provider)
+
+        except CircuitOpenError as e:
+            logger.warning(f"{label} circuit open, skipping VIN: {vin}")
+            return self._failure('Service temporarily unavailable', exc=e)
+        except httpx.TimeoutException as e:
+            logger.error(f"Timeout for VIN: {vin}")
+            return self._failure('Request timeout', exc=e)
+        except Exception as e:
+            logger.error(f"{label} HTML exception for VIN {vin}: {str(e)}")
+            return self._failure(str(e), exc=e)
+
+    async def get_report(self, vin, report_type='carfax'):
+        """Get report based on type (carfax or autocheck)"""
+        if report_type in ('carfax', 'autocheck'):
+            return await self._get_html(vin, report_type)
+        return {
+            'success': False,
+            'error': f'Unknown report type: {report_type}'
+        }
+
+    async def gather_reports(self, items, concurrency=None):
+        """
+        Gauti daug ataskaitų vienu metu su concurrency riba
+
+        Usage:
+            api = AsyncCheapCarfaxAPI()
+            results = await api.gather_reports([(vin1, 'carfax'), (vin2, 'autocheck')])
+
+        Args:
+            items (iterable): (vin, report_type) poros
+            concurrency (int): max vienu metu vykdomų užklausų
+
+        Returns:
+            list: result dict'ai ta pačia tvarka kaip items
+        """
+        if concurrency is None:
+            concurrency = getattr(settings, 'CHEAPCARFAX_ASYNC_CONCURRENCY', 10)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(vin, report_type):
+            async with semaphore:
+                return await self.get_report(vin, report_type)
+
+        return await asyncio.gather(*(
+            fetch_one(vin, report_type) for vin, report_type in items
+        ))
+
+
+def gather_reports(items, concurrency=None):
+    """
+    Sinchroninis wrapper batch job'ams / management komandoms
+
+    Usage:
+        results = gather_reports([('1HGBH41JXMN109186', 'carfax')], concurrency=5)
+
+    Args:
+        items (iterable): (vin, report_type) poros
+        concurrency (int): max vienu metu vykdomų užklausų
+
+    Returns:
+        list: result dict'ai ta pačia tvarka kaip items
+    """
+    async def run():
+        try:
+            return await AsyncCheapCarfaxAPI().gather_reports(items, concurrency)
+        finally:
+            await close_async_http_client()
+
+    return asyncio.run(run())
@@ -0,0 +1,148 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  REPORT HTML COMPRESSION                                 ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/compression.py           ║
+║  PASKIRTIS: gzip / zstd suspaudimas ReportContent       ║
+║  + gzip / brotli Content-Encoding report body endpoint  ║
+║  zstd / br naudojami tik jei įdiegti paketai            ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+import gzip
+import logging
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_GZIP = 'gzip'
+CODEC_ZSTD = 'zstd'
+CODEC_NONE = 'none'
+
+CODEC_CHOICES = (
+    (CODEC_GZIP, 'gzip'),
+    (CODEC_ZSTD, 'zstd'),
+    (CODEC_NONE, 'None'),
+)
+
+DEFAULT_LEVELS = {CODEC_GZIP: 6, CODEC_ZSTD: 10}
+
+
+def default_codec():
+    """Settings codec; zstd -> gzip jei zstandard neįdiegtas"""
+    codec = getattr(settings, 'REPORT_HTML_CODEC', CODEC_GZIP)
+    if codec == CODEC_ZSTD and zstandard is None:
+        logger.warning("REPORT_HTML_CODEC=zstd but zstandard is not installed, using gzip")
+        return CODEC_GZIP
+    return codec
+
+
+def compress_html(html, codec=None, level=None):
+    """
+    Suspausti HTML
+
+    Args:
+        html (str): HTML dokumentas
+        codec (str): 'gzip', 'zstd' arba 'none' (default: REPORT_HTML_CODEC)
+        level (int): suspaudimo lygis (default: REPORT_HTML_COMPRESSION_LEVEL)
+
+    Returns:
+        tuple: (codec, bytes)
+    """
+    codec = codec or default_codec()
+    if level is None:
+        level = getattr(settings, 'REPORT_HTML_COMPRESSION_LEVEL', None) or DEFAULT_LEVELS.get(codec)
+    raw = html.encode('utf-8')
+
+    if codec == CODEC_GZIP:
+        # mtime=0 - tas pats HTML visada duoda tuos pačius baitus
+        return codec, gzip.compress(raw, compresslevel=level, mtime=0)
+    if codec == CODEC_ZSTD:
+        return codec, zstandard.ZstdCompressor(level=level).compress(raw)
+    if codec == CODEC_NONE:
+        return codec, raw
+    raise ValueError(f'Unknown compression codec: {codec}')
+
+
+def decompress_html(codec, data):
+    """
+    Išskleisti HTML
+
+    Args:
+        codec (str): 'gzip', 'zstd' arba 'none'
+        data (bytes | memoryview): suspausti baitai
+
+    Returns:
+        str
+    """
+    data = bytes(data)
+    if codec == CODEC_GZIP:
+        raw = gzip.decompress(data)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd compressed reports')
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == CODEC_NONE:
+        raw = data
+    else:
+        raise ValueError(f'Unknown compression codec: {codec}')
+    return raw.decode('utf-8')
+
+
+# ═══════════════════════════════════════════════════════
+# HTTP CONTENT-ENCODING
+# ═══════════════════════════════════════════════════════
+
+def transfer_encodings():
+    """Serverio palaikomi Content-Encoding (pirmumo tvarka)"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pasirinkti Content-Encoding pagal Accept-Encoding header
+
+    Returns:
+        str: 'br', 'gzip' arba 'identity'
+    """
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+
+    for encoding in transfer_encodings():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return 'identity'
+
+
+def encode_for_transfer(html, encoding):
+    """
+    HTML -> baitai pasirinktam Content-Encoding
+
+    Args:
+        html (str): HTML dokumentas
+        encoding (str): 'br', 'gzip' arba 'identity'
+
+    Returns:
+        bytes
+    """
+    raw = html.encode('utf-8')
+    if encoding == 'br':
+        return brotli.compress(raw, quality=getattr(settings, 'REPORT_BODY_BROTLI_QUALITY', 9))
+    if encoding == 'gzip':
+        return gzip.compress(raw, compresslevel=DEFAULT_LEVELS[CODEC_GZIP], mtime=0)
+    return raw
@@ -0,0 +1,222 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  FAKE CHEAPCARFAX SERVER                                 ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/fake_cheapcarfax.py      ║
+║  PASKIRTIS: Lokalus CheapCarfax API pakaitalas load     ║
+║  testams: sample_reports HTML, latency, klaidos,        ║
+║  timeout'ai (python manage.py fake_cheapcarfax)         ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import zlib
+
+from .sample_reports import generate_report_html, sample_facts
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+ROUTES = (
+    ('report_info', re.compile(r'^/reports/(?P<vin>[A-Za-z0-9]{17})$')),
+    ('carfax_html', re.compile(r'^/carfax/vin/(?P<vin>[A-Za-z0-9]{17})/html$')),
+    ('autocheck_html', re.compile(r'^/autocheck/vin/(?P<vin>[A-Za-z0-9]{17})/html$')),
+    ('user', re.compile(r'^/user$')),
+    ('user_limits', re.compile(r'^/user/limits$')),
+)
+
+ERROR_BODIES = {
+    401: {'message': 'Unauthorized'},
+    402: {'message': 'Insufficient credits'},
+    404: {'message': 'VIN not found'},
+    500: {'message': 'Internal server error'},
+    502: {'message': 'Bad gateway'},
+    503: {'message': 'Service unavailable'},
+}
+
+
+class FakeServerConfig:
+    """
+    Fake serverio elgsena
+
+    Args:
+        api_key (str): reikalaujamas x-api-key ('' - bet koks)
+        report_bytes (int): HTML reporto dydis
+        latency (str): pasiskirstymas - LATENCY_DISTRIBUTIONS
+        latency_ms (float): vidurkis (fixed - tiksli reikšmė)
+        latency_jitter (float): sklaida, santykinė (0.5 = ±50% / sigma)
+        error_rates (dict): {401: 0.01, 402: 0.0, 404: 0.02, 500: 0.01, 503: 0.01}
+        timeout_rate (float): dalis užklausų, kurios "pakimba" timeout_seconds
+        timeout_seconds (float): kiek laikyti pakibusią užklausą
+        seed (int): atsitiktinumo seed'as (None - nedeterministinis)
+    """
+
+    def __init__(self, api_key='', report_bytes=2_000_000, latency='lognormal', latency_ms=800.0,
+                 latency_jitter=0.5, error_rates=None, timeout_rate=0.0, timeout_seconds=35.0, seed=None):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f'Unknown latency distribution: {latency}')
+        self.api_key = api_key
+        self.report_bytes = report_bytes
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_jitter = latency_jitter
+        self.error_rates = {int(status): rate for status, rate in (error_rates or {}).items() if rate > 0}
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def sample_latency(self):
+        """Vienos užklausos vėlinimas sekundėmis"""
+        mean = self.latency_ms / 1000
+        jitter = self.latency_jitter
+        with self.rng_lock:
+            if self.latency == 'fixed':
+                value = mean
+            elif self.latency == 'uniform':
+                value = self.rng.uniform(mean * (1 - jitter), mean * (1 + jitter))
+            elif self.latency == 'normal':
+                value = self.rng.gauss(mean, mean * jitter)
+            elif self.latency == 'lognormal':
+                # mu parenkamas taip, kad vidurkis būtų latency_ms
+                value = self.rng.lognormvariate(0, jitter) * mean / math.exp(jitter ** 2 / 2)
+            else:
+                value = self.rng.expovariate(1 / mean) if mean > 0 else 0
+        return max(0.0, value)
+
+    def sample_fault(self):
+        """
+        Returns:
+            'timeout', HTTP statusas (int) arba None - normalus atsakymas
+        """
+        with self.rng_lock:
+            roll = self.rng.random()
+        if roll < self.timeout_rate:
+            return 'timeout'
+        roll -= self.timeout_rate
+        for status, rate in sorted(self.error_rates.items()):
+            if roll < rate:
+                return status
+            roll -= rate
+        return None
+
+
+TEMPLATE_VIN = '1FAKE0CHEAPCARFAX'
+TEMPLATE_VARIANTS = 16
+
+
+@lru_cache(maxsize=2 * TEMPLATE_VARIANTS)
+def _html_template(provider, variant, report_bytes):
+    """Reporto šablonas - generavimas brangus, todėl VIN'ai dalinasi TEMPLATE_VARIANTS šablonų"""
+    facts = sample_facts(variant)
+    make, model = facts['make_model']
+    html = generate_report_html(TEMPLATE_VIN, provider, report_bytes, seed=variant, facts=facts)
+    return f"{facts['year']} {make} {model}", html
+
+
+def _html_payload(vin, provider, report_bytes):
+    """CheapCarfax /{provider}/vin/{vin}/html atsakymo kūnas"""
+    seed = zlib.crc32(vin.encode())
+    year_make_model, html = _html_template(provider, seed % TEMPLATE_VARIANTS, report_bytes)
+    body = {
+        'yearMakeModel': year_make_model,
+        'id': f'{provider}-{seed:08x}',
+        'html': html.replace(TEMPLATE_VIN, vin),
+    }
+    return json.dumps(body).encode()
+
+
+def _report_info(vin):
+    facts = sample_facts(zlib.crc32(vin.encode()) % TEMPLATE_VARIANTS)
+    make, model = facts['make_model']
+    return {
+        'vehicle': {'vin': vin, 'year': facts['year'], 'make': make, 'model': model},
+        'carfax_records': facts['service_records'] + facts['owners'],
+        'autocheck_records': facts['service_records'] // 2 + facts['owners'],
+        'sticker': 'false',
+    }
+
+
+def _account_body(endpoint):
+    if endpoint == 'user':
+        return {'_id': 'fake-user', 'email': 'loadtest@example.com', 'role': 'user'}
+    return {
+        'daily_limit': 100000,
+        'carfax_reports_left_today': 100000,
+        'autocheck_reports_left_today': 100000,
+        'credits': 100000,
+    }
+
+
+def make_handler(config):
+    """BaseHTTPRequestHandler klasė su config"""
+
+    class FakeCheapCarfaxHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, kaip tikras API
+        server_version = 'FakeCheapCarfax/1.0'
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+        def _send(self, status, body):
+            payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path.startswith('/api/'):
+                path = path[len('/api'):]
+
+            for endpoint, pattern in ROUTES:
+                match = pattern.match(path)
+                if match:
+                    break
+            else:
+                return self._send(404, {'message': 'Not found'})
+
+            if config.api_key and self.headers.get('x-api-key') != config.api_key:
+                return self._send(401, ERROR_BODIES[401])
+
+            time.sleep(config.sample_latency())
+            fault = config.sample_fault()
+            if fault == 'timeout':
+                # Klientas turi nutraukti pagal savo read timeout
+                time.sleep(config.timeout_seconds)
+                return self._send(504, {'message': 'Gateway timeout'})
+            if fault is not None:
+                return self._send(fault, ERROR_BODIES.get(fault, {'message': f'HTTP {fault}'}))
+
+            if endpoint in ('carfax_html', 'autocheck_html'):
+                provider = endpoint.split('_')[0]
+                return self._send(200, _html_payload(match.group('vin').upper(), provider, config.report_bytes))
+            if endpoint == 'report_info':
+                return self._send(200, _report_info(match.group('vin').upper()))
+            return self._send(200, _account_body(endpoint))
+
+    return FakeCheapCarfaxHandler
+
+
+def make_server(host, port, config):
+    """
+    ThreadingHTTPServer (neužblokuotas - serve_forever kviečia iškvietėjas)
+
+    Returns:
+        ThreadingHTTPServer: server.server_address - tikras (host, port)
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    return server
+
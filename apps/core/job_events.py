@@ -0,0 +1,100 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  REPORT JOB EVENTS (PUB/SUB)                             ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/job_events.py            ║
+║  PASKIRTIS: ReportJob būsenų perėjimai per Redis        ║
+║  pub/sub -> SSE stream (report_job_events view)         ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from functools import lru_cache
+import json
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'reportjobs:user'
+
+
+def channel_name(user_id):
+    """Vartotojo job'ų kanalas"""
+    return f'{CHANNEL_PREFIX}:{user_id}'
+
+
+def job_event(job):
+    """ReportJob -> event dict (tas pats formatas SSE ir pub/sub)"""
+    return {
+        'id': str(job.id),
+        'vin': job.vin,
+        'report_type': job.report_type,
+        'status': job.status,
+        'error': job.error,
+        'report_id': job.report_id,
+    }
+
+
+def _redis_url():
+    """
+    Pub/sub Redis - vienas URL publish ir subscribe pusėms
+    (pub/sub ignoruoja DB indeksą, bet ne serverį - cache gali būti kitame instance)
+    """
+    return getattr(settings, 'JOB_EVENTS_REDIS_URL', None) or getattr(settings, 'REDIS_URL', 'redis://localhost:6379')
+
+
+@lru_cache(maxsize=None)
+def _sync_client(url):
+    """Sync klientas (connection pool) vienam URL - bendras visiems thread'ams"""
+    import redis
+
+    return redis.Redis.from_url(url)
+
+
+def publish(job):
+    """
+    Paskelbti job būseną (niekada nemeta klaidos - pub/sub tik optimizacija,
+    būsena visada yra DB ir pasiekiama per api_report_job_status)
+    """
+    try:
+        _sync_client(_redis_url()).publish(channel_name(job.user_id), json.dumps(job_event(job)))
+    except Exception as e:
+        logger.warning(f"Job event publish failed for {job.id}: {str(e)}")
+
+
+def subscribe(user_id):
+    """
+    Async pub/sub prenumerata vartotojo job'ų event'ams
+
+    Usage:
+        async with subscribe(user.id) as pubsub:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=15)
+
+    Returns:
+        async context manager -> redis.asyncio PubSub
+    """
+    return _Subscription(channel_name(user_id))
+
+
+class _Subscription:
+    """redis.asyncio klientas + PubSub, uždaromi kartu"""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.client = None
+        self.pubsub = None
+
+    async def __aenter__(self):
+        import redis.asyncio as aioredis
+
+        self.client = aioredis.from_url(_redis_url())
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(self.channel)
+        return self.pubsub
+
+    async def __aexit__(self, *exc):
+        try:
+            await self.pubsub.aclose()
+        finally:
+            await self.client.aclose()
@@ -0,0 +1,110 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  BACKFILL REPORT CONTENT                                 ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py backfill_report_content        ║
+║  Seną Report.report_html -> suspaustas ReportContent    ║
+║  Mažais batch'ais pagal id - be ilgų lock'ų; paleisti   ║
+║  prieš migraciją 0013_remove_report_report_html         ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.core.models import Report, ReportContent
+
+COLUMN = 'report_html'
+
+
+class Command(BaseCommand):
+    help = 'Move legacy Report.report_html into compressed report_contents rows in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Rows per batch (default: 100)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.2,
+            help='Pause between batches in seconds (default: 0.2)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count rows that would be moved',
+        )
+
+    def _has_column(self, table):
+        with connection.cursor() as cursor:
+            return any(
+                column.name == COLUMN
+                for column in connection.introspection.get_table_description(cursor, table)
+            )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        table = Report._meta.db_table
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('🗜️  Backfilling report_contents'))
+        self.stdout.write('=' * 60)
+
+        if not self._has_column(table):
+            self.stdout.write(self.style.SUCCESS(f'✅ {table}.{COLUMN} already dropped - nothing to do'))
+            return
+
+        # Modelis report_html nebeturi - skaitoma tiesiogiai SQL
+        qn = connection.ops.quote_name
+        select_sql = (
+            f'SELECT {qn("id")}, {qn(COLUMN)} FROM {qn(table)} '
+            f'WHERE {qn("id")} > %s AND {qn(COLUMN)} IS NOT NULL AND {qn(COLUMN)} <> %s '
+            f'ORDER BY {qn("id")} LIMIT %s'
+        )
+
+        moved = 0
+        last_id = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(select_sql, [last_id, '', batch_size])
+                rows = cursor.fetchall()
+            if not rows:
+                break
+
+            ids = [report_id for report_id, _ in rows]
+            last_id = ids[-1]
+            if options['dry_run']:
+                moved += len(rows)
+                continue
+
+            contents = [ReportContent(report_id=report_id, **ReportContent.build_fields(html)) for report_id, html in rows]
+            placeholders = ', '.join(['%s'] * len(ids))
+            # Trumpa transakcija - lock'inamos tik šio batch'o eilutės; report_html išvalomas,
+            # todėl pertrauktas paleidimas tęsiasi nuo neperkeltų eilučių
+            with transaction.atomic():
+                ReportContent.objects.bulk_create(contents, ignore_conflicts=True)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'UPDATE {qn(table)} SET {qn("html_available")} = %s, {qn(COLUMN)} = NULL '
+                        f'WHERE {qn("id")} IN ({placeholders})',
+                        [True, *ids],
+                    )
+
+            moved += len(rows)
+            self.stdout.write(f'  ...{moved} reports moved (last id {last_id})')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{moved} reports would be moved'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Done: HTML moved to report_contents for {moved} reports - '
+            f'migration 0013_remove_report_report_html can run now'
+        ))
@@ -0,0 +1,106 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  HOT-PATH BENCHMARKS                                     ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py bench_hotpaths                 ║
+║         python manage.py bench_hotpaths --save-baseline ║
+║  Atskira test DB, be tinklo; p50/p95 + SQL užklausos    ║
+║  lyginama su apps/core/bench_baseline.json              ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.core import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark hot paths (views, ORM, upstream client, balance) offline and compare with the stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=sorted(benchmarks.CASES),
+            help='Run only these benchmarks',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=30,
+            help='Measured iterations per benchmark (default: 30)',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Relative p50 slowdown flagged as regression (default: 0.25)',
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default=str(benchmarks.BASELINE_PATH),
+            help='Baseline JSON file (default: apps/core/bench_baseline.json)',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Write the results as the new baseline instead of comparing',
+        )
+
+    def handle(self, *args, **options):
+        rounds = max(1, options['rounds'])
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('⏱️  Hot-path benchmarks'))
+        self.stdout.write('=' * 60)
+
+        # Atskira test DB - jokių duomenų darbinėje DB
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            ctx = benchmarks.BenchContext()
+            with benchmarks.offline_environment(ctx.carfax_html):
+                results = benchmarks.run_all(ctx, options['only'], rounds=rounds)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            if options['only']:
+                raise CommandError('--save-baseline requires running all benchmarks (drop --only)')
+            benchmarks.save_baseline(results, rounds, options['baseline'])
+            for name, result in results.items():
+                self.stdout.write(f"  {name:<24} p50 {result['p50_ms']:>9.2f} ms  {result['queries']:>3} queries")
+            self.stdout.write(self.style.SUCCESS(f"✅ Baseline saved to {options['baseline']}"))
+            return
+
+        baseline = benchmarks.load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(f"No baseline at {options['baseline']} (run with --save-baseline)"))
+        elif baseline['meta'].get('database') != connection.vendor:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded on {baseline['meta'].get('database')}, running on {connection.vendor}"
+            ))
+
+        rows = benchmarks.compare(results, baseline, options['threshold'])
+        self.stdout.write(f"{'benchmark':<24} {'baseline':>10} {'current':>10} {'change':>8} {'queries':>8}  status")
+        self.stdout.write('-' * 72)
+        for row in rows:
+            base = f"{row['baseline_ms']:.2f}" if row['baseline_ms'] is not None else '-'
+            change = f"{row['change']:+.0%}" if row['change'] is not None else '-'
+            line = (
+                f"{row['name']:<24} {base:>10} {row['current_ms']:>10.2f} {change:>8} "
+                f"{row['queries']:>3}/{benchmarks.CASES[row['name']]['max_queries']:<4}  {row['status']}"
+            )
+            style = self.style.ERROR if row['status'] in ('slower', 'queries') else (
+                self.style.SUCCESS if row['status'] == 'faster' else None
+            )
+            self.stdout.write(style(line) if style else line)
+
+        regressions = [row['name'] for row in rows if row['status'] in ('slower', 'queries')]
+        if regressions:
+            raise CommandError(f"Regressions: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS('✅ No regressions'))
@@ -0,0 +1,101 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  REPORT PARSER BENCHMARK                                 ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py bench_report_parser            ║
+║         python manage.py bench_report_parser --corpus D ║
+║  Matuoja: MB/s, p50/p95 latency, peak atmintis          ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from pathlib import Path
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.report_parser import compute_score, extract_report_facts
+from apps.core.sample_reports import generate_report_html
+
+
+class Command(BaseCommand):
+    help = 'Benchmark Carfax/Autocheck HTML extractor over a corpus of sample reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            type=str,
+            help='Directory with *.html reports (default: synthetic reports)',
+        )
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=20,
+            help='Synthetic reports to generate (default: 20)',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=2_000_000,
+            help='Synthetic report size in bytes (default: 2000000)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='Passes over the corpus (default: 3)',
+        )
+
+    def _load_corpus(self, options):
+        if options['corpus']:
+            paths = sorted(Path(options['corpus']).glob('*.html'))
+            if not paths:
+                raise CommandError(f"No *.html files in {options['corpus']}")
+            return [(path.name, path.read_text(encoding='utf-8', errors='replace')) for path in paths]
+
+        corpus = []
+        for seed in range(options['count']):
+            provider = 'carfax' if seed % 2 == 0 else 'autocheck'
+            vin = f'1HGBH41JXMN{seed:06d}'
+            corpus.append((f'{provider}-{seed}', generate_report_html(vin, provider, options['size'], seed)))
+        return corpus
+
+    def handle(self, *args, **options):
+        corpus = self._load_corpus(options)
+        total_bytes = sum(len(html) for _, html in corpus)
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('📄 Report Parser Benchmark'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Reports: {len(corpus)} ({total_bytes / 1024 / 1024:.1f} MB), rounds: {options["rounds"]}')
+
+        timings = []
+        for _ in range(options['rounds']):
+            for _, html in corpus:
+                started = time.perf_counter()
+                compute_score(extract_report_facts(html))
+                timings.append(time.perf_counter() - started)
+
+        # Atmintis matuojama atskirai (tracemalloc lėtina parse'inimą)
+        peak = 0
+        for _, html in corpus:
+            tracemalloc.start()
+            extract_report_facts(html)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        elapsed = sum(timings)
+        quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        self.stdout.write(f'Throughput: {total_bytes * options["rounds"] / 1024 / 1024 / elapsed:.1f} MB/s')
+        self.stdout.write(f'p50: {quantiles[49] * 1000:.1f} ms, p95: {quantiles[94] * 1000:.1f} ms, max: {max(timings) * 1000:.1f} ms')
+        self.stdout.write(f'Peak extractor memory: {peak / 1024:.0f} KB')
+
+        name, html = corpus[0]
+        facts = extract_report_facts(html)
+        self.stdout.write('-' * 60)
+        self.stdout.write(
+            f"{name}: owners={facts['owners']} accidents={facts['accidents']} "
+            f"service={facts['service_records']} title={facts['title_info']} "
+            f"odometer={facts['odometer']['last']} score={compute_score(facts)}"
+        )
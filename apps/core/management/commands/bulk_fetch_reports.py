@@ -0,0 +1,249 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  BULK FETCH REPORTS                                      ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py bulk_fetch_reports             ║
+║         --user ops --file vins.csv --workers 8 --rate 4 ║
+║  Back-office: VIN sąrašas -> fetch_vehicle_report ->    ║
+║  Report bulk įrašymas; tęsiama nuo checkpoint'o         ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal
+import hashlib
+import statistics
+import sys
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from apps.core.api import fetch_vehicle_report, storable_report_data
+from apps.core.models import Report, ReportContent, UserReportStats
+from apps.core.services import parse_vin_list
+
+CHECKPOINT_PREFIX = 'bulk_fetch_reports'
+
+
+class RateLimiter:
+    """Tolygus N užklausų/s limitas, bendras visiems worker thread'ams"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_at, now)
+            self.next_at = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Command(BaseCommand):
+    help = 'Fetch reports for a VIN list (file or stdin) with a worker pool, rate limit and resumable checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            required=True,
+            help='Username that will own the created reports',
+        )
+        parser.add_argument(
+            '--file',
+            type=str,
+            default='-',
+            help='CSV / newline VIN list (default: stdin)',
+        )
+        parser.add_argument(
+            '--type',
+            type=str,
+            default='carfax',
+            choices=[choice for choice, _ in Report.REPORT_TYPES],
+            help='Report type (default: carfax)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Parallel upstream fetches (default: 4)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=2.0,
+            help='Max upstream requests per second, 0 - unlimited (default: 2)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Reports written per bulk insert (default: 50)',
+        )
+        parser.add_argument(
+            '--price',
+            type=str,
+            default='0',
+            help='price_paid for created reports, balance is not charged (default: 0)',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Skip the shared report cache (Redis and stored reports) and fetch fresh from upstream',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore saved checkpoint and fetch every VIN again',
+        )
+
+    def _read_vins(self, path):
+        if path == '-':
+            return sys.stdin.read()
+        try:
+            with open(path, encoding='utf-8-sig', errors='replace') as f:
+                return f.read()
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def _fetch(self, vin, report_type, limiter, refresh):
+        """Worker thread: (vin, report dict arba None, latency s)"""
+        limiter.wait()
+        started = time.perf_counter()
+        try:
+            report = fetch_vehicle_report(vin, report_type, refresh=refresh)
+        except Exception as e:
+            self.stderr.write(f'  {vin}: {e}')
+            report = None
+        finally:
+            connections.close_all()
+        return vin, report, time.perf_counter() - started
+
+    def _flush(self, user, report_type, price, buffer):
+        """Report + ReportContent bulk insert vienoje transakcijoje"""
+        reports = [
+            Report(
+                user=user,
+                vin=vin,
+                report_type=report_type,
+                report_data=storable_report_data(data),
+                html_available=bool(data.get('html')),
+                price_paid=price,
+                score=data.get('score', 0),
+                accidents=data.get('accidents', 0),
+                owners=data.get('owners'),
+            )
+            for vin, data in buffer
+        ]
+        with transaction.atomic():
+            Report.objects.bulk_create(reports)
+            ReportContent.objects.bulk_create([
+                ReportContent(report_id=report.id, **ReportContent.build_fields(data['html']))
+                for report, (_, data) in zip(reports, buffer)
+                if data.get('html')
+            ])
+            # bulk_create nesiunčia post_save - skaitikliai atnaujinami čia
+            UserReportStats.record(user.id, report_type, price * len(reports), count=len(reports))
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found")
+
+        report_type = options['type']
+        price = Decimal(options['price'])
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+
+        vins, invalid, duplicates = parse_vin_list(self._read_vins(options['file']))
+        if not vins:
+            raise CommandError('No valid VINs found')
+
+        # Checkpoint - pagal VIN sąrašą, tipą ir vartotoją
+        digest = hashlib.sha1(f'{user.id}:{report_type}:{",".join(vins)}'.encode()).hexdigest()[:16]
+        checkpoint_key = f'{CHECKPOINT_PREFIX}:{digest}'
+        done = set() if options['restart'] else set(cache.get(checkpoint_key) or ())
+        todo = [vin for vin in vins if vin not in done]
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('🚚 Bulk fetching reports'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(
+            f'{len(vins)} VINs ({len(invalid)} invalid, {duplicates} duplicates), '
+            f'{len(done)} already done, {len(todo)} to fetch'
+        )
+        self.stdout.write(f'Workers: {workers}, rate: {options["rate"] or "unlimited"}/s, type: {report_type}')
+
+        limiter = RateLimiter(options['rate'])
+        latencies = []
+        failed = []
+        buffer = []
+        saved = 0
+        started = time.perf_counter()
+
+        def flush():
+            nonlocal saved
+            if not buffer:
+                return
+            self._flush(user, report_type, price, buffer)
+            saved += len(buffer)
+            done.update(vin for vin, _ in buffer)
+            cache.set(checkpoint_key, sorted(done), timeout=None)
+            buffer.clear()
+            self.stdout.write(f'  ...{saved}/{len(todo)} saved')
+
+        pending = iter(todo)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-fetch') as executor:
+            in_flight = set()
+
+            def submit_next():
+                vin = next(pending, None)
+                if vin is not None:
+                    in_flight.add(executor.submit(self._fetch, vin, report_type, limiter, options['refresh']))
+
+            # Eilėje laikoma tik ~2x workers - dideli sąrašai neužpildo atminties
+            for _ in range(workers * 2):
+                submit_next()
+
+            try:
+                while in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        in_flight.discard(future)
+                        vin, report, latency = future.result()
+                        latencies.append(latency)
+                        if report:
+                            buffer.append((vin, report))
+                        else:
+                            failed.append(vin)
+                        submit_next()
+                    if len(buffer) >= batch_size:
+                        flush()
+            finally:
+                # Ctrl+C - jau gauti reportai įrašomi, checkpoint'as išsaugomas
+                for future in in_flight:
+                    future.cancel()
+                flush()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('-' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✅ Saved {saved} reports, {len(failed)} failed in {elapsed:.1f}s'))
+        if latencies:
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(f'Throughput: {len(latencies) / elapsed:.2f} VIN/s')
+            self.stdout.write(
+                f'Latency p50: {quantiles[49] * 1000:.0f} ms, p95: {quantiles[94] * 1000:.0f} ms, '
+                f'p99: {quantiles[98] * 1000:.0f} ms'
+            )
+        if failed:
+            self.stdout.write(self.style.WARNING(f'Failed (rerun to retry): {", ".join(failed[:20])}'))
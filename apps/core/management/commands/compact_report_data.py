@@ -0,0 +1,123 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  COMPACT REPORT DATA                                     ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py compact_report_data            ║
+║         python manage.py compact_report_data --restart  ║
+║  Išmeta html/raw_data kopijas iš Report.report_data     ║
+║  Mažais batch'ais pagal id - be ilgų lock'ų             ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from apps.core.api import storable_report_data
+from apps.core.models import Report, ReportContent
+
+CHECKPOINT_KEY = 'compact_report_data:last_id'
+
+
+class Command(BaseCommand):
+    help = 'Remove duplicated HTML (html/raw_data) from Report.report_data in small resumable batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Rows per batch (default: 50 - rows can hold several MB each)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.2,
+            help='Pause between batches in seconds (default: 0.2)',
+        )
+        parser.add_argument(
+            '--after-id',
+            type=int,
+            help='Start after this Report id (default: saved checkpoint)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore saved checkpoint and start from the beginning',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count rows that would be compacted',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+
+        if options['after_id'] is not None:
+            last_id = options['after_id']
+        elif options['restart']:
+            last_id = 0
+        else:
+            last_id = cache.get(CHECKPOINT_KEY) or 0
+
+        bloated = Q(report_data__has_key='html') | Q(report_data__has_key='raw_data')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('🗜️  Compacting Report.report_data'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Starting after id {last_id}, batch size {batch_size}' + (' (dry run)' if dry_run else ''))
+
+        compacted = 0
+        moved_html = 0
+        while True:
+            ids = list(
+                Report.objects
+                .filter(bloated, id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            if dry_run:
+                compacted += len(ids)
+                last_id = ids[-1]
+                continue
+
+            reports = list(Report.objects.filter(id__in=ids).only('id', 'report_data', 'html_available'))
+            contents = []
+            for report in reports:
+                data = report.report_data or {}
+                html = data.get('html') or (data.get('raw_data') or {}).get('html')
+                if not report.html_available and html:
+                    # HTML buvo tik JSON'e - perkeliame į ReportContent (vienintelė kopija)
+                    contents.append(ReportContent(report_id=report.id, **ReportContent.build_fields(html)))
+                    report.html_available = True
+                report.report_data = storable_report_data(data)
+
+            # Trumpa transakcija - lock'inamos tik šio batch'o eilutės
+            with transaction.atomic():
+                ReportContent.objects.bulk_create(contents, ignore_conflicts=True)
+                Report.objects.bulk_update(reports, ['report_data', 'html_available'])
+
+            moved_html += len(contents)
+            compacted += len(reports)
+            last_id = ids[-1]
+            cache.set(CHECKPOINT_KEY, last_id, timeout=None)
+            self.stdout.write(f'  ...{compacted} rows compacted (last id {last_id})')
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'{compacted} rows would be compacted'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Done: {compacted} rows compacted, HTML moved to report_contents for {moved_html}'
+        ))
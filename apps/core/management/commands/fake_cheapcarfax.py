@@ -0,0 +1,111 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  FAKE CHEAPCARFAX SERVER                                 ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py fake_cheapcarfax               ║
+║         --latency lognormal --latency-ms 800            ║
+║         --error-503 0.02 --timeout-rate 0.01            ║
+║  App: CHEAPCARFAX_API_URL=http://127.0.0.1:8765/api     ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.fake_cheapcarfax import LATENCY_DISTRIBUTIONS, FakeServerConfig, make_server
+
+ERROR_STATUSES = (401, 402, 404, 500, 502, 503)
+
+
+class Command(BaseCommand):
+    help = 'Run a local CheapCarfax stand-in with realistic HTML reports, latency and fault injection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Port (default: 8765)')
+        parser.add_argument(
+            '--api-key',
+            type=str,
+            default='',
+            help='Require this x-api-key (default: accept any)',
+        )
+        parser.add_argument(
+            '--report-bytes',
+            type=int,
+            default=2_000_000,
+            help='HTML report size in bytes (default: 2000000)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=str,
+            default='lognormal',
+            choices=LATENCY_DISTRIBUTIONS,
+            help='Latency distribution (default: lognormal)',
+        )
+        parser.add_argument('--latency-ms', type=float, default=800.0, help='Mean latency in ms (default: 800)')
+        parser.add_argument(
+            '--latency-jitter',
+            type=float,
+            default=0.5,
+            help='Relative spread: uniform ±, normal/lognormal sigma (default: 0.5)',
+        )
+        for status in ERROR_STATUSES:
+            parser.add_argument(
+                f'--error-{status}',
+                type=float,
+                default=0.0,
+                help=f'Share of requests answered with HTTP {status} (default: 0)',
+            )
+        parser.add_argument(
+            '--timeout-rate',
+            type=float,
+            default=0.0,
+            help='Share of requests that hang for --timeout-seconds (default: 0)',
+        )
+        parser.add_argument(
+            '--timeout-seconds',
+            type=float,
+            default=35.0,
+            help='How long a hanging request is held (default: 35, above the 30s client timeout)',
+        )
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible runs')
+
+    def handle(self, *args, **options):
+        error_rates = {status: options[f'error_{status}'] for status in ERROR_STATUSES}
+        if sum(error_rates.values()) + options['timeout_rate'] > 1:
+            raise CommandError('Error and timeout rates add up to more than 1')
+
+        config = FakeServerConfig(
+            api_key=options['api_key'],
+            report_bytes=options['report_bytes'],
+            latency=options['latency'],
+            latency_ms=options['latency_ms'],
+            latency_jitter=options['latency_jitter'],
+            error_rates=error_rates,
+            timeout_rate=options['timeout_rate'],
+            timeout_seconds=options['timeout_seconds'],
+            seed=options['seed'],
+        )
+        try:
+            server = make_server(options['host'], options['port'], config)
+        except OSError as e:
+            raise CommandError(f"Cannot bind {options['host']}:{options['port']}: {e}")
+
+        host, port = server.server_address[:2]
+        faults = ', '.join(f'{status}: {rate:.1%}' for status, rate in config.error_rates.items()) or 'none'
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'🧪 Fake CheapCarfax on http://{host}:{port}/api'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(
+            f"Latency: {config.latency} {config.latency_ms:.0f} ms (jitter {config.latency_jitter}), "
+            f"report: {config.report_bytes / 1024 / 1024:.1f} MB"
+        )
+        self.stdout.write(f'Errors: {faults}; timeouts: {config.timeout_rate:.1%} ({config.timeout_seconds:.0f}s)')
+        self.stdout.write(f'Start the app with CHEAPCARFAX_API_URL=http://{host}:{port}/api')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write('Stopped')
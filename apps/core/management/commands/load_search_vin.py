@@ -0,0 +1,155 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  SEARCH_VIN LOAD GENERATOR                               ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py load_search_vin                ║
+║         --email load@example.com --password secret      ║
+║         --requests 500 --concurrency 16                 ║
+║  Paleisti prieš app, nukreiptą į fake_cheapcarfax;      ║
+║  kiekvienas sėkmingas pirkimas nuskaičiuoja balansą     ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import random
+import statistics
+import threading
+import time
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Report
+from apps.core.services import parse_vin_list
+
+VIN_ALPHABET = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+
+
+def random_vins(count, seed=None):
+    """Atsitiktiniai (necache'inti) 17 simbolių VIN'ai"""
+    rng = random.Random(seed)
+    return [''.join(rng.choice(VIN_ALPHABET) for _ in range(17)) for _ in range(count)]
+
+
+def quantile_ms(values, q):
+    if not values:
+        return 0.0
+    quantiles = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+    return quantiles[q - 1] * 1000
+
+
+class Command(BaseCommand):
+    help = 'Drive POST /api/search-vin/ against a running app and report throughput and p50/p95/p99'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default='http://127.0.0.1:8000',
+            help='App base URL (default: http://127.0.0.1:8000)',
+        )
+        parser.add_argument('--email', type=str, required=True, help='Login email of the load-test user')
+        parser.add_argument('--password', type=str, required=True, help='Password of the load-test user')
+        parser.add_argument('--requests', type=int, default=200, help='Total search_vin requests (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel clients (default: 8)')
+        parser.add_argument(
+            '--type',
+            type=str,
+            default='carfax',
+            choices=[choice for choice, _ in Report.REPORT_TYPES],
+            help='Report type (default: carfax)',
+        )
+        parser.add_argument(
+            '--vins',
+            type=str,
+            help='CSV / newline VIN list to cycle through (default: random VINs, no cache hits)',
+        )
+        parser.add_argument('--seed', type=int, help='Random VIN seed')
+
+    def _login(self, base_url, email, password):
+        """Nauja sesija su prisijungusiu vartotoju (kiekvienam client thread'ui)"""
+        session = requests.Session()
+        session.get(f'{base_url}/login/', timeout=10)
+        response = session.post(
+            f'{base_url}/login/',
+            data={
+                'username': email,
+                'password': password,
+                'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+            },
+            headers={'Referer': f'{base_url}/login/'},
+            allow_redirects=False,
+            timeout=10,
+        )
+        if response.status_code != 302 or 'sessionid' not in session.cookies:
+            raise CommandError(f'Login failed for {email} (HTTP {response.status_code})')
+        return session
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        total = max(1, options['requests'])
+        concurrency = max(1, options['concurrency'])
+
+        if options['vins']:
+            with open(options['vins'], encoding='utf-8-sig') as f:
+                vins, _, _ = parse_vin_list(f.read())
+            if not vins:
+                raise CommandError('No valid VINs found')
+            vins = [vins[i % len(vins)] for i in range(total)]
+        else:
+            vins = random_vins(total, options['seed'])
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('📈 search_vin load test'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(f"{total} requests, {concurrency} clients, type {options['type']} -> {base_url}")
+
+        # Prisijungiama prieš matavimą - login laikas neįtraukiamas
+        sessions = [self._login(base_url, options['email'], options['password']) for _ in range(concurrency)]
+        free_sessions = list(sessions)
+        sessions_lock = threading.Lock()
+        local = threading.local()
+
+        def one(vin):
+            if not hasattr(local, 'session'):
+                with sessions_lock:
+                    local.session = free_sessions.pop()
+            session = local.session
+            started = time.perf_counter()
+            try:
+                response = session.post(
+                    f'{base_url}/api/search-vin/',
+                    json={'vin': vin, 'reportType': options['type']},
+                    headers={'X-CSRFToken': session.cookies.get('csrftoken', ''), 'Referer': f'{base_url}/dashboard/'},
+                    timeout=120,
+                )
+                outcome = str(response.status_code)
+            except requests.exceptions.RequestException as e:
+                outcome = type(e).__name__
+            return outcome, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load') as executor:
+            results = list(executor.map(one, vins))
+        elapsed = time.perf_counter() - started
+
+        for session in sessions:
+            session.close()
+
+        outcomes = Counter(outcome for outcome, _ in results)
+        latencies = [latency for _, latency in results]
+        ok_latencies = [latency for outcome, latency in results if outcome == '200']
+
+        self.stdout.write('-' * 60)
+        self.stdout.write(f'Elapsed: {elapsed:.1f}s, throughput: {total / elapsed:.2f} req/s')
+        self.stdout.write(f"Outcomes: {', '.join(f'{k}: {v}' for k, v in sorted(outcomes.items()))}")
+        for label, values in (('all', latencies), ('200', ok_latencies)):
+            if values:
+                self.stdout.write(
+                    f'Latency ({label}) p50: {quantile_ms(values, 50):.0f} ms, p95: {quantile_ms(values, 95):.0f} ms, '
+                    f'p99: {quantile_ms(values, 99):.0f} ms, max: {max(values) * 1000:.0f} ms'
+                )
+
+        style = self.style.SUCCESS if outcomes.get('200') == total else self.style.WARNING
+        self.stdout.write(style(f"{'✅' if outcomes.get('200') == total else '⚠️ '} {outcomes.get('200', 0)}/{total} succeeded"))
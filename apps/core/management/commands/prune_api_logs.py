@@ -0,0 +1,58 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  PRUNE API LOGS                                          ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py prune_api_logs                 ║
+║         python manage.py prune_api_logs --months 3      ║
+║  PostgreSQL: DETACH + DROP senų mėnesinių particijų     ║
+║  Kitur: batch'inis DELETE                               ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core import api_log
+
+
+class Command(BaseCommand):
+    help = 'Drop api_logs partitions older than the retention period and pre-create upcoming ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=getattr(settings, 'APILOG_RETENTION_MONTHS', 6),
+            help='Keep this many full months besides the current one (default: APILOG_RETENTION_MONTHS)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list what would be removed',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('🧹 Pruning API logs'))
+        self.stdout.write('=' * 60)
+
+        cutoff = api_log.retention_cutoff(options['months'])
+        self.stdout.write(f'Cutoff: {cutoff:%Y-%m-%d}')
+
+        if not api_log.is_partitioned():
+            if options['dry_run']:
+                from apps.core.models import APILog
+                count = APILog.objects.filter(created_at__lt=cutoff).count()
+                self.stdout.write(f'Would delete {count} rows (table is not partitioned)')
+                return
+            deleted = api_log.delete_before(cutoff)
+            self.stdout.write(self.style.SUCCESS(f'✅ Deleted {deleted} rows (table is not partitioned)'))
+            return
+
+        if not options['dry_run']:
+            api_log.ensure_partitions()
+        dropped = api_log.prune_partitions(cutoff, dry_run=options['dry_run'])
+        verb = 'Would drop' if options['dry_run'] else '✅ Dropped'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(dropped)} partitions'))
+        for name in dropped:
+            self.stdout.write(f'  {name}')
@@ -0,0 +1,92 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  REBUILD USER REPORT STATS                               ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py rebuild_report_stats           ║
+║         python manage.py rebuild_report_stats --user 5  ║
+║  Perskaičiuoja UserReportStats iš Report lentelės       ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from apps.core.models import Report, UserReportStats
+
+COUNTER_FIELDS = ('total_reports', 'carfax_reports', 'autocheck_reports', 'nmvtis_reports', 'total_spent')
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized per-user report counters (UserReportStats) in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Rebuild only this user id',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Stats rows written per statement (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        reports = Report.objects.all()
+        stats_rows = UserReportStats.objects.all()
+        if options['user']:
+            reports = reports.filter(user_id=options['user'])
+            stats_rows = stats_rows.filter(user_id=options['user'])
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('📊 Rebuilding user report stats'))
+        self.stdout.write('=' * 60)
+
+        # Vienas GROUP BY per visą lentelę
+        aggregates = (
+            reports
+            .order_by()
+            .values('user_id')
+            .annotate(
+                total_reports=Count('id'),
+                carfax_reports=Count('id', filter=Q(report_type='carfax')),
+                autocheck_reports=Count('id', filter=Q(report_type='autocheck')),
+                nmvtis_reports=Count('id', filter=Q(report_type='nmvtis')),
+                total_spent=Sum('price_paid'),
+            )
+        )
+
+        now = timezone.now()
+        rows = [
+            UserReportStats(
+                user_id=row['user_id'],
+                total_reports=row['total_reports'],
+                carfax_reports=row['carfax_reports'],
+                autocheck_reports=row['autocheck_reports'],
+                nmvtis_reports=row['nmvtis_reports'],
+                total_spent=row['total_spent'] or Decimal('0.00'),
+                updated_at=now,
+            )
+            for row in aggregates
+        ]
+
+        with transaction.atomic():
+            UserReportStats.objects.bulk_create(
+                rows,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=list(COUNTER_FIELDS) + ['updated_at'],
+            )
+            # Neatnaujintos eilutės - vartotojai, kurių reportai visi ištrinti
+            reset = stats_rows.filter(updated_at__lt=now).update(
+                total_reports=0, carfax_reports=0, autocheck_reports=0, nmvtis_reports=0,
+                total_spent=Decimal('0.00'), updated_at=now,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt stats for {len(rows)} users, reset {reset}'))
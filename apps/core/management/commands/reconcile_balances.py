@@ -0,0 +1,55 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  RECONCILE BALANCES                                      ║
+╠══════════════════════════════════════════════════════════╣
+║  Usage: python manage.py reconcile_balances             ║
+║         python manage.py reconcile_balances --user 5    ║
+║  UserProfile.balance vs snapshot + BalanceLedger        ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.core.models import BalanceSnapshot, UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Compare UserProfile.balance with the balance ledger (latest snapshot + later entries)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Check only this user id',
+        )
+        parser.add_argument(
+            '--snapshot',
+            action='store_true',
+            help='Capture new balance snapshots before checking',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('🧾 Reconciling balances'))
+        self.stdout.write('=' * 60)
+
+        if options['snapshot']:
+            self.stdout.write(f'Snapshots captured: {BalanceSnapshot.capture()}')
+
+        profiles = UserProfile.objects.only('user_id', 'balance').order_by('user_id')
+        if options['user']:
+            profiles = profiles.filter(user_id=options['user'])
+
+        checked = 0
+        mismatches = 0
+        for profile in profiles.iterator(chunk_size=500):
+            checked += 1
+            expected = BalanceSnapshot.expected_balance(profile.user_id)
+            if expected != profile.balance:
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f'  user {profile.user_id}: balance {profile.balance} PLN, ledger {expected} PLN'
+                ))
+
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f'{"✅" if not mismatches else "❌"} Checked {checked} balances, {mismatches} mismatches'))
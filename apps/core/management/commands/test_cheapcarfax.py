@@ -89,7 +89,7 @@ class Command(BaseCommand):
                 self.stdout.write(f"VIN: {report['vin']}")
                 self.stdout.write(f"Score: {data.get('score', 'N/A')}/100")
                 self.stdout.write(f"Accidents: {data.get('accidents', 0)}")
-                self.stdout.write(f"Owners: {data.get('owners', 0)}")
+                self.stdout.write(f"Owners: {data.get('owners') if data.get('owners') is not None else 'Unknown'}")
                 self.stdout.write(f"Service Records: {data.get('service_records', 0)}")
                 self.stdout.write(f"Title: {data.get('title_info', 'Unknown')}")
 
@@ -0,0 +1,244 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  REQUEST PROFILING MIDDLEWARE                            ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/middleware.py            ║
+║  PASKIRTIS: Atrinktų užklausų wall / CPU / SQL /        ║
+║  upstream laikas (+ cProfile) -> RequestProfile         ║
+║  + async-capable WhiteNoise (ASGI be async_to_sync)     ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from contextlib import ExitStack, contextmanager
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .models import RequestProfile
+from .upstream_metrics import request_upstream
+
+logger = logging.getLogger(__name__)
+
+
+class SQLTimer:
+    """connection.execute_wrapper: užklausų skaičius ir bendra trukmė"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiliuoja PROFILING_SAMPLE_RATE dalį užklausų arba staff užklausas su
+    PROFILING_HEADER antrašte ('1' - laikai, 'cprofile' - + cProfile ataskaita).
+    Staff užklausoms grąžinamas Server-Timing header'is.
+    Turi būti po AuthenticationMiddleware.
+
+    Sync ir async: ASGI režimu async view'ai nevykdomi per async_to_sync.
+    Async kelyje CPU laikas ir cProfile apima tik event loop thread'ą
+    (ne sync_to_async thread'uose vykdomą ORM darbą); SQL skaičiuojamas
+    užklausos thread-sensitive thread'e (ten vyksta async ORM užklausos).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sampled_by(self, request, user):
+        """user - request.user (sync, lazy) arba await request.auser() (async); None - be header'io"""
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            return None
+        if request.path.startswith(tuple(getattr(settings, 'PROFILING_EXCLUDE_PATHS', ()))):
+            return None
+        if user is not None and request.headers.get(self._header) and user.is_authenticated and user.is_staff:
+            return 'header'
+        if random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0):
+            return 'rate'
+        return None
+
+    @property
+    def _header(self):
+        return getattr(settings, 'PROFILING_HEADER', 'X-Profile')
+
+    def _use_cprofile(self, request, sampled_by):
+        if sampled_by == 'header':
+            return request.headers.get(self._header) == 'cprofile'
+        return getattr(settings, 'PROFILING_CPROFILE', False)
+
+    @staticmethod
+    def _wrap_connections(stack, sql):
+        """SQLTimer šio thread'o DB jungtims (connections - per thread)"""
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(sql))
+
+    @contextmanager
+    def _measure(self, sql, use_cprofile, wrap_sql=True):
+        """
+        Matuoja bloko wall / CPU / SQL / upstream laiką
+
+        Yields:
+            dict: po bloko - 'wall', 'cpu', 'sql', 'upstream', 'profiler'
+        """
+        measured = {'sql': sql, 'upstream': [0, 0.0], 'profiler': cProfile.Profile() if use_cprofile else None}
+        profiler = measured['profiler']
+        token = request_upstream.set(measured['upstream'])
+
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            with ExitStack() as stack:
+                if wrap_sql:
+                    self._wrap_connections(stack, sql)
+                if profiler:
+                    try:
+                        profiler.enable()
+                    except ValueError:
+                        # Kitas profiler'is jau aktyvus (pvz. lygiagreti async užklausa tame pačiame thread'e)
+                        profiler = measured['profiler'] = None
+                try:
+                    yield measured
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            request_upstream.reset(token)
+            measured['wall'] = time.perf_counter() - wall_started
+            measured['cpu'] = time.thread_time() - cpu_started
+
+    def _add_server_timing(self, response, sampled_by, measured):
+        if sampled_by != 'header':
+            return
+        sql, upstream = measured['sql'], measured['upstream']
+        response['Server-Timing'] = (
+            f"total;dur={measured['wall'] * 1000:.1f}, cpu;dur={measured['cpu'] * 1000:.1f}, "
+            f'sql;dur={sql.seconds * 1000:.1f};desc="{sql.count} queries", '
+            f'upstream;dur={upstream[1] * 1000:.1f};desc="{upstream[0]} calls"'
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        sampled_by = self._sampled_by(request, request.user)
+        if sampled_by is None:
+            return self.get_response(request)
+
+        with self._measure(SQLTimer(), self._use_cprofile(request, sampled_by)) as measured:
+            response = self.get_response(request)
+
+        # Streaming atsakymų kūnas generuojamas vėliau - laikai būtų klaidinantys
+        if response.streaming:
+            return response
+
+        self._add_server_timing(response, sampled_by, measured)
+        self._store(request, response, sampled_by, measured)
+        return response
+
+    async def __acall__(self, request):
+        user = await request.auser() if request.headers.get(self._header) else None
+        sampled_by = self._sampled_by(request, user)
+        if sampled_by is None:
+            return await self.get_response(request)
+
+        sql, sql_stack = SQLTimer(), ExitStack()
+        await sync_to_async(self._wrap_connections)(sql_stack, sql)
+        try:
+            with self._measure(sql, self._use_cprofile(request, sampled_by), wrap_sql=False) as measured:
+                response = await self.get_response(request)
+        finally:
+            await sync_to_async(sql_stack.close)()
+
+        if response.streaming:
+            return response
+
+        self._add_server_timing(response, sampled_by, measured)
+        await sync_to_async(self._store)(request, response, sampled_by, measured)
+        return response
+
+    def _store(self, request, response, sampled_by, measured):
+        """Įrašyti profilį (klaida niekada nepasiekia vartotojo)"""
+        sql, upstream, profiler = measured['sql'], measured['upstream'], measured['profiler']
+        wall, cpu = measured['wall'], measured['cpu']
+        report = ''
+        if profiler:
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream).sort_stats('cumulative')
+            stats.print_stats(getattr(settings, 'PROFILING_CPROFILE_LINES', 40))
+            report = stream.getvalue()
+
+        match = request.resolver_match
+        try:
+            profile = RequestProfile.objects.create(
+                user=request.user if request.user.is_authenticated else None,
+                method=request.method,
+                path=request.path[:255],
+                view_name=(match.view_name if match else '')[:200],
+                status_code=response.status_code,
+                sampled_by=sampled_by,
+                wall_ms=int(wall * 1000),
+                cpu_ms=int(cpu * 1000),
+                sql_count=sql.count,
+                sql_ms=int(sql.seconds * 1000),
+                upstream_count=upstream[0],
+                upstream_ms=int(upstream[1] * 1000),
+                profile=report,
+            )
+            # Lentelės ribojimas - ne kiekvienai užklausai
+            if profile.id % 100 == 0:
+                RequestProfile.trim()
+        except Exception as e:
+            logger.warning(f"Request profile save failed for {request.path}: {str(e)}")
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware su async keliu
+
+    WhiteNoise 6.6 - tik sync, todėl ASGI režimu Django visą likusią grandinę
+    vykdytų per sync_to_async(thread_sensitive=True) - vienu thread'u.
+    Statinio failo paieška (be autorefresh) - tik dict lookup; failo
+    atsakymas ruošiamas thread'e, kitos užklausos lieka event loop'e.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,39 @@
+# Report.report_html -> suspaustas ReportContent (one-to-one)
+#
+# Tik schema (greita, be duomenų perkėlimo). Esamas HTML perkeliamas
+# atskirai mažais batch'ais: python manage.py backfill_report_content,
+# o report_html stulpelis pašalinamas vėlesnėje migracijoje
+# (0013_remove_report_report_html).
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_report_report_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='html_available',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ReportContent',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='core.report')),
+                ('codec', models.CharField(choices=[('gzip', 'gzip'), ('zstd', 'zstd'), ('none', 'None')], max_length=10)),
+                ('data', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Report Content',
+                'verbose_name_plural': 'Report Contents',
+                'db_table': 'report_contents',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:19
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0003_report_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserReportStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='report_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_reports', models.PositiveIntegerField(default=0)),
+                ('carfax_reports', models.PositiveIntegerField(default=0)),
+                ('autocheck_reports', models.PositiveIntegerField(default=0)),
+                ('nmvtis_reports', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User Report Stats',
+                'verbose_name_plural': 'User Report Stats',
+                'db_table': 'user_report_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:21
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_user_report_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('vin', models.CharField(max_length=17)),
+                ('report_type', models.CharField(choices=[('carfax', 'Carfax'), ('autocheck', 'Autocheck'), ('nmvtis', 'NMVTIS')], max_length=20)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('fetching', 'Fetching'), ('saved', 'Saved'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('idempotency_key', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('report', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job', to='core.report')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Report Job',
+                'verbose_name_plural': 'Report Jobs',
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='report_jobs_user_id_f73ed8_idx'), models.Index(fields=['status'], name='report_jobs_status_f93e87_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key', ''), _negated=True), fields=('user', 'idempotency_key'), name='report_job_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_report_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('fetching', 'Fetching'), ('parsing', 'Parsing'), ('saved', 'Saved'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    """Esami balansai -> 'opening' ledger įrašai (reconciliation pradžia)"""
+    UserProfile = apps.get_model('core', 'UserProfile')
+    BalanceLedger = apps.get_model('core', 'BalanceLedger')
+    BalanceLedger.objects.bulk_create(
+        [
+            BalanceLedger(user_id=profile.user_id, amount=profile.balance, balance_after=profile.balance, kind='opening')
+            for profile in UserProfile.objects.exclude(balance=0).only('user_id', 'balance').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_report_job_parsing_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceLedger',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('kind', models.CharField(choices=[('opening', 'Opening balance'), ('topup', 'Top-up'), ('purchase', 'Report purchase'), ('refund', 'Refund'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Balance Ledger Entry',
+                'verbose_name_plural': 'Balance Ledger',
+                'db_table': 'balance_ledger',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='balance_led_user_id_9e0383_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('ledger_entry_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Balance Snapshot',
+                'verbose_name_plural': 'Balance Snapshots',
+                'db_table': 'balance_snapshots',
+                'indexes': [models.Index(fields=['user', '-ledger_entry_id'], name='balance_sna_user_id_27618d_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
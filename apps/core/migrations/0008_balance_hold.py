@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:34
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_balance_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balanceledger',
+            name='kind',
+            field=models.CharField(choices=[('opening', 'Opening balance'), ('topup', 'Top-up'), ('purchase', 'Report purchase'), ('refund', 'Refund'), ('adjustment', 'Adjustment'), ('hold', 'Hold'), ('release', 'Hold release')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='BalanceHold',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('captured_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('status', models.CharField(choices=[('held', 'Held'), ('captured', 'Captured'), ('released', 'Released'), ('expired', 'Expired')], default='held', max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Balance Hold',
+                'verbose_name_plural': 'Balance Holds',
+                'db_table': 'balance_holds',
+                'indexes': [models.Index(condition=models.Q(('status', 'held')), fields=['expires_at'], name='balance_hold_active_idx')],
+            },
+        ),
+    ]
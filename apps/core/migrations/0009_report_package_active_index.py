@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_balance_hold'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reportpackage',
+            index=models.Index(condition=models.Q(('is_active', True), ('reports_remaining__gt', 0)), fields=['user', 'report_type', 'expires_at', 'purchased_at'], name='report_pkg_active_idx'),
+        ),
+    ]
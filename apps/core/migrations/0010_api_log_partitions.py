@@ -0,0 +1,120 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+PARTITIONS_AHEAD = 2
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def partition_api_logs(apps, schema_editor):
+    """
+    PostgreSQL: api_logs -> PARTITION BY RANGE (created_at), mėnesinės particijos
+    PK tampa (id, created_at) - particijos raktas turi būti PK dalis.
+    PK, indeksų ir FK vardai - tie patys, kuriuos sukūrė Django, todėl
+    vėlesni AlterField / RemoveIndex juos randa kaip ir anksčiau.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    quote = schema_editor.quote_name
+    now = django.utils.timezone.localtime()
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT MIN(created_at) FROM api_logs')
+        oldest = cursor.fetchone()[0]
+
+        constraints = connection.introspection.get_constraints(cursor, 'api_logs')
+        pk_name = next(name for name, c in constraints.items() if c['primary_key'])
+        foreign_keys = {name: c for name, c in constraints.items() if c['foreign_key']}
+        indexes = {
+            name: c for name, c in constraints.items()
+            if c['index'] and not c['primary_key'] and not c['unique']
+        }
+
+        # Vardai atlaisvinami naujai lentelei (senoji vis tiek ištrinama)
+        cursor.execute('ALTER TABLE api_logs RENAME TO api_logs_legacy')
+        for name in (*foreign_keys, pk_name):
+            cursor.execute(f'ALTER TABLE api_logs_legacy DROP CONSTRAINT {quote(name)}')
+        for name in indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS {quote(name)}')
+
+        cursor.execute(
+            'CREATE TABLE api_logs (LIKE api_logs_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            'PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute('CREATE SEQUENCE api_logs_part_id_seq OWNED BY api_logs.id')
+        cursor.execute(
+            "SELECT setval('api_logs_part_id_seq', COALESCE((SELECT MAX(id) FROM api_logs_legacy), 0) + 1, false)"
+        )
+        cursor.execute("ALTER TABLE api_logs ALTER COLUMN id SET DEFAULT nextval('api_logs_part_id_seq')")
+        cursor.execute(f'ALTER TABLE api_logs ADD CONSTRAINT {quote(pk_name)} PRIMARY KEY (id, created_at)')
+        for name, c in indexes.items():
+            columns = ', '.join(quote(column) for column in c['columns'])
+            cursor.execute(f'CREATE INDEX {quote(name)} ON api_logs ({columns})')
+        for name, c in foreign_keys.items():
+            table, column = c['foreign_key']
+            cursor.execute(
+                f'ALTER TABLE api_logs ADD CONSTRAINT {quote(name)} FOREIGN KEY ({quote(c["columns"][0])}) '
+                f'REFERENCES {quote(table)} ({quote(column)}) DEFERRABLE INITIALLY DEFERRED'
+            )
+
+        month = django.utils.timezone.localtime(oldest or now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        last = _add_months(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), PARTITIONS_AHEAD)
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE api_logs_{month:%Y%m} PARTITION OF api_logs FOR VALUES FROM (%s) TO (%s)',
+                [month, _add_months(month, 1)],
+            )
+            month = _add_months(month, 1)
+        cursor.execute('CREATE TABLE api_logs_default PARTITION OF api_logs DEFAULT')
+
+        cursor.execute('INSERT INTO api_logs SELECT * FROM api_logs_legacy')
+        cursor.execute('DROP TABLE api_logs_legacy')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_report_package_active_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apilog',
+            name='endpoint',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='apilog',
+            name='latency_ms',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='apilog',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='apilog',
+            name='provider',
+            field=models.CharField(choices=[('carfax', 'Carfax'), ('autocheck', 'Autocheck'), ('nmvtis', 'NMVTIS'), ('cheapcarfax', 'CheapCarfax')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='apilog',
+            name='status_code',
+            field=models.IntegerField(help_text='0 - transporto klaida (timeout, connection)'),
+        ),
+        migrations.AlterField(
+            model_name='apilog',
+            name='vin',
+            field=models.CharField(blank=True, max_length=17),
+        ),
+        # Atgal nekonvertuojama - particionuota lentelė suderinama su ankstesne schema
+        migrations.RunPython(partition_api_logs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_api_log_partitions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('view_name', models.CharField(blank=True, db_index=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('sampled_by', models.CharField(choices=[('rate', 'Sample rate'), ('header', 'Staff header')], max_length=10)),
+                ('wall_ms', models.PositiveIntegerField()),
+                ('cpu_ms', models.PositiveIntegerField()),
+                ('sql_count', models.PositiveIntegerField(default=0)),
+                ('sql_ms', models.PositiveIntegerField(default=0)),
+                ('upstream_count', models.PositiveIntegerField(default=0)),
+                ('upstream_ms', models.PositiveIntegerField(default=0)),
+                ('profile', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Request Profile',
+                'verbose_name_plural': 'Request Profiles',
+                'db_table': 'request_profiles',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_request_profile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='owners',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
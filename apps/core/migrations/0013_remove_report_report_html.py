@@ -0,0 +1,50 @@
+# report_html stulpelio pašalinimas (po backfill_report_content)
+#
+# Paleisti tik kai HTML jau perkeltas į report_contents - kitaip migracija
+# sustoja ir nieko nepašalina. DROP COLUMN - tik katalogo pakeitimas.
+
+from django.db import migrations
+
+BATCH_SIZE = 100
+
+
+def check_backfilled(apps, schema_editor):
+    """Neperkeltas HTML neturi būti prarastas"""
+    Report = apps.get_model('core', 'Report')
+    if Report.objects.exclude(report_html__isnull=True).exclude(report_html='').exists():
+        raise RuntimeError(
+            'Report.report_html still holds HTML not moved to report_contents, refusing to drop the column.\n'
+            'Rollout (see readme.md, "Report HTML storage upgrade"):\n'
+            '  1. python manage.py migrate core 0012\n'
+            '  2. python manage.py backfill_report_content\n'
+            '  3. python manage.py migrate\n'
+            'Do not --fake this migration: the column and its HTML would be left behind.'
+        )
+
+
+def restore_report_html(apps, schema_editor):
+    """Atgal: report_contents -> report_html"""
+    from apps.core.compression import decompress_html
+
+    Report = apps.get_model('core', 'Report')
+    ReportContent = apps.get_model('core', 'ReportContent')
+
+    for content in ReportContent.objects.iterator(chunk_size=BATCH_SIZE):
+        Report.objects.filter(id=content.report_id).update(
+            report_html=decompress_html(content.codec, content.data)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_report_owners_nullable'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_backfilled, restore_report_html),
+        migrations.RemoveField(
+            model_name='report',
+            name='report_html',
+        ),
+    ]
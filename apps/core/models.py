@@ -1,12 +1,19 @@
 """
 DATABASE MODELIAI - PostgreSQL
 Čia aprašomi visi duomenų bazės modeliai
-✅ UPDATED: Pridėtas report_html field Carfax/Autocheck HTML saugojimui
+✅ UPDATED: Report HTML saugomas suspaustas atskiroje ReportContent lentelėje
 """
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Max, Q, Sum, Value, When
 from django.contrib.auth.models import User
 from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
+import uuid
+
+from . import job_events
+from .compression import CODEC_CHOICES, compress_html, decompress_html
 
 
 class UserProfile(models.Model):
@@ -28,31 +35,306 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.balance} PLN"
 
-    def add_balance(self, amount):
-        """Pridėti pinigų į sąskaitą"""
-        self.balance += Decimal(str(amount))
-        self.save()
+    def add_balance(self, amount, kind='topup', reference=''):
+        """
+        Pridėti pinigų į sąskaitą
+
+        Vienas UPDATE ... SET balance = balance + x (be read-modify-write)
+        ir BalanceLedger įrašas toje pačioje transakcijoje.
+
+        Returns:
+            Decimal: naujas balansas
+        """
+        amount_decimal = Decimal(str(amount))
+        with transaction.atomic():
+            UserProfile.objects.filter(pk=self.pk).update(
+                balance=F('balance') + amount_decimal, updated_at=timezone.now(),
+            )
+            self._record_balance_change(amount_decimal, kind, reference)
         return self.balance
 
-    def deduct_balance(self, amount):
-        """Nuskaičiuoti pinigus iš sąskaitos"""
+    def deduct_balance(self, amount, kind='purchase', reference=''):
+        """
+        Nuskaičiuoti pinigus iš sąskaitos
+
+        Sąlyginis UPDATE ... WHERE balance >= x - lygiagretūs pirkimai
+        negali išleisti daugiau nei yra, ir nereikia select_for_update.
+
+        Returns:
+            bool: ar nuskaičiuota
+        """
         amount_decimal = Decimal(str(amount))
-        if self.balance >= amount_decimal:
-            self.balance -= amount_decimal
-            self.save()
-            return True
-        return False
+        with transaction.atomic():
+            updated = UserProfile.objects.filter(pk=self.pk, balance__gte=amount_decimal).update(
+                balance=F('balance') - amount_decimal, updated_at=timezone.now(),
+            )
+            if not updated:
+                self.refresh_from_db(fields=['balance'])
+                return False
+            self._record_balance_change(-amount_decimal, kind, reference)
+        return True
+
+    def _record_balance_change(self, amount, kind, reference):
+        """Po UPDATE: perskaityti balansą (eilutė jau lock'inta iki commit'o) ir įrašyti į ledger"""
+        self.balance = UserProfile.objects.values_list('balance', flat=True).get(pk=self.pk)
+        BalanceLedger.objects.create(
+            user_id=self.user_id, amount=amount, balance_after=self.balance, kind=kind, reference=reference,
+        )
 
     def has_sufficient_balance(self, amount):
         """Patikrinti ar yra pakankamai pinigų"""
         return self.balance >= Decimal(str(amount))
 
 
+class BalanceLedger(models.Model):
+    """
+    Append-only balanso pokyčių žurnalas
+    Kiekvienas UserProfile.balance pokytis - viena eilutė toje pačioje transakcijoje
+    """
+    KINDS = (
+        ('opening', 'Opening balance'),
+        ('topup', 'Top-up'),
+        ('purchase', 'Report purchase'),
+        ('refund', 'Refund'),
+        ('adjustment', 'Adjustment'),
+        ('hold', 'Hold'),
+        ('release', 'Hold release'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_entries')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)  # + įplaukos, - nurašymai
+    balance_after = models.DecimalField(max_digits=10, decimal_places=2)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    reference = models.CharField(max_length=100, blank=True)  # pvz. 'report:12', 'transaction:<id>'
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'balance_ledger'
+        verbose_name = 'Balance Ledger Entry'
+        verbose_name_plural = 'Balance Ledger'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.amount:+} PLN ({self.kind})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('BalanceLedger entries are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('BalanceLedger entries are append-only')
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Periodinis balanso snapshot'as (snapshot_balances task)
+    Istorija / reconciliation = paskutinis snapshot + ledger įrašai po jo
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_snapshots')
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    ledger_entry_id = models.BigIntegerField()  # paskutinis įtrauktas BalanceLedger.id
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'balance_snapshots'
+        verbose_name = 'Balance Snapshot'
+        verbose_name_plural = 'Balance Snapshots'
+        indexes = [
+            models.Index(fields=['user', '-ledger_entry_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.balance} PLN @ {self.ledger_entry_id}"
+
+    @classmethod
+    def capture(cls):
+        """
+        Snapshot'ai vartotojams, kurių ledger pasikeitė nuo paskutinio paleidimo
+
+        Returns:
+            int: sukurtų snapshot'ų skaičius
+        """
+        since = cls.objects.aggregate(last=Max('ledger_entry_id'))['last'] or 0
+        latest_ids = (
+            BalanceLedger.objects
+            .filter(id__gt=since)
+            .order_by()
+            .values('user_id')
+            .annotate(last_id=Max('id'))
+            .values_list('last_id', flat=True)
+        )
+        snapshots = [
+            cls(user_id=entry.user_id, balance=entry.balance_after, ledger_entry_id=entry.id)
+            for entry in BalanceLedger.objects.filter(id__in=list(latest_ids)).only('id', 'user_id', 'balance_after')
+        ]
+        cls.objects.bulk_create(snapshots, batch_size=1000)
+        return len(snapshots)
+
+    @classmethod
+    def expected_balance(cls, user_id):
+        """
+        Balansas pagal ledger: paskutinis snapshot + vėlesni įrašai
+        (nereikia sumuoti visos istorijos)
+        """
+        snapshot = cls.objects.filter(user_id=user_id).order_by('-ledger_entry_id').first()
+        entries = BalanceLedger.objects.filter(user_id=user_id)
+        base = Decimal('0.00')
+        if snapshot is not None:
+            entries = entries.filter(id__gt=snapshot.ledger_entry_id)
+            base = snapshot.balance
+        return base + (entries.aggregate(total=Sum('amount'))['total'] or Decimal('0.00'))
+
+
+class BalanceHold(models.Model):
+    """
+    Trumpalaikis lėšų rezervavimas pirkimo metu (place -> capture / release)
+
+    place() iškart nuskaičiuoja sumą iš balanso (sąlyginis UPDATE + ledger 'hold'),
+    todėl lygiagretūs pirkimai negali išleisti tų pačių pinigų, o upstream
+    laukiama be jokios atviros transakcijos. capture() pasilieka (dalį) sumos,
+    release() / sweep_expired() grąžina nepanaudotą likutį (ledger 'release').
+    """
+    STATUS_CHOICES = (
+        ('held', 'Held'),
+        ('captured', 'Captured'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_holds')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    captured_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='held')
+    reference = models.CharField(max_length=100, blank=True)  # pvz. 'carfax:<VIN>', 'batch:<id>'
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'balance_holds'
+        verbose_name = 'Balance Hold'
+        verbose_name_plural = 'Balance Holds'
+        indexes = [
+            # sweep_expired - tik aktyvūs hold'ai
+            models.Index(fields=['expires_at'], name='balance_hold_active_idx', condition=Q(status='held')),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.amount} PLN ({self.status})"
+
+    @property
+    def remaining(self):
+        return self.amount - self.captured_amount
+
+    @classmethod
+    def place(cls, user, amount, reference='', ttl=None):
+        """
+        Rezervuoti sumą
+
+        Args:
+            ttl (int): sekundės iki automatinio grąžinimo (default BALANCE_HOLD_TTL)
+
+        Returns:
+            BalanceHold arba None jei nepakanka balanso
+        """
+        amount = Decimal(str(amount))
+        ttl = ttl or getattr(settings, 'BALANCE_HOLD_TTL', 120)
+        with transaction.atomic():
+            hold = cls.objects.create(
+                user=user, amount=amount, reference=reference,
+                expires_at=timezone.now() + timedelta(seconds=ttl),
+            )
+            profile = UserProfile.objects.only('id', 'user_id', 'balance').get(user=user)
+            if amount and not profile.deduct_balance(amount, kind='hold', reference=f'hold:{hold.id}'):
+                transaction.set_rollback(True)
+                return None
+        return hold
+
+    def capture(self, amount=None):
+        """
+        Pasilikti sumą (visą arba dalį) - pinigai jau nuskaičiuoti place() metu
+
+        Returns:
+            bool: False jei hold'as jau grąžintas / pasibaigęs arba likutis per mažas
+        """
+        with transaction.atomic():
+            hold = BalanceHold.objects.select_for_update().get(pk=self.pk)
+            amount = hold.remaining if amount is None else Decimal(str(amount))
+            if hold.status != 'held' or amount > hold.remaining:
+                return False
+            hold.captured_amount += amount
+            if hold.remaining == 0:
+                hold.status = 'captured'
+            hold.save(update_fields=['captured_amount', 'status', 'updated_at'])
+        self.captured_amount, self.status = hold.captured_amount, hold.status
+        return True
+
+    def extend(self, ttl):
+        """
+        Pratęsti aktyvų hold'ą iki now + ttl (ilgi batch'ai - po kiekvieno VIN)
+
+        Returns:
+            bool: False jei hold'as jau uždarytas (pvz. sweep_expired)
+        """
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        extended = BalanceHold.objects.filter(pk=self.pk, status='held').update(
+            expires_at=expires_at, updated_at=timezone.now(),
+        )
+        if extended:
+            self.expires_at = expires_at
+        return bool(extended)
+
+    def release(self, expired=False):
+        """
+        Grąžinti nepanaudotą likutį ir uždaryti hold'ą (no-op jei jau uždarytas)
+
+        Returns:
+            Decimal: grąžinta suma
+        """
+        with transaction.atomic():
+            hold = BalanceHold.objects.select_for_update().get(pk=self.pk)
+            if hold.status != 'held':
+                return Decimal('0.00')
+            refund = hold.remaining
+            if hold.captured_amount:
+                hold.status = 'captured'
+            else:
+                hold.status = 'expired' if expired else 'released'
+            hold.save(update_fields=['status', 'updated_at'])
+            if refund:
+                profile = UserProfile.objects.only('id', 'user_id', 'balance').get(user_id=hold.user_id)
+                profile.add_balance(refund, kind='release', reference=f'hold:{hold.id}')
+        self.status = hold.status
+        return refund
+
+    @classmethod
+    def sweep_expired(cls, limit=1000):
+        """
+        Grąžinti pasibaigusius hold'us (sweep_balance_holds task)
+
+        Returns:
+            int: grąžintų hold'ų skaičius
+        """
+        expired = cls.objects.filter(status='held', expires_at__lt=timezone.now()).order_by('expires_at')[:limit]
+        released = 0
+        for hold in expired:
+            hold.release(expired=True)
+            released += 1
+        return released
+
+
 class Report(models.Model):
     """
     VIN ataskaitos modelis
     Saugo visas sugeneruotas VIN ataskaitas
-    ✅ UPDATED: Pridėtas report_html field pilnam HTML iš CheapCarfax
+    ✅ UPDATED: Pilnas HTML iš CheapCarfax - ReportContent (kraunamas tik view_report)
     """
     REPORT_TYPES = (
         ('carfax', 'Carfax'),
@@ -64,12 +346,8 @@ class Report(models.Model):
     vin = models.CharField(max_length=17, db_index=True)
     report_type = models.CharField(max_length=20, choices=REPORT_TYPES)
 
-    # ✅ NAUJAS FIELD - Pilnas HTML reportas iš CheapCarfax API
-    report_html = models.TextField(
-        blank=True,
-        null=True,
-        help_text='Full HTML report from CheapCarfax API'
-    )
+    # Ar yra ReportContent (HTML) - sąrašams nereikia skaityti blob'o
+    html_available = models.BooleanField(default=False)
 
     # JSON duomenys (backup)
     report_data = models.JSONField(default=dict, blank=True)
@@ -79,7 +357,7 @@ class Report(models.Model):
     # Ataskaitos rezultatai (quick access)
     score = models.IntegerField(null=True, blank=True)
     accidents = models.IntegerField(default=0)
-    owners = models.IntegerField(default=0)
+    owners = models.IntegerField(null=True, blank=True)  # None - reporte nenurodyta
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -112,8 +390,39 @@ class Report(models.Model):
 
     @property
     def has_html(self):
-        """✅ Ar turi HTML reportą"""
-        return bool(self.report_html)
+        """✅ Ar turi HTML reportą (iš flag'o, be blob'o skaitymo)"""
+        return self.html_available
+
+    def get_html(self):
+        """
+        Pilnas HTML reportas (lazy - viena užklausa į report_contents)
+
+        Returns:
+            str arba '' jei HTML nėra
+        """
+        if not self.html_available:
+            return ''
+        try:
+            return self.content.html
+        except ReportContent.DoesNotExist:
+            return ''
+
+    def store_html(self, html):
+        """Išsaugoti (suspaustą) HTML ir pažymėti html_available"""
+        if not html:
+            return
+        ReportContent.objects.update_or_create(
+            report=self,
+            defaults=ReportContent.build_fields(html),
+        )
+        # updated_at keičiasi kartu su HTML - nuo jo priklauso body ETag / URL versija
+        self.html_available = True
+        self.save(update_fields=['html_available', 'updated_at'])
+
+    @property
+    def body_version(self):
+        """HTML versija (report body URL ir ETag)"""
+        return int(self.updated_at.timestamp() * 1000)
 
     @property
     def vehicle_info(self):
@@ -123,6 +432,183 @@ class Report(models.Model):
         return f'VIN: {self.vin}'
 
 
+class ReportContent(models.Model):
+    """
+    Report HTML saugykla (one-to-one)
+    Suspaustas HTML laikomas atskirai, kad Report sąrašai neskaitytų blob'ų
+    """
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True, related_name='content')
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES)
+    data = models.BinaryField()
+    raw_size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'report_contents'
+        verbose_name = 'Report Content'
+        verbose_name_plural = 'Report Contents'
+
+    def __str__(self):
+        return f"Content for report {self.report_id} ({self.codec}, {len(self.data)} B)"
+
+    @staticmethod
+    def build_fields(html):
+        """HTML -> codec/data/raw_size laukai (bulk_create / update_or_create)"""
+        codec, data = compress_html(html)
+        return {'codec': codec, 'data': data, 'raw_size': len(html.encode('utf-8'))}
+
+    @property
+    def html(self):
+        """Išskleistas HTML"""
+        return decompress_html(self.codec, self.data)
+
+
+class ReportJob(models.Model):
+    """
+    Asinchroninis reporto pirkimas (Celery run_report_job)
+    search_vin grąžina job ID, dashboard seka statusą per api_report_job_status
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('fetching', 'Fetching'),
+        ('parsing', 'Parsing'),
+        ('saved', 'Saved'),
+        ('failed', 'Failed'),
+    )
+    FINAL_STATUSES = ('saved', 'failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    vin = models.CharField(max_length=17)
+    report_type = models.CharField(max_length=20, choices=Report.REPORT_TYPES)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    report = models.OneToOneField(Report, on_delete=models.SET_NULL, null=True, blank=True, related_name='job')
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+    # Kliento raktas - pakartotas POST grąžina tą patį job'ą
+    idempotency_key = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        verbose_name = 'Report Job'
+        verbose_name_plural = 'Report Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['status']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                condition=~Q(idempotency_key=''),
+                name='report_job_idempotency_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.vin} - {self.report_type} ({self.status})"
+
+    @property
+    def is_final(self):
+        return self.status in self.FINAL_STATUSES
+
+    def set_status(self, status, error=''):
+        """
+        Pakeisti statusą (galutinis 'saved' niekada neperrašomas)
+
+        Returns:
+            bool: ar statusas pakeistas
+        """
+        changes = {'status': status, 'error': error, 'updated_at': timezone.now()}
+        if status == 'fetching':
+            changes['attempts'] = F('attempts') + 1
+        updated = ReportJob.objects.filter(pk=self.pk).exclude(status='saved').update(**changes)
+        if updated:
+            self.status = status
+            self.error = error
+            job_events.publish(self)
+        return bool(updated)
+
+
+class UserReportStats(models.Model):
+    """
+    Denormalizuoti vartotojo reportų skaitikliai (dashboard'ui)
+    Atnaujinami atomiškai (F() išraiškos) per Report signalus;
+    pataisymui: python manage.py rebuild_report_stats
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='report_stats')
+    total_reports = models.PositiveIntegerField(default=0)
+    carfax_reports = models.PositiveIntegerField(default=0)
+    autocheck_reports = models.PositiveIntegerField(default=0)
+    nmvtis_reports = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_report_stats'
+        verbose_name = 'User Report Stats'
+        verbose_name_plural = 'User Report Stats'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total_reports} reports, {self.total_spent} PLN"
+
+    @staticmethod
+    def type_field(report_type):
+        """Report tipo skaitiklio laukas (arba None nežinomam tipui)"""
+        field = f'{report_type}_reports'
+        return field if field in ('carfax_reports', 'autocheck_reports', 'nmvtis_reports') else None
+
+    @classmethod
+    def record(cls, user_id, report_type, price, sign=1, count=1):
+        """
+        Atomiškai pakeisti skaitiklius vienam reportui (arba count reportų -
+        bulk_create nesiunčia post_save, todėl kviečiama tiesiogiai)
+
+        Args:
+            user_id (int): vartotojo ID
+            report_type (str): 'carfax', 'autocheck' arba 'nmvtis'
+            price (Decimal): sumokėta suma (visų count reportų)
+            sign (int): 1 - sukurtas reportas, -1 - grąžintas / ištrintas
+            count (int): kiek reportų
+        """
+        price = Decimal(str(price or 0))
+        changes = {
+            'total_reports': F('total_reports') + sign * count,
+            'total_spent': F('total_spent') + sign * price,
+            'updated_at': timezone.now(),
+        }
+        type_field = cls.type_field(report_type)
+        if type_field:
+            changes[type_field] = F(type_field) + sign * count
+
+        if cls.objects.filter(user_id=user_id).update(**changes):
+            return
+
+        # Pirmas reportas - eilutės dar nėra
+        if sign < 0:
+            return
+        initial = {'total_reports': count, 'total_spent': price}
+        if type_field:
+            initial[type_field] = count
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, **initial)
+        except IntegrityError:
+            # Lygiagretus request'as sukūrė eilutę pirmas
+            cls.objects.filter(user_id=user_id).update(**changes)
+
+    @classmethod
+    def for_user(cls, user):
+        """Vartotojo statistika (neišsaugotas nulinis objektas jei dar nėra)"""
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            return cls(user=user)
+
+
 class Transaction(models.Model):
     """
     Mokėjimų istorijos modelis
@@ -170,10 +656,19 @@ class Transaction(models.Model):
         return f"{self.user.username} - {self.amount} {self.currency} - {self.status}"
 
     def mark_completed(self):
-        """Pažymėti transakciją kaip užbaigtą"""
-        self.status = 'completed'
-        self.save()
-        self.user.profile.add_balance(self.amount)
+        """
+        Pažymėti transakciją kaip užbaigtą ir įskaityti pinigus
+
+        Sąlyginis statuso UPDATE - pakartotinis kvietimas (webhook retry)
+        antrą kartą neįskaito.
+        """
+        with transaction.atomic():
+            completed = Transaction.objects.filter(pk=self.pk).exclude(status='completed').update(
+                status='completed', updated_at=timezone.now(),
+            )
+            self.status = 'completed'
+            if completed:
+                self.user.profile.add_balance(self.amount, kind='topup', reference=f'transaction:{self.transaction_id}')
 
     def mark_failed(self):
         """Pažymėti transakciją kaip nepavykusią"""
@@ -213,42 +708,119 @@ class ReportPackage(models.Model):
         verbose_name = 'Report Package'
         verbose_name_plural = 'Report Packages'
         ordering = ['-purchased_at']
+        indexes = [
+            # Pirkimo kelias - tik aktyvūs paketai (vartotojas, tipas)
+            models.Index(
+                fields=['user', 'report_type', 'expires_at', 'purchased_at'],
+                name='report_pkg_active_idx',
+                condition=Q(is_active=True, reports_remaining__gt=0),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.get_package_type_display()} {self.get_report_type_display()}"
 
+    @property
+    def unit_price(self):
+        """Vieno reporto kaina pakete (Report.price_paid / statistikai)"""
+        prices = settings.REPORT_PRICES.get(self.report_type, {})
+        key = 'single' if self.package_type == '1' else f'pack_{self.package_type}'
+        return Decimal(str(prices.get(key, prices.get('single', 0))))
+
+    @classmethod
+    def active_for(cls, user_id, report_type=None):
+        """Galiojantys paketai su likusiais reportais (partial index)"""
+        packages = cls.objects.filter(user_id=user_id, is_active=True, reports_remaining__gt=0).filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+        )
+        if report_type is not None:
+            packages = packages.filter(report_type=report_type)
+        return packages
+
+    @classmethod
+    def credits_for(cls, user_id):
+        """Likę kreditai pagal tipą: {'carfax': 9, ...}"""
+        rows = cls.active_for(user_id).order_by().values('report_type').annotate(left=Sum('reports_remaining'))
+        return {row['report_type']: row['left'] for row in rows}
+
+    @classmethod
+    def consume(cls, user, report_type):
+        """
+        Panaudoti vieną kreditą iš seniausiai pasibaigiančio paketo
+
+        Kandidatas parenkamas su SKIP LOCKED (kiti tab'ai / worker'iai ima
+        kitą paketą arba kitą eilutę, nelaukia), po to vienas sąlyginis
+        UPDATE remaining = remaining - 1 WHERE remaining > 0.
+
+        Returns:
+            ReportPackage arba None jei aktyvių kreditų nėra
+        """
+        candidates = (
+            cls.active_for(user.id, report_type)
+            .order_by(F('expires_at').asc(nulls_last=True), 'purchased_at')
+            .select_for_update(skip_locked=True)
+            .only('id', 'package_type', 'report_type')
+        )
+        for _ in range(3):
+            with transaction.atomic():
+                package = candidates.first()
+                if package is None:
+                    return None
+                updated = cls.objects.filter(pk=package.pk, reports_remaining__gt=0).update(
+                    reports_remaining=F('reports_remaining') - 1,
+                    is_active=Case(When(reports_remaining=1, then=Value(False)), default=Value(True)),
+                )
+            if updated:
+                return package
+        return None
+
+    @classmethod
+    def restore(cls, package_id):
+        """Grąžinti kreditą (pirkimas nepavyko po consume)"""
+        cls.objects.filter(pk=package_id).update(reports_remaining=F('reports_remaining') + 1, is_active=True)
+
     def use_report(self):
         """Panaudoti vieną ataskaitą iš paketo"""
-        if self.reports_remaining > 0:
-            self.reports_remaining -= 1
-            if self.reports_remaining == 0:
-                self.is_active = False
-            self.save()
-            return True
-        return False
+        updated = ReportPackage.objects.filter(pk=self.pk, reports_remaining__gt=0).update(
+            reports_remaining=F('reports_remaining') - 1,
+            is_active=Case(When(reports_remaining=1, then=Value(False)), default=Value(True)),
+        )
+        if updated:
+            self.refresh_from_db(fields=['reports_remaining', 'is_active'])
+        return bool(updated)
 
 
 class APILog(models.Model):
     """
     API užklausų logging modelis
-    Saugo visas užklausas į Carfax, Autocheck, NMVTIS API
+    Saugo visas užklausas į CheapCarfax (Carfax, Autocheck) API
+    Rašoma per api_log.writer (buferis + bulk_create), PostgreSQL - mėnesinės particijos
+
+    PostgreSQL PK - sudėtinis (id, created_at) (migracija 0010, particijos raktas
+    turi būti PK dalis). Django 5.0 state'e PK lieka tik id: id unikalus per
+    sequence, bet DB to nebegarantuoja - id nerašyti rankomis, created_at
+    po įrašymo nekeisti (UPDATE perkeltų eilutę į kitą particiją).
     """
     API_PROVIDERS = (
         ('carfax', 'Carfax'),
         ('autocheck', 'Autocheck'),
         ('nmvtis', 'NMVTIS'),
+        ('cheapcarfax', 'CheapCarfax'),
     )
 
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     provider = models.CharField(max_length=20, choices=API_PROVIDERS)
-    vin = models.CharField(max_length=17)
+    endpoint = models.CharField(max_length=30, blank=True)
+    vin = models.CharField(max_length=17, blank=True)
     request_data = models.JSONField(default=dict, blank=True)
     response_data = models.JSONField(default=dict, blank=True)
-    status_code = models.IntegerField()
+    status_code = models.IntegerField(help_text='0 - transporto klaida (timeout, connection)')
     success = models.BooleanField(default=False)
     error_message = models.TextField(blank=True)
+    latency_ms = models.PositiveIntegerField(default=0)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Ne auto_now_add: įrašas į DB patenka vėliau nei įvyko užklausa (buferis)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:
         db_table = 'api_logs'
@@ -258,3 +830,56 @@ class APILog(models.Model):
 
     def __str__(self):
         return f"{self.provider} - {self.vin} - {'Success' if self.success else 'Failed'}"
+
+
+class RequestProfile(models.Model):
+    """
+    Atrinktos (sample / staff header) užklausos profilis - RequestProfilingMiddleware
+    Lentelė ribota: laikoma tik PROFILING_MAX_ROWS naujausių įrašų
+    """
+    SAMPLED_BY = (
+        ('rate', 'Sample rate'),
+        ('header', 'Staff header'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    view_name = models.CharField(max_length=200, blank=True, db_index=True)
+    status_code = models.PositiveSmallIntegerField()
+    sampled_by = models.CharField(max_length=10, choices=SAMPLED_BY)
+
+    wall_ms = models.PositiveIntegerField()
+    cpu_ms = models.PositiveIntegerField()
+    sql_count = models.PositiveIntegerField(default=0)
+    sql_ms = models.PositiveIntegerField(default=0)
+    upstream_count = models.PositiveIntegerField(default=0)
+    upstream_ms = models.PositiveIntegerField(default=0)
+    profile = models.TextField(blank=True)  # cProfile pstats ataskaita (jei įjungta)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'request_profiles'
+        verbose_name = 'Request Profile'
+        verbose_name_plural = 'Request Profiles'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.method} {self.view_name or self.path} - {self.wall_ms} ms"
+
+    @classmethod
+    def trim(cls, max_rows=None):
+        """
+        Palikti tik max_rows naujausių įrašų
+
+        Returns:
+            int: ištrintų įrašų skaičius
+        """
+        if max_rows is None:
+            max_rows = getattr(settings, 'PROFILING_MAX_ROWS', 5000)
+        boundary = cls.objects.order_by('-id').values_list('id', flat=True)[max_rows:max_rows + 1].first()
+        if boundary is None:
+            return 0
+        return cls.objects.filter(id__lte=boundary).delete()[0]
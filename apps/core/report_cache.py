@@ -0,0 +1,161 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  VIN REPORT CACHE                                        ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/report_cache.py          ║
+║  PASKIRTIS: Bendras (cross-user) VIN reportų cache      ║
+║  Redis -> Report lentelė -> CheapCarfax API             ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'vinreport'
+STATS_KEYS = ('hits', 'db_hits', 'misses')
+
+# Laukai, kurie saugomi cache
+CACHED_FIELDS = (
+    'vin', 'provider', 'score', 'accidents', 'owners', 'service_records',
+    'title_info', 'title_brands', 'odometer', 'yearMakeModel', 'upstream', 'html',
+)
+
+
+def _report_key(vin, provider):
+    return f'{KEY_PREFIX}:{provider}:{vin.upper()}'
+
+
+def _stats_key(name):
+    return f'{KEY_PREFIX}:stats:{name}'
+
+
+def _ttl():
+    return getattr(settings, 'REPORT_CACHE_TTL', 60 * 60 * 6)
+
+
+def _incr(name):
+    """Padidinti hit/miss skaitiklį (niekada nemeta klaidos)"""
+    key = _stats_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+    except Exception as e:
+        logger.warning(f"Report cache stats error: {str(e)}")
+
+
+def _from_db(vin, provider):
+    """
+    Fallback: šviežias Report iš DB (indeksas ant Report.vin)
+
+    Returns:
+        dict arba None
+    """
+    from .models import Report
+
+    fresh_since = timezone.now() - timedelta(seconds=_ttl())
+    report = (
+        Report.objects
+        .filter(vin=vin.upper(), report_type=provider, created_at__gte=fresh_since, html_available=True)
+        .only('vin', 'report_type', 'report_data', 'html_available', 'score', 'accidents', 'owners')
+        .order_by('-created_at')
+        .first()
+    )
+    if report is None:
+        return None
+
+    data = report.report_data or {}
+    if data.get('demo'):
+        return None
+
+    html = report.get_html()
+    if not html:
+        return None
+
+    return {
+        'vin': report.vin,
+        'provider': provider,
+        'score': report.score,
+        'accidents': report.accidents,
+        'owners': report.owners,
+        'service_records': data.get('service_records', 0),
+        'title_info': data.get('title_info', 'Unknown'),
+        'title_brands': data.get('title_brands', []),
+        'odometer': data.get('odometer', {}),
+        'yearMakeModel': data.get('yearMakeModel', ''),
+        'upstream': data.get('upstream', {}),
+        'html': html,
+    }
+
+
+def get_report(vin, provider, record_stats=True):
+    """
+    Gauti šviežią reportą iš cache
+
+    Args:
+        vin (str): VIN numeris
+        provider (str): 'carfax' arba 'autocheck'
+        record_stats (bool): ar skaičiuoti hit/miss (pakartotiniam patikrinimui - ne)
+
+    Returns:
+        dict: fetch_vehicle_report formato dict su 'cached': True, arba None
+    """
+    try:
+        data = cache.get(_report_key(vin, provider))
+    except Exception as e:
+        logger.warning(f"Report cache get error: {str(e)}")
+        data = None
+
+    if data is not None:
+        if record_stats:
+            _incr('hits')
+        logger.info(f"Report cache HIT: {provider} {vin}")
+        return dict(data, cached=True, demo=False)
+
+    data = _from_db(vin, provider)
+    if data is not None:
+        if record_stats:
+            _incr('db_hits')
+        logger.info(f"Report cache DB HIT: {provider} {vin}")
+        set_report(vin, provider, data)
+        return dict(data, cached=True, demo=False)
+
+    if record_stats:
+        _incr('misses')
+    return None
+
+
+def set_report(vin, provider, report):
+    """Išsaugoti reportą cache (demo reportai nesaugomi)"""
+    if not report or report.get('demo'):
+        return
+    data = {field: report[field] for field in CACHED_FIELDS if field in report}
+    try:
+        cache.set(_report_key(vin, provider), data, timeout=_ttl())
+    except Exception as e:
+        logger.warning(f"Report cache set error: {str(e)}")
+
+
+def invalidate(vin, provider):
+    """Pašalinti reportą iš cache"""
+    cache.delete(_report_key(vin, provider))
+
+
+def get_stats():
+    """
+    Cache hit/miss statistika
+
+    Returns:
+        dict: {'hits': int, 'db_hits': int, 'misses': int, 'hit_ratio': float}
+    """
+    values = cache.get_many([_stats_key(name) for name in STATS_KEYS])
+    stats = {name: int(values.get(_stats_key(name)) or 0) for name in STATS_KEYS}
+    total = sum(stats.values())
+    stats['hit_ratio'] = round((stats['hits'] + stats['db_hits']) / total, 4) if total else 0.0
+    return stats
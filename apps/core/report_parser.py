@@ -0,0 +1,368 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  CARFAX / AUTOCHECK HTML EXTRACTOR                       ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/report_parser.py         ║
+║  PASKIRTIS: Owners, accidents, service records, title   ║
+║  brands ir odometer iš CheapCarfax HTML                 ║
+║  Inkrementinis (chunk'ais) - ribota atmintis            ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from html import unescape
+import re
+
+CHUNK_SIZE = 64 * 1024          # feed() dalis
+MAX_TEXT_BUFFER = 4 * 1024      # max tekstas tarp tag'ų, kurį laikome atmintyje
+MAX_ODOMETER_READINGS = 200     # max saugomų odometro rodmenų
+
+# Tag'ai, kurių turinio nenagrinėjame
+SKIP_TAGS = frozenset(('script', 'style', 'noscript', 'template'))
+# Uždarantis skip tag'as - bet kokio raidžių dydžio (</SCRIPT>, </Style>)
+RE_SKIP_END = {tag: re.compile(rf'</{tag}\b', re.I) for tag in SKIP_TAGS}
+# Block tag'ai - ties jais baigiasi "sakinys" (inline span/strong/b/a - ne:
+# '<li><strong>Owners:</strong> 2</li>' yra vienas sakinys)
+BLOCK_TAGS = frozenset((
+    'p', 'div', 'li', 'td', 'th', 'tr', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'section', 'table', 'ul', 'ol', 'dt', 'dd',
+))
+
+# ═══════════════════════════════════════════════════════
+# PRECOMPILED SELECTORS
+# ═══════════════════════════════════════════════════════
+RE_OWNERS = re.compile(
+    r'(?:(\d{1,2})\s+(?:previous\s+)?owners?\b)|(?:\bowners?\s*[:#]\s*(\d{1,2}))', re.I
+)
+RE_NO_ACCIDENTS = re.compile(r'\bno\s+accidents?\b', re.I)
+RE_ACCIDENT_SUMMARY = re.compile(
+    r'(?:(\d{1,2})\s+accidents?\b(?:\s+or\s+damage)?(?:\s+reported)?)|(?:\baccidents?\s*[:#]\s*(\d{1,2})\b)', re.I
+)
+RE_ACCIDENT_EVENT = re.compile(r'^\s*accident\s+reported\b', re.I)
+RE_SERVICE_SUMMARY = re.compile(r'(\d{1,4})\s+service\s+(?:history\s+)?records?\b', re.I)
+RE_SERVICE_EVENT = re.compile(r'^\s*vehicle\s+serviced\b', re.I)
+RE_NO_BRANDS = re.compile(r'\bno\s+(?:title\s+)?(?:brands?|problems?)\s+reported\b|\bclean\s+title\b', re.I)
+RE_TITLE_BRAND = re.compile(
+    r'\b(salvage|rebuilt|reconstructed|flood|junk|lemon|fire|hail|dismantled|'
+    r'total\s+loss|not\s+actual\s+mileage)\b(?:\s+damage)?\s+(?:title|brand)',
+    re.I,
+)
+# Title brand paneigimas: 'No salvage title', 'Salvage title not present', 'Salvage title: No'
+RE_NEGATION_BEFORE = re.compile(r'\b(?:no|not|never|without|free\s+of)\b[^.;,]{0,20}$', re.I)
+RE_NEGATION_AFTER = re.compile(
+    r'\s*(?:(?:is\s+|was\s+)?not\s+(?:present|reported|found|recorded|detected)\b|[:\-]?\s*(?:no|none)\b)', re.I
+)
+# Odometro rodmuo tik šalia odometer / mileage etiketės ('Located 5 miles from dealer' - ne)
+RE_ODOMETER = re.compile(
+    r'\b(?:odometer|mileage)(?:\s+(?:reading|reported|reads|of))*\s*[:\-]?\s*'
+    r'(\d{1,3}(?:,\d{3})+|\d{1,7})(?:\s*(mi|miles|km)\b)?',
+    re.I,
+)
+# Etiketė be reikšmės (lentelės langelis / <dt>) - prijungiama prie kito teksto
+RE_LABEL = re.compile(r'(?:number\s+of\s+|previous\s+)?owners?|accidents?|(?:last\s+reported\s+)?odometer(?:\s+reading)?|mileage', re.I)
+# Tag'o atributai, žymintys odometro langelį (pvz. <td class="record-odometer">)
+RE_ODOMETER_ATTR = re.compile(r'odometer|mileage', re.I)
+RE_AUTOCHECK_SCORE = re.compile(r'autocheck\s+score\D{0,20}(\d{1,3})\b', re.I)
+RE_WHITESPACE = re.compile(r'\s+')
+# Greitas pre-filtras: tekstas be šių žodžių nenagrinėjamas detaliai
+RE_INTERESTING = re.compile(
+    r'owner|accident|servic|title|brand|score|salvage|rebuilt|flood|junk|lemon|hail|'
+    r'odometer|mileage',
+    re.I,
+)
+# Tokenizer: komentarai, doctype, tag'ai
+RE_TAG = re.compile(r'<!--.*?-->|<![^>]*>|<(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*)>', re.S)
+MAX_PENDING = 64 * 1024  # max neužbaigto tag'o dydis tarp chunk'ų
+
+
+class ReportExtractor:
+    """
+    Streaming HTML extractor
+
+    Nedidelis regex tokenizer'is vietoj html.parser.HTMLParser - mums reikia
+    tik teksto tarp tag'ų, o C lygio regex skenavimas kelis kartus greitesnis.
+    Atmintyje laikomas tik neužbaigtas chunk'o galas ir skaitikliai.
+
+    Usage:
+        extractor = ReportExtractor()
+        for chunk in chunks:
+            extractor.feed(chunk)
+        extractor.close()
+        facts = extractor.result()
+    """
+
+    def __init__(self):
+        self._pending = ''
+        self._skip_tag = None
+        self._text = []
+        self._text_len = 0
+        self._label = None
+
+        self.owners = None
+        self.accidents_summary = None
+        self.accident_events = 0
+        self.no_accidents = False
+        self.service_summary = None
+        self.service_events = 0
+        self.title_brands = []
+        self.clean_title = False
+        self.autocheck_score = None
+        self.odometer_readings = []
+        self.odometer_max = None
+        self.odometer_rollback = False
+        self.odometer_count = 0
+
+    # ─── Tokenizer ───────────────────────────────────────
+
+    def feed(self, chunk):
+        """Apdoroti kitą dokumento dalį"""
+        buf = self._pending + chunk if self._pending else chunk
+        pos = 0
+        length = len(buf)
+
+        while pos < length:
+            if self._skip_tag is not None:
+                end = RE_SKIP_END[self._skip_tag].search(buf, pos)
+                if end is None:
+                    # Laikome tik galą, kuriame gali prasidėti uždarantis tag'as
+                    pos = max(pos, length - len(self._skip_tag) - 2)
+                    break
+                pos = end.start()
+                self._skip_tag = None
+
+            match = RE_TAG.search(buf, pos)
+            if match is None:
+                lt = buf.find('<', pos)
+                if lt == -1:
+                    self._handle_data(buf[pos:])
+                    pos = length
+                else:
+                    self._handle_data(buf[pos:lt])
+                    pos = lt
+                break
+
+            if match.start() > pos:
+                self._handle_data(buf[pos:match.start()])
+            pos = match.end()
+
+            tag = match.group(2)
+            if tag is None:
+                continue  # komentaras / doctype
+            tag = tag.lower()
+            if tag in BLOCK_TAGS:
+                self._flush_text()
+            if not match.group(1):
+                if tag in SKIP_TAGS:
+                    self._skip_tag = tag
+                elif match.group(3) and RE_ODOMETER_ATTR.search(match.group(3)):
+                    self._label = 'Odometer'
+
+        self._pending = buf[pos:]
+        if len(self._pending) > MAX_PENDING:
+            # Sugadintas HTML ('<' be '>') - nelaikome be galo
+            if self._skip_tag is None:
+                self._handle_data(self._pending)
+            self._pending = ''
+
+    def close(self):
+        """Dokumento pabaiga"""
+        if self._pending and self._skip_tag is None:
+            self._handle_data(self._pending)
+        self._pending = ''
+        self._flush_text()
+
+    def _handle_data(self, data):
+        if not data:
+            return
+        self._text.append(data)
+        self._text_len += len(data)
+        if self._text_len > MAX_TEXT_BUFFER:
+            self._flush_text()
+
+    # ─── Text analysis ───────────────────────────────────
+
+    def _flush_text(self):
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text = []
+        self._text_len = 0
+        if text.isspace():
+            return  # Tarpai tarp tag'ų - etiketė lieka kitam tekstui
+        if self._label is not None:
+            text = f'{self._label}: {text}'
+            self._label = None
+        if not RE_INTERESTING.search(text):
+            return
+        if '&' in text:
+            text = unescape(text)
+        text = RE_WHITESPACE.sub(' ', text).strip()
+        if RE_LABEL.fullmatch(text.rstrip(':# ')):
+            self._label = text.rstrip(':# ')
+            return
+        self._analyze(text)
+
+    def _analyze(self, text):
+        match = RE_OWNERS.search(text)
+        if match:
+            owners = int(match.group(1) or match.group(2))
+            self.owners = max(self.owners or 0, owners)
+
+        if RE_NO_ACCIDENTS.search(text):
+            self.no_accidents = True
+        else:
+            match = RE_ACCIDENT_SUMMARY.search(text)
+            if match:
+                accidents = int(match.group(1) or match.group(2))
+                self.accidents_summary = max(self.accidents_summary or 0, accidents)
+            elif RE_ACCIDENT_EVENT.search(text):
+                self.accident_events += 1
+
+        match = RE_SERVICE_SUMMARY.search(text)
+        if match:
+            self.service_summary = max(self.service_summary or 0, int(match.group(1)))
+        elif RE_SERVICE_EVENT.search(text):
+            self.service_events += 1
+
+        if RE_NO_BRANDS.search(text):
+            self.clean_title = True
+        else:
+            for match in RE_TITLE_BRAND.finditer(text):
+                if _negated(text, match):
+                    continue
+                brand = RE_WHITESPACE.sub(' ', match.group(1)).title()
+                if brand not in self.title_brands:
+                    self.title_brands.append(brand)
+
+        if self.autocheck_score is None:
+            match = RE_AUTOCHECK_SCORE.search(text)
+            if match:
+                self.autocheck_score = min(100, int(match.group(1)))
+
+        for match in RE_ODOMETER.finditer(text):
+            self._add_odometer(match.group(1), match.group(2))
+
+    def _add_odometer(self, value, unit):
+        reading = int(value.replace(',', ''))
+        if unit and unit.lower() == 'km':
+            reading = int(reading * 0.621371)
+        if reading <= 0:
+            return
+
+        self.odometer_count += 1
+        if self.odometer_max is not None and reading < self.odometer_max * 0.9:
+            self.odometer_rollback = True
+        self.odometer_max = max(self.odometer_max or 0, reading)
+
+        self.odometer_readings.append(reading)
+        if len(self.odometer_readings) > MAX_ODOMETER_READINGS:
+            # Saugome tik naujausius rodmenis
+            del self.odometer_readings[0]
+
+    # ─── Result ──────────────────────────────────────────
+
+    def result(self):
+        """
+        Returns:
+            dict: {
+                'owners': int | None,
+                'accidents': int | None,
+                'service_records': int | None,
+                'title_brands': list,
+                'title_info': str,
+                'odometer': dict,
+                'autocheck_score': int | None,
+            }
+        """
+        if self.accidents_summary is not None:
+            accidents = max(self.accidents_summary, self.accident_events)
+        elif self.accident_events:
+            accidents = self.accident_events
+        elif self.no_accidents:
+            accidents = 0
+        else:
+            accidents = None
+
+        if self.service_summary is not None:
+            service_records = self.service_summary
+        else:
+            service_records = self.service_events or None
+
+        if self.title_brands:
+            title_info = ', '.join(self.title_brands)
+        elif self.clean_title:
+            title_info = 'Clean'
+        else:
+            title_info = 'Unknown'
+
+        return {
+            'owners': self.owners,
+            'accidents': accidents,
+            'service_records': service_records,
+            'title_brands': list(self.title_brands),
+            'title_info': title_info,
+            'odometer': {
+                'last': self.odometer_readings[-1] if self.odometer_readings else None,
+                'max': self.odometer_max,
+                'readings': self.odometer_count,
+                'rollback_suspected': self.odometer_rollback,
+                'recent': self.odometer_readings[-10:],
+            },
+            'autocheck_score': self.autocheck_score,
+        }
+
+
+def _negated(text, match):
+    """Ar title brand paminėjimas paneigtas ('No salvage title', 'Salvage title not present')"""
+    return bool(
+        RE_NEGATION_BEFORE.search(text, max(0, match.start() - 40), match.start())
+        or RE_NEGATION_AFTER.match(text, match.end())
+    )
+
+
+def iter_chunks(html, chunk_size=CHUNK_SIZE):
+    """Suskaidyti string'ą į chunk'us (be kopijavimo viso dokumento)"""
+    for start in range(0, len(html), chunk_size):
+        yield html[start:start + chunk_size]
+
+
+def extract_report_facts(html):
+    """
+    Ištraukti faktus iš HTML
+
+    Args:
+        html (str | iterable): visas dokumentas arba chunk'ų iteratorius
+            (pvz. response.iter_content(decode_unicode=True))
+
+    Returns:
+        dict: žr. ReportExtractor.result()
+    """
+    extractor = ReportExtractor()
+    chunks = iter_chunks(html) if isinstance(html, str) else html
+    for chunk in chunks:
+        extractor.feed(chunk)
+    extractor.close()
+    return extractor.result()
+
+
+def compute_score(facts):
+    """
+    Apskaičiuoti 0-100 score iš faktų
+
+    Returns:
+        int arba None jei dokumente nerasta jokių faktų
+    """
+    if facts.get('autocheck_score') is not None:
+        return facts['autocheck_score']
+
+    known = [facts.get('owners'), facts.get('accidents'), facts.get('service_records')]
+    if all(value is None for value in known) and facts.get('title_info') == 'Unknown':
+        return None
+
+    score = 100
+    score -= 15 * (facts.get('accidents') or 0)
+    score -= 5 * max(0, (facts.get('owners') or 1) - 1)
+    if facts.get('title_brands'):
+        score -= 40
+    if facts.get('odometer', {}).get('rollback_suspected'):
+        score -= 20
+    return max(0, min(100, score))
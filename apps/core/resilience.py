@@ -0,0 +1,242 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  CIRCUIT BREAKER + RETRY POLICY                          ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/resilience.py            ║
+║  PASKIRTIS: Fail-fast kai CheapCarfax degraduoja        ║
+║  Būsena cache (Redis) - bendra visiems worker'iams      ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+import logging
+import random
+import time
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+# Endpoint'ai, už kurių sėkmingą atsakymą CheapCarfax nuskaičiuoja kreditą
+BILLED_ENDPOINTS = ('carfax_html', 'autocheck_html')
+
+# Statusai, kai upstream užklausos neapdorojo (saugu kartoti net billed endpoint'ams)
+NOT_PROCESSED_STATUSES = (429, 503)
+# Statusai, kuriuos kartojame tik nemokamiems endpoint'ams
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """Circuit breaker atidarytas - upstream nekviečiamas"""
+
+    def __init__(self, message='Service temporarily unavailable'):
+        super().__init__(message)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker vienam endpoint'ui (closed / open / half-open)
+
+    - closed: užklausos leidžiamos, skaičiuojamos klaidos ir lėti atsakymai
+      fiksuoto laiko lange
+    - open: visos užklausos iškart atmetamos (CircuitOpenError)
+    - half-open: pasibaigus open laikui praleidžiama viena bandomoji užklausa;
+      jos sėkmė uždaro breaker'į, klaida vėl atidaro. Kitų (prieš atsidarymą
+      pradėtų, vėlai pasibaigusių) užklausų rezultatai tripped būsenoje ignoruojami.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.window = getattr(settings, 'CHEAPCARFAX_BREAKER_WINDOW', 60)
+        self.min_calls = getattr(settings, 'CHEAPCARFAX_BREAKER_MIN_CALLS', 10)
+        self.error_rate = getattr(settings, 'CHEAPCARFAX_BREAKER_ERROR_RATE', 0.5)
+        self.slow_call_seconds = getattr(settings, 'CHEAPCARFAX_BREAKER_SLOW_CALL_SECONDS', 20)
+        self.slow_call_rate = getattr(settings, 'CHEAPCARFAX_BREAKER_SLOW_CALL_RATE', 0.5)
+        self.open_seconds = getattr(settings, 'CHEAPCARFAX_BREAKER_OPEN_SECONDS', 30)
+
+    def _key(self, suffix):
+        return f'breaker:{self.name}:{suffix}'
+
+    def _bucket_key(self, counter):
+        bucket = int(time.time() // self.window)
+        return self._key(f'{bucket}:{counter}')
+
+    def _incr(self, key):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, timeout=self.window * 2):
+                return 1
+            return cache.incr(key)
+        except Exception as e:
+            logger.warning(f"Circuit breaker {self.name} counter error: {str(e)}")
+            return 0
+
+    @property
+    def state(self):
+        """'closed', 'open' arba 'half_open'"""
+        if cache.get(self._key('open')):
+            return 'open'
+        if cache.get(self._key('tripped')):
+            return 'half_open'
+        return 'closed'
+
+    def before_call(self):
+        """
+        Patikrinti ar galima kviesti upstream
+
+        Returns:
+            bool: True - ši užklausa yra half-open probe (perduoti į record_*)
+
+        Raises:
+            CircuitOpenError: jei breaker'is atidarytas arba half-open probe jau vyksta
+        """
+        state = self.state
+        if state == 'open':
+            raise CircuitOpenError()
+        if state == 'half_open':
+            # Tik vienas bandomasis request'as visiems worker'iams
+            if not cache.add(self._key('probe'), 1, timeout=self.open_seconds):
+                raise CircuitOpenError()
+            logger.info(f"Circuit breaker {self.name}: half-open probe")
+            return True
+        return False
+
+    def record_success(self, latency, probe=False):
+        """Užfiksuoti sėkmingą (upstream sveikas) atsakymą"""
+        if cache.get(self._key('tripped')):
+            # Uždaro tik probe - ne vėlai grįžusi užklausa, pradėta prieš atsidarymą
+            if probe:
+                self._close()
+            return
+
+        calls = self._incr(self._bucket_key('calls'))
+        if latency >= self.slow_call_seconds:
+            slow = self._incr(self._bucket_key('slow'))
+            if calls >= self.min_calls and slow / calls >= self.slow_call_rate:
+                self._open(f'{slow}/{calls} slow calls')
+
+    def record_failure(self, probe=False):
+        """Užfiksuoti klaidą (timeout, connection error, 5xx)"""
+        if cache.get(self._key('tripped')):
+            if probe:
+                self._open('half-open probe failed')
+            return
+
+        calls = self._incr(self._bucket_key('calls'))
+        failures = self._incr(self._bucket_key('failures'))
+        if calls >= self.min_calls and failures / calls >= self.error_rate:
+            self._open(f'{failures}/{calls} failed calls')
+
+    def _open(self, reason):
+        logger.error(f"Circuit breaker {self.name} OPEN: {reason}")
+        cache.set(self._key('open'), 1, timeout=self.open_seconds)
+        cache.set(self._key('tripped'), 1, timeout=None)
+        cache.delete(self._key('probe'))
+
+    def _close(self):
+        logger.info(f"Circuit breaker {self.name} CLOSED")
+        cache.delete_many([self._key('open'), self._key('tripped'), self._key('probe')])
+
+    async def abefore_call(self):
+        return await sync_to_async(self.before_call, thread_sensitive=False)()
+
+    async def arecord_success(self, latency, probe=False):
+        await sync_to_async(self.record_success, thread_sensitive=False)(latency, probe)
+
+    async def arecord_failure(self, probe=False):
+        await sync_to_async(self.record_failure, thread_sensitive=False)(probe)
+
+
+_breakers = {}
+
+
+def get_breaker(endpoint):
+    """Grąžina (procese pernaudojamą) breaker'į endpoint'ui"""
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        breaker = _breakers[endpoint] = CircuitBreaker(f'cheapcarfax:{endpoint}')
+    return breaker
+
+
+def _connection_never_established(exc):
+    """Ar užklausa tikrai nebuvo išsiųsta (saugu kartoti net billed endpoint'ams)"""
+    if isinstance(exc, (requests.exceptions.ConnectTimeout, httpx.ConnectTimeout, httpx.ConnectError)):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class RetryPolicy:
+    """
+    Retry su jittered exponential backoff ir bendru deadline
+
+    Billed endpoint'ai kartojami tik kai užklausa tikrai nepasiekė upstream
+    (connect klaida) arba upstream aiškiai jos neapdorojo (429/503).
+    Read timeout billed endpoint'ui NEkartojamas - reportas galėjo būti apmokėtas.
+    """
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None, deadline=None):
+        self.max_attempts = max_attempts or getattr(settings, 'CHEAPCARFAX_RETRY_MAX_ATTEMPTS', 3)
+        self.base_delay = base_delay or getattr(settings, 'CHEAPCARFAX_RETRY_BASE_DELAY', 0.5)
+        self.max_delay = max_delay or getattr(settings, 'CHEAPCARFAX_RETRY_MAX_DELAY', 4)
+        self.deadline = deadline or getattr(settings, 'CHEAPCARFAX_REQUEST_DEADLINE', 40)
+
+    def should_retry_exception(self, exc, endpoint):
+        if _connection_never_established(exc):
+            return True
+        if endpoint in BILLED_ENDPOINTS:
+            return False
+        return isinstance(exc, (
+            requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+            httpx.TransportError,
+        ))
+
+    def should_retry_status(self, status_code, endpoint):
+        if endpoint in BILLED_ENDPOINTS:
+            return status_code in NOT_PROCESSED_STATUSES
+        return status_code in TRANSIENT_STATUSES
+
+    def backoff(self, attempt, deadline_at):
+        """
+        Kiek laukti prieš kitą bandymą (full jitter)
+
+        Args:
+            attempt (int): ką tik nepavykusio bandymo numeris (nuo 1)
+            deadline_at (float): time.monotonic() deadline
+
+        Returns:
+            float arba None jei bandymų / laiko nebeliko
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        # Po laukimo turi likti bent sekundė pačiai užklausai
+        if time.monotonic() + delay + 1 >= deadline_at:
+            return None
+        return delay
+
+
+def is_retryable_failure(status_code=0, exc=None):
+    """
+    Ar nepavykusį billed fetch'ą saugu kartoti vėliau (pvz. Celery retry)
+
+    Tos pačios taisyklės kaip RetryPolicy billed endpoint'ams: connect klaida,
+    atidarytas breaker'is (upstream nekviestas) arba 429/503. Read timeout,
+    404, 402 ir kiti 4xx/5xx - ne: reportas galėjo būti apmokėtas arba
+    pakartojimas nieko nepakeis.
+    """
+    if exc is not None:
+        return isinstance(exc, CircuitOpenError) or _connection_never_established(exc)
+    return status_code in NOT_PROCESSED_STATUSES
+
+
+def is_upstream_failure(status_code):
+    """Ar statusas rodo upstream gedimą (breaker'iui)"""
+    return status_code >= 500 or status_code == 429
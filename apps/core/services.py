@@ -0,0 +1,387 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  REPORT PURCHASE SERVICE                                 ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/services.py              ║
+║  PASKIRTIS: Bendras reporto pirkimo kelias              ║
+║  (search_vin sync režimas ir Celery run_report_job)     ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal
+import csv
+import io
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import job_events
+from .api import ReportFetchError, afetch_vehicle_report, fetch_vehicle_report, storable_report_data
+from .models import BalanceHold, Report, ReportPackage, UserProfile
+
+logger = logging.getLogger(__name__)
+
+VIN_RE = re.compile(r'^[A-HJ-NPR-Z0-9]{17}$')
+
+
+class PurchaseError(Exception):
+    """Pirkimas nepavyko - message rodomas vartotojui"""
+
+    def __init__(self, message, status=400, retryable=False):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.retryable = retryable
+
+
+def report_price(report_type):
+    """Vieno reporto kaina (PLN)"""
+    prices = settings.REPORT_PRICES.get(report_type, {})
+    return Decimal(str(prices.get('single', 0)))
+
+
+def _fetch_error(error=None):
+    """
+    Upstream klaida -> PurchaseError
+
+    retryable tik kai upstream užklausos tikrai neapmokėjo (connect klaida,
+    429/503, atidarytas breaker'is); 404 ir kiti 4xx - iškart galutinė klaida.
+    """
+    if error is not None and error.status_code == 404:
+        return PurchaseError('VIN not found. Please check the VIN and try again.', status=404)
+    return PurchaseError(
+        'Could not retrieve report. Please try again later.',
+        status=500,
+        retryable=error is not None and error.retryable,
+    )
+
+
+def fetch_report(vin, report_type):
+    """
+    Upstream fetch (per report_cache / single-flight)
+
+    Raises:
+        PurchaseError: reporto gauti nepavyko (retryable - žr. _fetch_error)
+    """
+    logger.info(f"Fetching {report_type} report for VIN: {vin}")
+    try:
+        report_data = fetch_vehicle_report(vin, report_type)
+    except ReportFetchError as e:
+        raise _fetch_error(e)
+    if not report_data:
+        raise _fetch_error()
+    return report_data
+
+
+def save_report(user, vin, report_type, price, report_data, job=None, reservation=None):
+    """
+    Nuskaičiuoti balansą ir išsaugoti Report vienoje transakcijoje
+
+    Args:
+        job (ReportJob): jei nurodytas - Report pririšamas prie job'o
+            (pakartotinis task'o vykdymas nebeskaičiuoja antrą kartą)
+        reservation (Reservation): paketo kreditas (balansas nekeičiamas) arba
+            BalanceHold (capture); pasibaigęs rezervas -> įprastas nuskaičiavimas
+
+    Returns:
+        Report
+
+    Raises:
+        PurchaseError: nepakanka balanso
+    """
+    html = report_data.get('html', '')
+    package = reservation.package if reservation is not None else None
+    hold = reservation.hold if reservation is not None else None
+    if package is not None:
+        price = package.unit_price
+
+    with transaction.atomic():
+        if job is not None:
+            job = type(job).objects.select_for_update().get(pk=job.pk)
+            if job.report_id:
+                return job.report
+
+        report = Report.objects.create(
+            user=user,
+            vin=vin,
+            report_type=report_type,
+            report_data=storable_report_data(report_data),  # Faktai + upstream metadata (be HTML)
+            html_available=bool(html),
+            price_paid=price,
+            score=report_data.get('score', 0),
+            accidents=report_data.get('accidents', 0),
+            owners=report_data.get('owners')
+        )
+
+        if package is not None:
+            logger.info(f"Used {report_type} package {package.id} credit for {user.username}")
+        elif hold is not None and hold.capture(price):
+            logger.info(f"Captured {price} PLN from hold {hold.id} for {user.username}")
+        else:
+            # Sąlyginis UPDATE (be profilio lock'o) - nepakanka balanso -> visa transakcija atšaukiama
+            profile = UserProfile.objects.only('id', 'user_id', 'balance').get(user=user)
+            if not profile.deduct_balance(price, kind='purchase', reference=f'report:{report.id}'):
+                raise PurchaseError(f'Insufficient balance. You need {price} PLN. Please add funds.')
+            logger.info(f"Deducted {price} PLN from {user.username}")
+
+        report.store_html(html)  # ✅ HTML iš CheapCarfax - suspaustas ReportContent
+
+        if job is not None:
+            job.report = report
+            job.status = 'saved'
+            job.error = ''
+            job.save(update_fields=['report', 'status', 'error', 'updated_at'])
+            transaction.on_commit(lambda: job_events.publish(job))
+
+    if reservation is not None:
+        reservation.used = True
+    logger.info(f"Report created: ID={report.id}, VIN={vin}, Has HTML={report.has_html}")
+    return report
+
+
+class Reservation:
+    """
+    Pirkimo apmokėjimo rezervas prieš upstream fetch:
+    paketo kreditas (ReportPackage) arba balanso rezervas (BalanceHold)
+    """
+
+    def __init__(self, package=None, hold=None):
+        self.package = package
+        self.hold = hold
+        self.used = False  # save_report nustato kai Report išsaugotas
+
+    def restore_package(self):
+        """Grąžinti nepanaudotą paketo kreditą"""
+        if self.package is not None and not self.used:
+            ReportPackage.restore(self.package.id)
+            self.package = None
+
+    def cancel(self):
+        """Grąžinti viską, kas nepanaudota (no-op po sėkmingo save_report)"""
+        self.restore_package()
+        if self.hold is not None:
+            self.hold.release()
+
+
+def place_hold(user, price, reference):
+    """
+    Rezervuoti kainą prieš upstream fetch
+
+    Raises:
+        PurchaseError: nepakanka balanso
+    """
+    hold = BalanceHold.place(user, price, reference=reference)
+    if hold is None:
+        raise PurchaseError(f'Insufficient balance. You need {price} PLN. Please add funds.')
+    return hold
+
+
+def reserve_purchase(user, report_type, price, reference):
+    """
+    Pirma - aktyvaus paketo kreditas, kitaip - balanso rezervas
+
+    Returns:
+        Reservation
+
+    Raises:
+        PurchaseError: nei kreditų, nei balanso
+    """
+    package = ReportPackage.consume(user, report_type)
+    if package is not None:
+        return Reservation(package=package)
+    return Reservation(hold=place_hold(user, price, reference))
+
+
+def purchase_report(user, vin, report_type):
+    """
+    Sinchroninis pirkimas: rezervas -> fetch -> capture + save
+    Upstream klaida ar išimtis - kreditas / rezervas grąžinamas
+
+    Returns:
+        Report
+
+    Raises:
+        PurchaseError
+    """
+    price = report_price(report_type)
+    reservation = reserve_purchase(user, report_type, price, f'{report_type}:{vin}')
+    try:
+        report_data = fetch_report(vin, report_type)
+        return save_report(user, vin, report_type, price, report_data, reservation=reservation)
+    finally:
+        reservation.cancel()  # No-op jei jau panaudotas
+
+
+async def apurchase_report(user, vin, report_type):
+    """
+    purchase_report() async variantas (ASGI search_vin)
+
+    Upstream laukiama event loop'e; tik trumpa DB transakcija
+    (charge + save) vykdoma thread'e.
+
+    Returns:
+        Report
+
+    Raises:
+        PurchaseError
+    """
+    price = report_price(report_type)
+    reservation = await sync_to_async(reserve_purchase)(user, report_type, price, f'{report_type}:{vin}')
+    try:
+        logger.info(f"Fetching {report_type} report for VIN: {vin}")
+        try:
+            report_data = await afetch_vehicle_report(vin, report_type)
+        except ReportFetchError as e:
+            raise _fetch_error(e)
+        if not report_data:
+            raise _fetch_error()
+        return await sync_to_async(save_report)(user, vin, report_type, price, report_data, reservation=reservation)
+    finally:
+        await sync_to_async(reservation.cancel)()
+
+
+# ═══════════════════════════════════════════════════════
+# BATCH PIRKIMAS (dealer'ių VIN sąrašai)
+# ═══════════════════════════════════════════════════════
+
+def parse_vin_list(text):
+    """
+    CSV / naujų eilučių VIN sąrašas -> validūs unikalūs VIN'ai
+
+    Priimami kableliai, kabliataškiai, tarpai ir eilutės; 'VIN' antraštė praleidžiama.
+
+    Returns:
+        tuple: (vins, invalid, duplicates) - vins pradine tvarka be pasikartojimų
+    """
+    vins, invalid = [], []
+    seen = set()
+    duplicates = 0
+    for row in csv.reader(io.StringIO(text), delimiter=','):
+        for cell in row:
+            for token in re.split(r'[\s;]+', cell):
+                token = token.strip().strip('"\'').upper()
+                if not token or token == 'VIN':
+                    continue
+                if not VIN_RE.match(token):
+                    invalid.append(token[:32])
+                elif token in seen:
+                    duplicates += 1
+                else:
+                    seen.add(token)
+                    vins.append(token)
+    return vins, invalid, duplicates
+
+
+def _fetch_in_thread(vin, report_type):
+    """fetch_report() worker thread'e - DB jungtis uždaroma po darbo"""
+    try:
+        return fetch_report(vin, report_type)
+    finally:
+        connections.close_all()
+
+
+def batch_hold_ttl():
+    """
+    Batch'o rezervo TTL (s): blogiausias vieno VIN laikas + BALANCE_HOLD_TTL atsarga
+
+    Vienas VIN gali laukti single-flight lyderio, tada Redis lock'o, tada
+    upstream užklausos su visais retry (CHEAPCARFAX_REQUEST_DEADLINE).
+    iter_batch_purchase pratęsia rezervą tiek pat po kiekvieno baigto VIN.
+    """
+    lock_timeout = getattr(settings, 'REPORT_FETCH_LOCK_TIMEOUT', 45)
+    item_timeout = 2 * lock_timeout + getattr(settings, 'CHEAPCARFAX_REQUEST_DEADLINE', 40)
+    return item_timeout + getattr(settings, 'BALANCE_HOLD_TTL', 120)
+
+
+def iter_batch_purchase(user, vins, report_type, concurrency=None, hold=None):
+    """
+    Batch pirkimas: upstream fetch lygiagrečiai (ribotas pool'as),
+    charge + save po vieną šiame thread'e
+
+    Rezultatai grąžinami baigimo tvarka. Pritrūkus balanso likę VIN'ai
+    nebesiunčiami į upstream (kiekvienas fetch kainuoja upstream kreditą).
+
+    Args:
+        hold (BalanceHold): batch'o rezervas (be paketų kreditų dalies) - kiekvienas
+            reportas pirma naudoja paketo kreditą, kitaip capture'ina savo kainą;
+            po kiekvieno VIN pratęsiamas batch_hold_ttl(), nepanaudotas likutis
+            grąžinamas pabaigoje
+
+    Yields:
+        tuple: (vin, Report arba None, klaidos pranešimas arba None)
+    """
+    if concurrency is None:
+        concurrency = getattr(settings, 'BATCH_PURCHASE_CONCURRENCY', 4)
+    price = report_price(report_type)
+    hold_ttl = batch_hold_ttl()
+    pending = iter(vins)
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='batch-fetch')
+    in_flight = {}
+
+    def submit_next():
+        vin = next(pending, None)
+        if vin is not None:
+            in_flight[executor.submit(_fetch_in_thread, vin, report_type)] = vin
+
+    try:
+        for _ in range(max(1, concurrency)):
+            submit_next()
+
+        stopped = None
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            if hold is not None and not stopped:
+                # Likę fetch'ai prasidėjo ne anksčiau nei dabar - rezervas turi juos pergyventi
+                hold.extend(hold_ttl)
+            for future in done:
+                vin = in_flight.pop(future)
+                if stopped:
+                    yield vin, None, stopped
+                    continue
+                reservation = Reservation(hold=hold)
+                try:
+                    report_data = future.result()
+                    reservation.package = ReportPackage.consume(user, report_type)
+                    report = save_report(user, vin, report_type, price, report_data, reservation=reservation)
+                except PurchaseError as e:
+                    reservation.restore_package()
+                    if e.status == 400 and not e.retryable:
+                        # Nepakanka balanso - likusių nebefetch'inti
+                        stopped = e.message
+                    yield vin, None, e.message
+                except Exception as e:
+                    reservation.restore_package()
+                    logger.error(f"Batch purchase error for {vin}: {str(e)}", exc_info=True)
+                    yield vin, None, 'An error occurred. Please try again.'
+                else:
+                    yield vin, report, None
+                if not stopped:
+                    submit_next()
+
+        if stopped:
+            for vin in pending:
+                yield vin, None, stopped
+    finally:
+        # Klientas atsijungė / klaida - neprasidėję fetch'ai atšaukiami
+        executor.shutdown(wait=False, cancel_futures=True)
+        if hold is not None:
+            hold.release()
+
+
+def report_summary(report):
+    """Report -> JSON dict (search_vin / job status atsakymams)"""
+    return {
+        'id': report.id,
+        'vin': report.vin,
+        'type': report.get_report_type_display(),
+        'score': report.score,
+        'accidents': report.accidents,
+        'owners': report.owners,
+        'price': float(report.price_paid),
+        'has_html': report.has_html,  # ✅ Info ar yra HTML
+        'created_at': report.created_at.strftime('%Y-%m-%d %H:%M')
+    }
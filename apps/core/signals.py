@@ -2,10 +2,10 @@
 Django Signals
 Automatiškai atlieka veiksmus kai vyksta tam tikri events
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import Report, UserProfile, UserReportStats
 
 
 @receiver(post_save, sender=User)
@@ -18,10 +18,17 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+@receiver(post_save, sender=Report)
+def count_created_report(sender, instance, created, **kwargs):
     """
-    Išsaugoti UserProfile kai išsaugomas User
+    Padidinti vartotojo reportų skaitiklius (UserReportStats)
+    Tik naujiems reportams - update'ai skaitiklių nekeičia
     """
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+    if created:
+        UserReportStats.record(instance.user_id, instance.report_type, instance.price_paid)
+
+
+@receiver(post_delete, sender=Report)
+def count_removed_report(sender, instance, **kwargs):
+    """Sumažinti skaitiklius kai reportas ištrinamas / grąžinamas"""
+    UserReportStats.record(instance.user_id, instance.report_type, instance.price_paid, sign=-1)
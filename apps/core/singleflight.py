@@ -0,0 +1,229 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  SINGLE-FLIGHT REQUEST COALESCING                        ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/singleflight.py          ║
+║  PASKIRTIS: Vienas upstream fetch per raktą vienu metu  ║
+║  In-process (threading / asyncio) + Redis lock          ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import logging
+import threading
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightTimeout(Exception):
+    """
+    Kito iškvietimo (to paties key) rezultato nesulaukta per wait_timeout
+
+    Laukiantis fn() pats nekviečia - lyderio (apmokamas) fetch'as dar vyksta,
+    antras būtų apmokėtas dar kartą. Kartoti vėliau (rezultatas bus cache).
+    """
+
+    def __init__(self, key):
+        super().__init__(f'Request for {key} is still in flight')
+        self.key = key
+
+
+class _Call:
+    """Vykdomas (in-flight) iškvietimas, kurio rezultatą laukia kiti thread'ai"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def do(key, fn, wait_timeout=None):
+    """
+    Įvykdyti fn() tik vieną kartą vienam key šiame procese
+
+    Jei tas pats key jau vykdomas kitame thread'e - palaukti ir grąžinti
+    jo rezultatą (arba iškelti tą pačią klaidą).
+
+    Args:
+        key (str): coalescing raktas, pvz. 'carfax:1HGBH41JXMN109186'
+        fn (callable): funkcija be argumentų
+        wait_timeout (float): kiek laukėjas laukia lyderio; None - be ribos
+
+    Returns:
+        fn() rezultatas
+
+    Raises:
+        InFlightTimeout: laukėjas nesulaukė lyderio (fn() pats nekviečia)
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _calls[key] = call
+
+    if not leader:
+        logger.info(f"Single-flight: waiting for in-flight {key}")
+        if not call.event.wait(wait_timeout):
+            logger.warning(f"Single-flight: wait timeout for {key}, leader still running")
+            raise InFlightTimeout(key)
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.event.set()
+
+
+@contextmanager
+def distributed_lock(key, timeout, blocking_timeout):
+    """
+    Redis lock tarp gunicorn worker'ių
+
+    Jei cache backend'as nepalaiko lock'ų (pvz. LocMemCache) arba Redis
+    nepasiekiamas - tęsiama be lock'o (geriau dvigubas fetch nei klaida).
+    Lock'ą laiko kitas worker'is ilgiau nei blocking_timeout - InFlightTimeout
+    (jo fetch'as dar vyksta, antras būtų apmokėtas dar kartą).
+
+    Yields:
+        bool: ar lock'as gautas (False - tik be lock'ų palaikymo)
+
+    Raises:
+        InFlightTimeout: lock'as neatsilaisvino per blocking_timeout
+    """
+    lock_factory = getattr(cache, 'lock', None)
+    if lock_factory is None:
+        yield False
+        return
+
+    try:
+        lock = lock_factory(f'singleflight:{key}', timeout=timeout, blocking_timeout=blocking_timeout)
+        acquired = lock.acquire()
+    except Exception as e:
+        logger.warning(f"Single-flight lock unavailable for {key}: {str(e)}")
+        yield False
+        return
+
+    if not acquired:
+        logger.warning(f"Single-flight lock wait timeout for {key}, another worker still fetching")
+        raise InFlightTimeout(key)
+
+    try:
+        yield True
+    finally:
+        try:
+            lock.release()
+        except Exception as e:
+            # Lock'as galėjo pasibaigti (timeout) - nieko blogo
+            logger.warning(f"Single-flight lock release failed for {key}: {str(e)}")
+
+
+# ═══════════════════════════════════════════════════════
+# ASYNCIO VARIANTAI (async views)
+# ═══════════════════════════════════════════════════════
+
+# Kiekvienam event loop'ui - atskiras in-flight task'ų žodynas
+_async_calls = weakref.WeakKeyDictionary()
+
+
+async def ado(key, fn, wait_timeout=None):
+    """
+    do() asyncio variantas: coroutine vykdoma tik vieną kartą vienam key
+    šiame event loop'e, kiti laukiantys gauna tą patį rezultatą
+
+    Args:
+        key (str): coalescing raktas
+        fn (callable): funkcija be argumentų, grąžinanti coroutine
+        wait_timeout (float): kiek laukėjas laukia lyderio; None - be ribos
+            (pats lyderis visada laukia savo task'o)
+
+    Returns:
+        coroutine rezultatas
+
+    Raises:
+        InFlightTimeout: laukėjas nesulaukė lyderio (fn() pats nekviečia)
+    """
+    calls = _async_calls.setdefault(asyncio.get_running_loop(), {})
+    task = calls.get(key)
+    leader = task is None
+    if leader:
+        task = asyncio.ensure_future(fn())
+        calls[key] = task
+        task.add_done_callback(lambda _: calls.pop(key, None))
+    else:
+        logger.info(f"Single-flight: waiting for in-flight {key}")
+
+    # shield - atšaukta laukianti užklausa neatšaukia bendro fetch'o
+    if leader:
+        # Lyderis laukia savo task'o - antras fn() būtų antras (apmokestintas) fetch
+        return await asyncio.shield(task)
+
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), wait_timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Single-flight: wait timeout for {key}, leader still running")
+        raise InFlightTimeout(key)
+
+
+@asynccontextmanager
+async def adistributed_lock(key, timeout, blocking_timeout, poll_interval=0.1):
+    """
+    distributed_lock() asyncio variantas
+
+    Lock'as laukiamas ne thread'e, o asyncio.sleep() ciklu (non-blocking
+    acquire), todėl laukiantys pirkimai neužima thread pool'o.
+
+    Yields:
+        bool: ar lock'as gautas (False - tik be lock'ų palaikymo)
+
+    Raises:
+        InFlightTimeout: lock'as neatsilaisvino per blocking_timeout
+    """
+    lock_factory = getattr(cache, 'lock', None)
+    if lock_factory is None:
+        yield False
+        return
+
+    try:
+        # thread_local=False - acquire ir release gali vykti skirtinguose thread'uose
+        lock = lock_factory(f'singleflight:{key}', timeout=timeout, thread_local=False)
+        acquire = sync_to_async(lock.acquire, thread_sensitive=False)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + blocking_timeout
+        acquired = await acquire(blocking=False)
+        while not acquired and loop.time() < deadline:
+            await asyncio.sleep(poll_interval)
+            acquired = await acquire(blocking=False)
+    except Exception as e:
+        logger.warning(f"Single-flight lock unavailable for {key}: {str(e)}")
+        yield False
+        return
+
+    if not acquired:
+        logger.warning(f"Single-flight lock wait timeout for {key}, another worker still fetching")
+        raise InFlightTimeout(key)
+
+    try:
+        yield True
+    finally:
+        try:
+            await sync_to_async(lock.release, thread_sensitive=False)()
+        except Exception as e:
+            logger.warning(f"Single-flight lock release failed for {key}: {str(e)}")
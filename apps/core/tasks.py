@@ -0,0 +1,124 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  CELERY TASKS                                            ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/tasks.py                 ║
+║  PASKIRTIS: Background darbai (Celery worker / beat)    ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from celery import shared_task
+from django.conf import settings
+import logging
+
+from .cheapcarfax import refresh_limits_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def refresh_upstream_limits():
+    """Atnaujinti CheapCarfax limits snapshot cache"""
+    snapshot = refresh_limits_snapshot()
+    if snapshot:
+        logger.info(
+            f"Limits snapshot: carfax={snapshot['carfax_reports_left_today']} "
+            f"autocheck={snapshot['autocheck_reports_left_today']} credits={snapshot['credits']}"
+        )
+
+
+@shared_task(ignore_result=True)
+def snapshot_balances():
+    """Balanso snapshot'ai vartotojams, kurių ledger pasikeitė (reconciliation be pilnos istorijos)"""
+    from .models import BalanceSnapshot
+
+    created = BalanceSnapshot.capture()
+    logger.info(f"Balance snapshots created: {created}")
+
+
+@shared_task(ignore_result=True)
+def sweep_balance_holds():
+    """Grąžinti pasibaigusius BalanceHold rezervus (pvz. worker'is nukrito vidury pirkimo)"""
+    from .models import BalanceHold
+
+    released = BalanceHold.sweep_expired()
+    if released:
+        logger.warning(f"Expired balance holds released: {released}")
+
+
+@shared_task(ignore_result=True)
+def maintain_api_log_partitions():
+    """api_logs: iš anksto sukurti ateinančių mėnesių particijas ir pašalinti senas"""
+    from . import api_log
+
+    if not api_log.is_partitioned():
+        return
+    api_log.ensure_partitions()
+    dropped = api_log.prune_partitions(api_log.retention_cutoff())
+    if dropped:
+        logger.info(f"API log partitions dropped: {', '.join(dropped)}")
+
+
+@shared_task(bind=True, acks_late=True, max_retries=getattr(settings, 'REPORT_JOB_MAX_RETRIES', 3))
+def run_report_job(self, job_id):
+    """
+    Asinchroninis reporto pirkimas: rezervas -> fetch -> capture + save
+
+    Idempotentiškas: jei job'as jau turi Report (pvz. worker'is nukrito po
+    commit'o ir task'as paleistas iš naujo), nieko nekartojama ir
+    antrą kartą neskaičiuojama.
+
+    Nepavykęs fetch nieko nepalieka report_cache, todėl kiekvienas retry -
+    naujas (mokamas) upstream fetch. Kartojama tik kai upstream užklausos
+    tikrai neapdorojo (connect klaida, 429/503, atidarytas breaker'is);
+    404, 402, read timeout ir kitos klaidos - job'as iškart 'failed'.
+    Netikėta klaida kartojama tik iki upstream fetch'o: vėliau (pvz. DB klaida
+    save_report) reportas jau galėjo būti apmokėtas - job'as 'failed'.
+    """
+    from .models import ReportJob
+    from .services import PurchaseError, fetch_report, report_price, reserve_purchase, save_report
+
+    try:
+        job = ReportJob.objects.select_related('user').get(pk=job_id)
+    except ReportJob.DoesNotExist:
+        logger.error(f"Report job {job_id} not found")
+        return None
+
+    if job.is_final:
+        logger.info(f"Report job {job_id} already {job.status}")
+        return job.status
+
+    job.set_status('fetching')
+    price = job.price or report_price(job.report_type)
+    reservation = None
+    fetch_started = False
+    try:
+        # Paketo kreditas arba balanso rezervas kiekvienam bandymui - upstream klaida / retry jį grąžina
+        reservation = reserve_purchase(job.user, job.report_type, price, f'job:{job.id}')
+        fetch_started = True
+        report_data = fetch_report(job.vin, job.report_type)
+        # Faktai jau išparsinti - liko suspausti HTML, nuskaičiuoti ir išsaugoti
+        job.set_status('parsing')
+        save_report(job.user, job.vin, job.report_type, price, report_data, job=job, reservation=reservation)
+    except PurchaseError as e:
+        if e.retryable and self.request.retries < self.max_retries:
+            job.set_status('queued', e.message)
+            countdown = getattr(settings, 'REPORT_JOB_RETRY_DELAY', 10) * (2 ** self.request.retries)
+            logger.warning(f"Report job {job_id} failed ({e.message}), retry in {countdown}s")
+            raise self.retry(countdown=countdown)
+        job.set_status('failed', e.message)
+        logger.error(f"Report job {job_id} failed: {e.message}")
+        return 'failed'
+    except Exception as e:
+        logger.error(f"Report job {job_id} error: {str(e)}", exc_info=True)
+        if not fetch_started and self.request.retries < self.max_retries:
+            job.set_status('queued', 'Temporary error, retrying')
+            raise self.retry(countdown=getattr(settings, 'REPORT_JOB_RETRY_DELAY', 10))
+        job.set_status('failed', 'An error occurred. Please try again.')
+        return 'failed'
+    finally:
+        if reservation is not None:
+            reservation.cancel()  # No-op jei panaudotas
+
+    logger.info(f"Report job {job_id} saved")
+    return 'saved'
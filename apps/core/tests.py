@@ -2,10 +2,52 @@
 UNIT TESTS
 Testai modeliams, views, formoms
 """
-from django.test import TestCase
-from django.contrib.auth.models import User
-from .models import UserProfile, Report
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.core.management import call_command
+from django.contrib.auth.models import AnonymousUser, User
+from django.utils import timezone
+from django.http import HttpResponse
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from .models import APILog, BalanceHold, BalanceLedger, BalanceSnapshot, ReportPackage, RequestProfile, Transaction, UserProfile, Report, ReportContent, ReportJob, UserReportStats
+from .tasks import run_report_job
+from .api import ReportFetchError, fetch_vehicle_report, storable_report_data
+from .services import PurchaseError, batch_hold_ttl, parse_vin_list, purchase_report
+from .cheapcarfax import CheapCarfaxAPI, get_http_session, close_http_session, get_limits_snapshot, has_upstream_quota, note_report_consumed, LIMITS_CACHE_KEY
+from .cheapcarfax_async import AsyncCheapCarfaxAPI
+from . import api_log
+from .middleware import AsyncWhiteNoiseMiddleware, RequestProfilingMiddleware
+from . import benchmarks
+from .fake_cheapcarfax import FakeServerConfig, make_server
+from . import report_cache
+from . import upstream_metrics
+from . import async_views
+from . import singleflight
+from . import job_events
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from .report_parser import ReportExtractor, compute_score, extract_report_facts
+from .sample_reports import generate_report_html, sample_facts
+from datetime import timedelta
 from decimal import Decimal
+import asyncio
+import json
+import gzip
+import httpx
+import io
+import threading
+import zipfile
+import time
+import requests
+from unittest import mock
+from celery.exceptions import Retry
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Puslapių testams nereikia collectstatic manifest'o
+PLAIN_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
 
 
 class UserProfileTestCase(TestCase):
@@ -40,6 +82,145 @@ class UserProfileTestCase(TestCase):
         """Testuoti insufficient balance"""
         result = self.user.profile.deduct_balance(100)
         self.assertFalse(result)
+        self.assertFalse(BalanceLedger.objects.filter(user=self.user).exists())
+
+    def test_stale_profile_cannot_overspend(self):
+        """Du pasenę profilio objektai - antras nuskaičiavimas atmetamas DB sąlyga"""
+        self.user.profile.add_balance(20)
+        first = UserProfile.objects.get(user=self.user)
+        second = UserProfile.objects.get(user=self.user)
+        self.assertTrue(first.deduct_balance(15))
+        self.assertFalse(second.deduct_balance(15))
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, Decimal('5.00'))
+
+    def test_user_save_keeps_balance(self):
+        """User.save() (pvz. login -> last_login) neperrašo balanso pasenusiu profiliu"""
+        self.user.profile.add_balance(100)
+        cached_user = User.objects.select_related('profile').get(pk=self.user.pk)
+        self.assertTrue(UserProfile.objects.get(user=self.user).deduct_balance(Decimal('14.99')))
+
+        cached_user.last_login = timezone.now()
+        cached_user.save()
+
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, Decimal('85.01'))
+        self.assertEqual(BalanceSnapshot.expected_balance(self.user.id), Decimal('85.01'))
+
+    def test_ledger_and_snapshots(self):
+        """Kiekvienas pokytis ledger'yje; snapshot + vėlesni įrašai = balansas"""
+        payment = Transaction.objects.create(
+            user=self.user, amount=Decimal('50.00'), payment_method='card', transaction_id='tx-1',
+        )
+        payment.mark_completed()
+        payment.mark_completed()  # Pakartotinis webhook - antrą kartą neįskaitoma
+        self.user.profile.deduct_balance(Decimal('14.99'), reference='report:1')
+
+        entries = list(BalanceLedger.objects.filter(user=self.user).order_by('id').values_list('amount', 'balance_after'))
+        self.assertEqual(entries, [(Decimal('50.00'), Decimal('50.00')), (Decimal('-14.99'), Decimal('35.01'))])
+
+        self.assertEqual(BalanceSnapshot.capture(), 1)
+        self.user.profile.deduct_balance(Decimal('5.00'))
+        self.assertEqual(BalanceSnapshot.expected_balance(self.user.id), Decimal('30.01'))
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, Decimal('30.01'))
+        with self.assertRaises(ValueError):
+            BalanceLedger.objects.filter(user=self.user).first().save()
+
+
+class BalanceHoldTestCase(TestCase):
+    """Dviejų fazių rezervo (place -> capture / release) testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user.profile.add_balance(50)
+
+    def balance(self):
+        return UserProfile.objects.get(user=self.user).balance
+
+    def test_partial_capture_then_release(self):
+        """Rezervas iškart sumažina balansą, release grąžina tik nepanaudotą dalį"""
+        hold = BalanceHold.place(self.user, Decimal('30.00'), reference='batch:x')
+        self.assertEqual(self.balance(), Decimal('20.00'))
+        self.assertIsNone(BalanceHold.place(self.user, Decimal('30.00')))
+
+        self.assertTrue(hold.capture(Decimal('12.00')))
+        self.assertFalse(hold.capture(Decimal('20.00')))
+        self.assertEqual(hold.release(), Decimal('18.00'))
+        self.assertEqual(hold.release(), Decimal('0.00'))
+
+        self.assertEqual(self.balance(), Decimal('38.00'))
+        self.assertEqual(BalanceHold.objects.get(pk=hold.pk).status, 'captured')
+        self.assertEqual(BalanceSnapshot.expected_balance(self.user.id), Decimal('38.00'))
+
+    @mock.patch('apps.core.services.fetch_vehicle_report', return_value=None)
+    def test_upstream_failure_releases_hold(self, fetch):
+        """Upstream nepavyko - rezervas grąžinamas, niekas nenuskaičiuota"""
+        with self.assertRaises(PurchaseError):
+            purchase_report(self.user, '1HGBH41JXMN109186', 'carfax')
+        self.assertEqual(self.balance(), Decimal('50.00'))
+        self.assertEqual(BalanceHold.objects.get().status, 'released')
+
+    def test_sweep_expired(self):
+        """Pasibaigę rezervai grąžinami; capture po sweep nebeveikia"""
+        hold = BalanceHold.place(self.user, Decimal('14.99'))
+        BalanceHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(BalanceHold.sweep_expired(), 1)
+        self.assertEqual(self.balance(), Decimal('50.00'))
+        self.assertEqual(BalanceHold.objects.get(pk=hold.pk).status, 'expired')
+        self.assertFalse(hold.capture())
+        self.assertFalse(hold.extend(600))
+
+    def test_extend_outlives_sweep(self):
+        """Pratęstas batch'o rezervas nebegrąžinamas sweep_expired"""
+        hold = BalanceHold.place(self.user, Decimal('14.99'), ttl=1)
+        BalanceHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertTrue(hold.extend(batch_hold_ttl()))
+        self.assertEqual(BalanceHold.sweep_expired(), 0)
+        self.assertGreater(BalanceHold.objects.get(pk=hold.pk).expires_at, timezone.now() + timedelta(seconds=120))
+
+
+class ReportPackageTestCase(TestCase):
+    """Paketų kreditų naudojimo testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def package(self, remaining, **kwargs):
+        return ReportPackage.objects.create(
+            user=self.user, package_type='10', report_type='carfax',
+            reports_remaining=remaining, total_reports=10, **kwargs,
+        )
+
+    def test_consume_soonest_expiring_first(self):
+        """Pirma - greičiausiai pasibaigiantis paketas; paskutinis kreditas išjungia paketą"""
+        later = self.package(5)
+        sooner = self.package(1, expires_at=timezone.now() + timedelta(days=1))
+        self.package(3, expires_at=timezone.now() - timedelta(days=1))  # Pasibaigęs
+
+        self.assertEqual(ReportPackage.consume(self.user, 'carfax').id, sooner.id)
+        self.assertEqual(ReportPackage.consume(self.user, 'carfax').id, later.id)
+        sooner.refresh_from_db()
+        self.assertEqual((sooner.reports_remaining, sooner.is_active), (0, False))
+        self.assertEqual(ReportPackage.credits_for(self.user.id), {'carfax': 4})
+        self.assertIsNone(ReportPackage.consume(self.user, 'autocheck'))
+
+    @mock.patch('apps.core.services.fetch_vehicle_report')
+    def test_purchase_uses_package_and_restores_on_failure(self, fetch):
+        """Pirkimas ima kreditą (balansas nekeičiamas), upstream klaida - kreditas grąžinamas"""
+        package = self.package(2)
+
+        fetch.return_value = None
+        with self.assertRaises(PurchaseError):
+            purchase_report(self.user, '1HGBH41JXMN109186', 'carfax')
+        package.refresh_from_db()
+        self.assertEqual(package.reports_remaining, 2)
+
+        fetch.return_value = dict(FAKE_REPORT)
+        report = purchase_report(self.user, '1HGBH41JXMN109186', 'carfax')
+        package.refresh_from_db()
+        self.assertEqual(package.reports_remaining, 1)
+        self.assertEqual(report.price_paid, Decimal('12.99'))
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, Decimal('0.00'))
 
 
 class ReportTestCase(TestCase):
@@ -62,3 +243,1173 @@ class ReportTestCase(TestCase):
         )
         self.assertEqual(report.vin, '1HGBH41JXMN109186')
         self.assertEqual(report.score, 85)
+
+    def test_report_stats_counters(self):
+        """Skaitikliai atnaujinami kuriant / trinant reportus ir perskaičiuojami komanda"""
+        first = Report.objects.create(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price_paid=Decimal('14.99'))
+        Report.objects.create(user=self.user, vin='1HGBH41JXMN109187', report_type='autocheck', price_paid=Decimal('12.99'))
+        stats = UserReportStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_reports, stats.carfax_reports, stats.autocheck_reports), (2, 1, 1))
+        self.assertEqual(stats.total_spent, Decimal('27.98'))
+
+        first.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_reports, stats.carfax_reports), (1, 0))
+
+        UserReportStats.objects.filter(user=self.user).update(total_reports=99)
+        call_command('rebuild_report_stats', stdout=io.StringIO())
+        stats.refresh_from_db()
+        self.assertEqual(stats.total_reports, 1)
+        self.assertEqual(stats.total_spent, Decimal('12.99'))
+
+    def test_html_stored_compressed(self):
+        """HTML saugomas suspaustas ReportContent, has_html - iš flag'o"""
+        report = Report.objects.create(
+            user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price_paid=Decimal('14.99'),
+        )
+        self.assertFalse(report.has_html)
+        html = generate_report_html('1HGBH41JXMN109186', 'carfax', 50_000, seed=1)
+        report.store_html(html)
+
+        report = Report.objects.get(id=report.id)
+        self.assertTrue(report.has_html)
+        self.assertLess(len(report.content.data), report.content.raw_size / 3)
+        self.assertEqual(report.get_html(), html)
+
+    def test_storable_report_data_drops_html(self):
+        """report_data saugo faktus + upstream metadata, bet ne HTML"""
+        data = storable_report_data({
+            'vin': '1HGBH41JXMN109186', 'provider': 'carfax', 'score': 70, 'html': '<h1>x</h1>',
+            'raw_data': {'id': 'abc', 'html': '<h1>x</h1>', 'raw_data': {'html': '<h1>x</h1>'}},
+        })
+        self.assertNotIn('html', data)
+        self.assertNotIn('raw_data', data)
+        self.assertEqual(data['score'], 70)
+        self.assertEqual(data['upstream']['id'], 'abc')
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_compact_report_data_command(self):
+        """Komanda išmeta dublikatus ir perkelia HTML į ReportContent"""
+        cache.clear()
+        legacy = Report.objects.create(
+            user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price_paid=Decimal('14.99'),
+            report_data={'score': 60, 'html': '<h1>Report</h1>', 'raw_data': {'id': 'u1', 'html': '<h1>Report</h1>'}},
+        )
+        call_command('compact_report_data', '--sleep', '0', stdout=io.StringIO())
+
+        legacy = Report.objects.get(id=legacy.id)
+        self.assertTrue(legacy.has_html)
+        self.assertEqual(legacy.get_html(), '<h1>Report</h1>')
+        self.assertEqual(legacy.report_data['score'], 60)
+        self.assertNotIn('html', legacy.report_data)
+        self.assertNotIn('raw_data', legacy.report_data)
+
+    def test_backfill_report_content_command(self):
+        """Senas report_html stulpelis -> ReportContent batch'ais, stulpelis išvalomas"""
+        with connection.cursor() as cursor:
+            cursor.execute('ALTER TABLE reports ADD COLUMN report_html text NULL')
+        self.addCleanup(lambda: connection.cursor().execute('ALTER TABLE reports DROP COLUMN report_html'))
+        legacy = [
+            Report.objects.create(user=self.user, vin=f'1HGBH41JXMN10918{i}', report_type='carfax', price_paid=Decimal('14.99'))
+            for i in range(3)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE reports SET report_html = %s WHERE id IN (%s, %s)', ['<h1>Old</h1>', legacy[0].id, legacy[2].id])
+
+        call_command('backfill_report_content', '--batch-size', '1', '--sleep', '0', stdout=io.StringIO())
+
+        self.assertEqual([Report.objects.get(id=r.id).get_html() for r in legacy], ['<h1>Old</h1>', '', '<h1>Old</h1>'])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM reports WHERE report_html IS NOT NULL')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    @mock.patch('apps.core.management.commands.bulk_fetch_reports.fetch_vehicle_report',
+                side_effect=lambda vin, report_type, refresh=False: dict(FAKE_REPORT, vin=vin))
+    def test_bulk_fetch_reports_command(self, fetch):
+        """Bulk insert + skaitikliai be signalų, pakartotinis paleidimas tęsia nuo checkpoint'o"""
+        cache.clear()
+        vins = 'VIN\n1HGBH41JXMN109186\nJH4DC4360SS001610\n'
+        for _ in range(2):
+            with mock.patch('sys.stdin', io.StringIO(vins)):
+                call_command('bulk_fetch_reports', '--user', 'testuser', '--rate', '0', '--batch-size', '1',
+                             stdout=io.StringIO())
+
+        self.assertEqual(fetch.call_count, 2)
+        reports = Report.objects.filter(user=self.user).order_by('vin')
+        self.assertEqual([r.vin for r in reports], ['1HGBH41JXMN109186', 'JH4DC4360SS001610'])
+        self.assertEqual(reports[0].get_html(), '<h1>Carfax</h1>')
+        stats = UserReportStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_reports, stats.carfax_reports), (2, 2))
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    @mock.patch('apps.core.api.fetch_carfax_report', side_effect=lambda vin: dict(FAKE_REPORT, html='<h1>Fresh</h1>'))
+    def test_bulk_fetch_refresh_skips_stored_reports(self, upstream):
+        """--refresh - upstream kviečiamas net jei yra šviežias Report DB"""
+        cache.clear()
+        stored = Report.objects.create(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax',
+                                       html_available=True, price_paid=Decimal('14.99'))
+        ReportContent.objects.create(report=stored, **ReportContent.build_fields('<h1>Stored</h1>'))
+
+        with mock.patch('sys.stdin', io.StringIO('1HGBH41JXMN109186')):
+            call_command('bulk_fetch_reports', '--user', 'testuser', '--rate', '0', '--refresh', stdout=io.StringIO())
+
+        self.assertEqual(upstream.call_count, 1)
+        latest = Report.objects.filter(user=self.user).latest('id')
+        self.assertEqual(latest.get_html(), '<h1>Fresh</h1>')
+
+
+class CheapCarfaxTransportTestCase(TestCase):
+    """Bendro HTTP pool'o testai"""
+
+    def tearDown(self):
+        close_http_session()
+
+    def test_session_is_shared(self):
+        """Visi klientai naudoja tą pačią sesiją"""
+        self.assertIs(get_http_session(), get_http_session())
+
+    def test_session_recreated_after_close(self):
+        """Po close_http_session sukuriama nauja sesija"""
+        first = get_http_session()
+        close_http_session()
+        self.assertIsNot(first, get_http_session())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class APILogWriterTestCase(TestCase):
+    """Buferinio APILog rašymo testai"""
+
+    def setUp(self):
+        self.writer = api_log.APILogWriter(background=False)
+        for patcher in (
+            mock.patch.object(api_log, 'writer', self.writer),
+            mock.patch('apps.core.cheapcarfax.metrics', upstream_metrics.UpstreamMetrics(background=False)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_upstream_call_is_buffered_until_flush(self):
+        """_request tik įdeda įrašą į eilę, DB rašoma flush metu vienu bulk_create"""
+        response = mock.Mock(status_code=200, content=b'{"html": "x"}', text='')
+        session = mock.Mock(**{'get.return_value': response})
+        with mock.patch('apps.core.cheapcarfax.get_http_session', return_value=session):
+            CheapCarfaxAPI()._request('carfax_html', '/carfax/vin/1HGBH41JXMN109186/html', timeout=30)
+            CheapCarfaxAPI()._request('user_limits', '/user/limits', timeout=10)
+
+        self.assertFalse(APILog.objects.exists())
+        self.assertEqual(self.writer.pending(), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.writer.flush(), 2)
+
+        log = APILog.objects.get(endpoint='carfax_html')
+        self.assertEqual((log.provider, log.vin, log.status_code, log.success), ('carfax', '1HGBH41JXMN109186', 200, True))
+        self.assertEqual(log.response_data, {'bytes': 13})
+        self.assertEqual(APILog.objects.get(endpoint='user_limits').provider, 'cheapcarfax')
+
+    @override_settings(APILOG_MAX_QUEUE=2)
+    def test_full_queue_drops_entries(self):
+        """Pilna eilė neblokuoja - įrašas išmetamas"""
+        results = [api_log.log_upstream_call('user', '/user', 200, 0.01) for _ in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(self.writer.dropped, 1)
+
+    def test_prune_without_partitions_deletes_old_rows(self):
+        """Ne-PostgreSQL DB: prune_api_logs trina senesnius nei retention įrašus"""
+        APILog.objects.create(provider='carfax', status_code=200, created_at=timezone.now() - timedelta(days=400))
+        APILog.objects.create(provider='carfax', status_code=200)
+
+        call_command('prune_api_logs', months=6, stdout=io.StringIO())
+
+        self.assertEqual(APILog.objects.count(), 1)
+
+
+class FakeRedisHashes:
+    """Minimalus Redis hash'ų dublis (HINCRBY / HSET / HGETALL) metrikų testams"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        return []
+
+    def hincrby(self, key, field, amount):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = int(bucket.get(field, 0)) + amount
+
+    def hincrbyfloat(self, key, field, amount):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = float(bucket.get(field, 0)) + amount
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.hashes.get(key, {}).items()}
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+
+class UpstreamMetricsTestCase(TestCase):
+    """Upstream latency / statusų metrikų agregavimo ir /metrics/ testai"""
+
+    def setUp(self):
+        self.redis = FakeRedisHashes()
+        for patcher in (
+            mock.patch.object(upstream_metrics, 'metrics', upstream_metrics.UpstreamMetrics(background=False)),
+            mock.patch.object(upstream_metrics, '_client', return_value=self.redis),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_workers_are_aggregated_into_histogram(self):
+        """Dviejų worker'ių delta'os sumuojamos; histograma kumuliatyvi"""
+        first, second = upstream_metrics.UpstreamMetrics(background=False), upstream_metrics.metrics
+        first.observe('carfax_html', 200, 0.3)
+        first.observe('carfax_html', 502, 4.0)
+        first.flush(self.redis)
+        second.observe('carfax_html', 200, 0.05)
+        second.observe('user_limits', 0, 10.0, timeout=True)
+
+        with second.in_flight('carfax_html'):
+            text = upstream_metrics.render(*upstream_metrics.collect())
+
+        self.assertIn('autoinfo_upstream_requests_total{endpoint="carfax_html",provider="carfax",status="200"} 2', text)
+        self.assertIn('autoinfo_upstream_timeouts_total{endpoint="user_limits",provider="cheapcarfax"} 1', text)
+        self.assertIn('autoinfo_upstream_request_duration_seconds_bucket{endpoint="carfax_html",provider="carfax",le="0.1"} 1', text)
+        self.assertIn('autoinfo_upstream_request_duration_seconds_bucket{endpoint="carfax_html",provider="carfax",le="0.5"} 2', text)
+        self.assertIn('autoinfo_upstream_request_duration_seconds_bucket{endpoint="carfax_html",provider="carfax",le="+Inf"} 3', text)
+        self.assertIn('autoinfo_upstream_request_duration_seconds_count{endpoint="carfax_html",provider="carfax"} 3', text)
+        self.assertIn('autoinfo_upstream_in_flight{endpoint="carfax_html",provider="carfax"} 1', text)
+
+    def test_stale_worker_in_flight_is_ignored(self):
+        """Nukritusio worker'io in-flight gauge nebeskaičiuojamas ir išvalomas"""
+        self.redis.hset(upstream_metrics.WORKERS_KEY, 'old-host:1', time.time() - 3600)
+        self.redis.hset(upstream_metrics.IN_FLIGHT_KEY, 'carfax_html|carfax|old-host:1', 4)
+
+        _, in_flight = upstream_metrics.collect()
+
+        self.assertEqual(in_flight.get('carfax_html|carfax', 0), 0)
+        self.assertEqual(self.redis.hashes[upstream_metrics.IN_FLIGHT_KEY], {})
+
+    def test_endpoint_access(self):
+        """/metrics/: per proxy anonimui 403, staff - Prometheus tekstas"""
+        response = self.client.get('/metrics/', HTTP_X_FORWARDED_FOR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
+
+        User.objects.create_user(username='ops', password='pass', is_staff=True)
+        self.client.login(username='ops', password='pass')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'# TYPE autoinfo_upstream_request_duration_seconds histogram', response.content)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, STORAGES=PLAIN_STORAGES, PROFILING_SAMPLE_RATE=0)
+class RequestProfilingTestCase(TestCase):
+    """RequestProfilingMiddleware testai"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='ops', password='pass', is_staff=True)
+        self.client.login(username='ops', password='pass')
+
+    def test_staff_header_records_profile(self):
+        """Staff + X-Profile: įrašomas profilis ir grąžinamas Server-Timing"""
+        response = self.client.get('/dashboard/', HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.view_name, profile.sampled_by, profile.user), ('dashboard', 'header', self.staff))
+        self.assertGreater(profile.sql_count, 0)
+        self.assertEqual(profile.profile, '')
+
+    def test_header_ignored_for_regular_users(self):
+        """Ne staff vartotojo header'is ignoruojamas"""
+        User.objects.create_user(username='regular', password='pass')
+        self.client.login(username='regular', password='pass')
+
+        response = self.client.get('/dashboard/', HTTP_X_PROFILE='1')
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    async def test_async_chain_stays_async(self):
+        """ASGI: middleware'iai async - view'as vykdomas be async_to_sync, SQL skaičiuojamas"""
+        async def view(request):
+            await Report.objects.filter(user=self.staff).acount()
+            return HttpResponse('ok')
+
+        middleware = RequestProfilingMiddleware(view)
+        whitenoise = AsyncWhiteNoiseMiddleware(middleware)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertTrue(iscoroutinefunction(whitenoise))
+
+        request = AsyncRequestFactory().get('/api/balance/', headers={'X-Profile': '1'})
+
+        async def auser():
+            return self.staff
+        request.auser = auser
+        request.user = self.staff
+        response = await whitenoise(request)
+
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        profile = await RequestProfile.objects.aget()
+        self.assertEqual((profile.sampled_by, profile.sql_count), ('header', 1))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_CPROFILE=True)
+    def test_sampled_request_with_cprofile(self):
+        """Atrinkta užklausa: cProfile ataskaita, be Server-Timing"""
+        response = self.client.get('/dashboard/')
+
+        self.assertNotIn('Server-Timing', response)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.sampled_by, 'rate')
+        self.assertIn('function calls', profile.profile)
+
+    def test_trim_keeps_newest_rows(self):
+        """trim palieka tik max_rows naujausių"""
+        for _ in range(5):
+            RequestProfile.objects.create(method='GET', path='/', status_code=200, sampled_by='rate', wall_ms=1, cpu_ms=1)
+        newest = list(RequestProfile.objects.values_list('id', flat=True)[:2])
+
+        self.assertEqual(RequestProfile.trim(max_rows=2), 3)
+        self.assertEqual(list(RequestProfile.objects.values_list('id', flat=True)), newest)
+
+
+class BenchmarkQueryBudgetTestCase(TestCase):
+    """Hot-path SQL užklausų biudžetai (benchmarks.CASES max_queries)"""
+
+    def test_cases_stay_within_query_budget(self):
+        """Kiekvienas benchmark'as veikia offline ir neviršija užklausų biudžeto"""
+        ctx = benchmarks.BenchContext(reports=3, html_bytes=20_000)
+        with benchmarks.offline_environment(ctx.carfax_html):
+            results = benchmarks.run_all(ctx, rounds=1, warmup=1)
+
+        for name, result in results.items():
+            with self.subTest(benchmark=name):
+                self.assertLessEqual(result['queries'], benchmarks.CASES[name]['max_queries'])
+
+    def test_compare_flags_regressions(self):
+        """Lėtesnis nei threshold arba daugiau užklausų - regresija; triukšmas ignoruojamas"""
+        baseline = {'results': {
+            'dashboard': {'p50_ms': 10.0, 'queries': 5},
+            'view_report': {'p50_ms': 1.0, 'queries': 3},
+            'balance_add': {'p50_ms': 1.0, 'queries': 3},
+        }}
+        results = {
+            'dashboard': {'p50_ms': 14.0, 'queries': 5},
+            'view_report': {'p50_ms': 1.3, 'queries': 3},
+            'balance_add': {'p50_ms': 1.0, 'queries': 4},
+            'parse_carfax': {'p50_ms': 50.0, 'queries': 0},
+        }
+
+        statuses = {row['name']: row['status'] for row in benchmarks.compare(results, baseline, threshold=0.25)}
+
+        self.assertEqual(statuses, {
+            'dashboard': 'slower', 'view_report': 'ok', 'balance_add': 'queries', 'parse_carfax': 'new',
+        })
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CHEAPCARFAX_API_KEY='fake-key')
+class FakeCheapCarfaxServerTestCase(TestCase):
+    """Lokalus CheapCarfax pakaitalas su tikru CheapCarfaxAPI klientu"""
+
+    def _serve(self, **config):
+        server = make_server('127.0.0.1', 0, FakeServerConfig(
+            api_key='fake-key', report_bytes=50_000, latency='fixed', latency_ms=0, seed=1, **config,
+        ))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.addCleanup(close_http_session)
+        for patcher in (
+            mock.patch('apps.core.cheapcarfax.metrics', upstream_metrics.UpstreamMetrics(background=False)),
+            mock.patch.object(api_log, 'writer', api_log.APILogWriter(background=False)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        with self.settings(CHEAPCARFAX_API_URL=f'http://127.0.0.1:{server.server_address[1]}/api'):
+            return CheapCarfaxAPI()
+
+    def test_html_and_account_endpoints(self):
+        """HTML reportas su prašytu VIN ir dydžiu, /user/limits"""
+        api = self._serve()
+
+        result = api.get_carfax_html('5YJ3E1EA7KF000001')
+        self.assertTrue(result['success'])
+        self.assertIn('5YJ3E1EA7KF000001', result['html'])
+        self.assertGreaterEqual(len(result['html']), 50_000)
+        self.assertTrue(api.get_user_limits()['success'])
+
+    def test_injected_errors(self):
+        """402 klaidų dalis 1.0 - klientas gauna 'Insufficient API credits'"""
+        api = self._serve(error_rates={402: 1.0})
+
+        result = api.get_autocheck_html('5YJ3E1EA7KF000001')
+
+        self.assertEqual(result, {'success': False, 'error': 'Insufficient API credits', 'status_code': 402, 'retryable': False})
+
+
+async def run_with_ticker(coro, interval=0.01):
+    """
+    Vykdyti coroutine kartu su event loop ticker'iu
+
+    Returns:
+        tuple: (coroutine rezultatas, ticker'io tick'ų skaičius) - užblokuotas loop'as ~0 tick'ų
+    """
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(interval)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        return await coro, ticks
+    finally:
+        task.cancel()
+
+
+def slow_extract_report_facts(delay=0.3):
+    """extract_report_facts su dirbtiniu CPU laiku (blokuojantis sleep)"""
+    def extract(html):
+        time.sleep(delay)
+        return extract_report_facts(html)
+    return extract
+
+
+class AsyncCheapCarfaxTestCase(TestCase):
+    """AsyncCheapCarfaxAPI fan-out testai"""
+
+    def test_html_parse_runs_off_the_loop(self):
+        """Didelio reporto JSON + HTML parse neužblokuoja event loop'o"""
+        api = AsyncCheapCarfaxAPI()
+        response = httpx.Response(200, json={'id': 'r1', 'html': '<ul><li>Owners: 2</li></ul>'})
+
+        async def fake_arequest(*args, **kwargs):
+            return response
+
+        api._arequest = fake_arequest
+        with mock.patch('apps.core.cheapcarfax.extract_report_facts', side_effect=slow_extract_report_facts()):
+            result, ticks = asyncio.run(run_with_ticker(api.get_carfax_html('1HGBH41JXMN109186')))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['report_data']['owners'], 2)
+        self.assertGreaterEqual(ticks, 10)
+
+    def test_gather_keeps_order_and_limits_concurrency(self):
+        """gather_reports grąžina rezultatus ta pačia tvarka ir neviršija ribos"""
+        api = AsyncCheapCarfaxAPI()
+        state = {'active': 0, 'peak': 0}
+
+        async def fake_get_report(vin, report_type='carfax'):
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.01)
+            state['active'] -= 1
+            return {'success': True, 'vin': vin, 'provider': report_type}
+
+        api.get_report = fake_get_report
+        items = [(f'VIN{i:014d}', 'carfax') for i in range(8)]
+        results = asyncio.run(api.gather_reports(items, concurrency=3))
+
+        self.assertEqual([r['vin'] for r in results], [vin for vin, _ in items])
+        self.assertLessEqual(state['peak'], 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReportCacheTestCase(TestCase):
+    """Cross-user VIN report cache testai"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cacheuser', password='testpass123')
+
+    def test_set_and_get(self):
+        """Išsaugotas reportas grąžinamas kaip cache hit"""
+        report_cache.set_report('1HGBH41JXMN109186', 'carfax', {
+            'vin': '1HGBH41JXMN109186', 'provider': 'carfax', 'html': '<h1>x</h1>',
+            'score': 70, 'raw_data': {'html': '<h1>x</h1>'},
+        })
+        cached = report_cache.get_report('1HGBH41JXMN109186', 'carfax')
+        self.assertTrue(cached['cached'])
+        self.assertNotIn('raw_data', cached)
+        self.assertEqual(report_cache.get_stats()['hits'], 1)
+
+    def test_demo_not_cached(self):
+        """Demo reportai necache'inami"""
+        report_cache.set_report('1HGBH41JXMN109186', 'carfax', {'html': 'demo', 'demo': True})
+        self.assertIsNone(report_cache.get_report('1HGBH41JXMN109186', 'carfax'))
+        self.assertEqual(report_cache.get_stats()['misses'], 1)
+
+    def test_db_fallback(self):
+        """Šviežias Report iš DB naudojamas kai Redis tuščias"""
+        report = Report.objects.create(
+            user=self.user, vin='1HGBH41JXMN109186', report_type='autocheck',
+            report_data={'title_info': 'Clean'}, price_paid=Decimal('12.99'), score=80,
+        )
+        report.store_html('<h1>Autocheck</h1>')
+        cached = report_cache.get_report('1HGBH41JXMN109186', 'autocheck')
+        self.assertEqual(cached['html'], '<h1>Autocheck</h1>')
+        self.assertEqual(report_cache.get_stats()['db_hits'], 1)
+
+
+class SingleFlightTestCase(TestCase):
+    """Single-flight coalescing testai"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Vienu metu tas pats key vykdomas tik kartą"""
+        calls = []
+        started = threading.Event()
+
+        def slow_fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return {'vin': '1HGBH41JXMN109186'}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(singleflight.do('k', slow_fetch)))
+        leader.start()
+        started.wait(1)
+        results.append(singleflight.do('k', slow_fetch))
+        leader.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0], results[1])
+
+    async def test_async_calls_share_one_execution(self):
+        """ado(): lygiagrečios coroutine'os su tuo pačiu key - vienas vykdymas"""
+        calls = []
+
+        async def slow_fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {'vin': '1HGBH41JXMN109186'}
+
+        results = await asyncio.gather(*(singleflight.ado('k', slow_fetch) for _ in range(3)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [results[0]] * 3)
+
+    async def test_async_leader_ignores_wait_timeout(self):
+        """ado(): wait_timeout - tik laukėjams; lyderis nekartoja fetch'o"""
+        calls = []
+
+        async def slow_fetch():
+            calls.append(1)
+            number = len(calls)
+            await asyncio.sleep(0.05)
+            return number
+
+        self.assertEqual(await singleflight.ado('k', slow_fetch, wait_timeout=0.01), 1)
+        self.assertEqual(len(calls), 1)
+
+        results = await asyncio.gather(
+            *(singleflight.ado('k', slow_fetch, wait_timeout=0.01) for _ in range(2)), return_exceptions=True,
+        )
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(results[0], 2)
+        self.assertIsInstance(results[1], singleflight.InFlightTimeout)
+
+    def test_timed_out_follower_does_not_fetch(self):
+        """do(): laukėjas po wait_timeout - retryable klaida, ne antras (apmokamas) fetch"""
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def slow_fetch():
+            calls.append(1)
+            started.set()
+            release.wait(1)
+            return dict(FAKE_REPORT)
+
+        leader = threading.Thread(target=lambda: singleflight.do('carfax:1HGBH41JXMN109186', slow_fetch))
+        leader.start()
+        started.wait(1)
+        with override_settings(REPORT_FETCH_LOCK_TIMEOUT=0.01), \
+                mock.patch('apps.core.api.report_cache.get_report', return_value=None):
+            with self.assertRaises(ReportFetchError) as raised:
+                fetch_vehicle_report('1HGBH41JXMN109186', 'carfax')
+        release.set()
+        leader.join()
+
+        self.assertTrue(raised.exception.retryable)
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    CHEAPCARFAX_BREAKER_MIN_CALLS=3,
+    CHEAPCARFAX_BREAKER_ERROR_RATE=0.5,
+    CHEAPCARFAX_BREAKER_OPEN_SECONDS=30,
+)
+class CircuitBreakerTestCase(TestCase):
+    """Circuit breaker ir retry policy testai"""
+
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker('test')
+
+    def test_opens_after_error_rate_exceeded(self):
+        """Po klaidų breaker'is atsidaro ir atmeta užklausas"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_half_open_allows_single_probe(self):
+        """Half-open būsenoje praleidžiama tik viena užklausa, sėkmė uždaro"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        cache.delete(self.breaker._key('open'))  # open laikas baigėsi
+
+        self.assertEqual(self.breaker.state, 'half_open')
+        probe = self.breaker.before_call()
+        self.assertTrue(probe)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        # Vėlai grįžusi užklausa (pradėta prieš atsidarymą) breaker'io neuždaro ir neatidaro
+        self.breaker.record_success(0.1)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'half_open')
+
+        self.breaker.record_success(0.1, probe=probe)
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertFalse(self.breaker.before_call())
+
+    def test_billed_endpoints_not_retried_on_read_timeout(self):
+        """Read timeout apmokamam endpoint'ui nekartojamas"""
+        policy = RetryPolicy()
+        read_timeout = requests.exceptions.ReadTimeout()
+        self.assertFalse(policy.should_retry_exception(read_timeout, 'carfax_html'))
+        self.assertTrue(policy.should_retry_exception(read_timeout, 'user_limits'))
+        self.assertTrue(policy.should_retry_exception(requests.exceptions.ConnectTimeout(), 'carfax_html'))
+        self.assertFalse(policy.should_retry_status(500, 'carfax_html'))
+        self.assertTrue(policy.should_retry_status(503, 'carfax_html'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LimitsSnapshotTestCase(TestCase):
+    """Upstream limits snapshot testai"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unknown_snapshot_allows_purchase(self):
+        """Be snapshot pirkimai neblokuojami"""
+        self.assertTrue(has_upstream_quota('carfax'))
+
+    def test_exhausted_quota_blocks_purchase(self):
+        """carfax_reports_left_today == 0 blokuoja tik carfax"""
+        cache.set(LIMITS_CACHE_KEY, {'carfax_reports_left_today': 0, 'autocheck_reports_left_today': 3})
+        self.assertFalse(has_upstream_quota('carfax'))
+        self.assertTrue(has_upstream_quota('autocheck'))
+        self.assertTrue(has_upstream_quota('nmvtis'))
+
+    @mock.patch('apps.core.tasks.refresh_upstream_limits.apply_async')
+    def test_consumed_reports_counted_and_refresh_debounced(self, refresh):
+        """Pirkimai mažina snapshot per skaitiklį, atnaujinimas suplanuojamas vieną kartą"""
+        cache.set(LIMITS_CACHE_KEY, {'carfax_reports_left_today': 2, 'autocheck_reports_left_today': 3, 'fetched_at': 't1'})
+        for _ in range(3):
+            note_report_consumed('carfax')
+
+        snapshot = get_limits_snapshot()
+        self.assertEqual((snapshot['carfax_reports_left_today'], snapshot['autocheck_reports_left_today']), (0, 3))
+        self.assertFalse(has_upstream_quota('carfax'))
+        self.assertEqual(refresh.call_count, 1)
+
+        # Naujas snapshot - skaitiklis iš naujo
+        cache.set(LIMITS_CACHE_KEY, {'carfax_reports_left_today': 5, 'fetched_at': 't2'})
+        self.assertEqual(get_limits_snapshot()['carfax_reports_left_today'], 5)
+
+
+class ReportParserTestCase(TestCase):
+    """Carfax/Autocheck HTML extractor testai"""
+
+    def test_extracts_sample_report_facts(self):
+        """Faktai ištraukiami iš sintetinio reporto, script turinys ignoruojamas"""
+        facts = sample_facts(3)
+        html = generate_report_html('1HGBH41JXMN109186', 'carfax', 100_000, seed=3, facts=facts)
+        result = extract_report_facts(html)
+
+        self.assertEqual(result['owners'], facts['owners'])
+        self.assertEqual(result['accidents'], facts['accidents'])
+        self.assertEqual(result['service_records'], facts['service_records'])
+        self.assertEqual(result['title_brands'], facts['title_brands'])
+        self.assertIsNotNone(result['odometer']['last'])
+        self.assertIsNone(result['autocheck_score'])
+
+    def test_tags_split_across_chunks(self):
+        """Tag'ai ir tekstas, perskelti tarp chunk'ų, apdorojami teisingai"""
+        html = '<ul><li>2 Previous owners</li><li>Salvage title brand</li><li>Odometer 45,120 mi</li></ul>'
+        extractor = ReportExtractor()
+        for i in range(0, len(html), 7):
+            extractor.feed(html[i:i + 7])
+        extractor.close()
+        result = extractor.result()
+
+        self.assertEqual(result['owners'], 2)
+        self.assertEqual(result['title_brands'], ['Salvage'])
+        self.assertEqual(result['odometer']['last'], 45120)
+
+    def test_uppercase_skip_tags(self):
+        """<SCRIPT>/<Style> su bet kokiu raidžių dydžiu - likęs dokumentas neprarandamas"""
+        for script, style in (('script', 'style'), ('SCRIPT', 'STYLE'), ('Script', 'sTyLe')):
+            html = (
+                f'<{style}>li {{ color: red }}</{style}><ul><li>3 Previous owners</li></ul>'
+                f'<{script}>var owners = 9;</{script}><p>2 accidents reported</p>'
+            )
+            extractor = ReportExtractor()
+            for i in range(0, len(html), 5):
+                extractor.feed(html[i:i + 5])
+            extractor.close()
+            result = extractor.result()
+            self.assertEqual((result['owners'], result['accidents']), (3, 2), script)
+
+    def test_provider_markup(self):
+        """Carfax / AutoCheck stiliaus markup: inline tag'ai, etiketės langeliuose, paneigimai"""
+        html = (
+            '<div class="history-overview"><ul>'
+            '<li><strong>Owners:</strong> 2</li>'
+            '<li><b>Accidents:</b> <span class="count">1</span></li>'
+            '<li><span>Salvage title</span> not present</li>'
+            '<li>No flood damage title reported by any state</li>'
+            '</ul></div>'
+            '<p>Located 5 miles from dealer</p>'
+            '<table><tr><th>Date</th><th>Mileage</th><th>Source</th></tr>'
+            '<tr><td>03/15/2019</td><td class="record-odometer-reading">45,120 mi</td><td>Dealer</td></tr>'
+            '<tr><td>05/02/2021</td><td class="record-odometer-reading">61,870 mi</td><td>Dealer</td></tr></table>'
+            '<dl><dt>Number of Owners</dt>\n<dd>2</dd><dt>Last reported odometer reading</dt><dd>61,870</dd></dl>'
+        )
+        result = extract_report_facts(html)
+
+        self.assertEqual(result['owners'], 2)
+        self.assertEqual(result['accidents'], 1)
+        self.assertEqual(result['title_brands'], [])
+        self.assertEqual(result['odometer']['readings'], 3)
+        self.assertEqual(result['odometer']['max'], 61870)
+        self.assertFalse(result['odometer']['rollback_suspected'])
+        self.assertEqual(compute_score(result), 80)
+
+    def test_unknown_owners_stay_none(self):
+        """Reportas be savininkų skaičiaus - owners None, ne 0"""
+        data = CheapCarfaxAPI()._parse_carfax_data({'html': '<li>No accidents reported</li>'})
+        self.assertIsNone(data['owners'])
+        self.assertEqual(data['accidents'], 0)
+
+    def test_autocheck_score_preferred(self):
+        """AutoCheck score naudojamas tiesiogiai"""
+        result = extract_report_facts('<li>AutoCheck Score: 87</li><li>No accidents reported</li>')
+        self.assertEqual(result['accidents'], 0)
+        self.assertEqual(compute_score(result), 87)
+
+    def test_no_facts_returns_none_score(self):
+        """Tuščias dokumentas - score None, ne placeholder"""
+        self.assertIsNone(compute_score(extract_report_facts('<html><body>Error</body></html>')))
+
+
+class ReportBodyTestCase(TestCase):
+    """Report body endpoint'o (ETag, gzip, 304) testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.report = Report.objects.create(
+            user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price_paid=Decimal('14.99'),
+        )
+        self.report.store_html('<h1>Carfax</h1>')
+        self.client.login(username='testuser', password='testpass123')
+        self.url = f'/report/{self.report.id}/body/'
+
+    def test_gzip_body_and_not_modified(self):
+        """gzip siunčiamas tiesiai, pakartotinis užklausimas su ETag - 304"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(gzip.decompress(response.content), b'<h1>Carfax</h1>')
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_identity_body(self):
+        """Klientas be gzip gauna nesuspaustą HTML"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='identity')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'<h1>Carfax</h1>')
+        self.assertTrue(response['Content-Security-Policy'].startswith('sandbox'))
+        self.assertEqual(response['X-Frame-Options'], 'SAMEORIGIN')
+
+    def test_other_user_forbidden(self):
+        """Svetimo vartotojo reportas - 404"""
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(STORAGES=PLAIN_STORAGES)
+    def test_view_report_shell_has_no_html(self):
+        """Puslapio shell'as neturi report HTML, tik body URL"""
+        response = self.client.get(f'/report/{self.report.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, '<h1>Carfax</h1>')
+        self.assertContains(response, f'?v={self.report.body_version}')
+        self.assertContains(response, 'sandbox\n')
+        self.assertNotContains(response, 'innerHTML')
+
+
+class ReportHistoryAPITestCase(TestCase):
+    """Keyset report history API testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        for i in range(5):
+            Report.objects.create(
+                user=self.user, vin=f'1HGBH41JXMN10918{i}', report_type='carfax' if i % 2 else 'autocheck',
+                price_paid=Decimal('14.99'), score=70 + i,
+            )
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_cursor_pages_cover_all_reports(self):
+        """Puslapiai eina be dublikatų iki galo"""
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 2, 'fields': 'id,vin'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get('/api/reports/history/', params).json()
+            self.assertTrue(all(set(r) == {'id', 'vin'} for r in data['reports']))
+            seen.extend(r['id'] for r in data['reports'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, list(Report.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_filters_and_validation(self):
+        """report_type / VIN prefix filtrai, neleistini laukai - 400"""
+        data = self.client.get('/api/reports/history/', {'report_type': 'carfax', 'vin': '1hgbh41jxmn109181'}).json()
+        self.assertEqual([r['vin'] for r in data['reports']], ['1HGBH41JXMN109181'])
+
+        self.assertEqual(self.client.get('/api/reports/history/', {'fields': 'report_html'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/history/', {'cursor': '!!!'}).status_code, 400)
+
+    def test_recent_reports_limit_capped(self):
+        """api_recent_reports limit apribotas"""
+        response = self.client.get('/api/recent-reports/', {'limit': 100000})
+        self.assertEqual(len(response.json()['reports']), 5)
+
+
+FAKE_REPORT = {
+    'vin': '1HGBH41JXMN109186', 'provider': 'carfax', 'score': 80, 'accidents': 0, 'owners': 1,
+    'html': '<h1>Carfax</h1>', 'demo': False,
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReportJobTestCase(TestCase):
+    """Asinchroninio pirkimo (ReportJob + Celery) testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user.profile.add_balance(100)
+        self.client.login(username='testuser', password='testpass123')
+
+    @mock.patch('apps.core.services.fetch_vehicle_report', return_value=dict(FAKE_REPORT))
+    def test_job_is_idempotent(self, fetch):
+        """Pakartotinis task'o vykdymas nesukuria antro reporto ir neskaičiuoja antrą kartą"""
+        job = ReportJob.objects.create(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price=Decimal('14.99'))
+        self.assertEqual(run_report_job(str(job.id)), 'saved')
+        self.assertEqual(run_report_job(str(job.id)), 'saved')
+
+        job.refresh_from_db()
+        self.assertEqual(Report.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(job.report.get_html(), '<h1>Carfax</h1>')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.balance, Decimal('85.01'))
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_only_unbilled_failures_retry(self):
+        """404 / read timeout - job'as iškart failed; 503 - retry, rezervas grąžinamas"""
+        job = ReportJob.objects.create(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price=Decimal('14.99'))
+        not_found = ReportFetchError('VIN not found in database', status_code=404)
+        with mock.patch('apps.core.services.fetch_vehicle_report', side_effect=not_found) as fetch:
+            self.assertEqual(run_report_job(str(job.id)), 'failed')
+        self.assertEqual(fetch.call_count, 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'VIN not found. Please check the VIN and try again.'))
+
+        timeout = requests.exceptions.ReadTimeout('read timed out')
+        self.assertFalse(CheapCarfaxAPI._failure('Request timeout', exc=timeout)['retryable'])
+        self.assertTrue(CheapCarfaxAPI._failure('Service temporarily unavailable', exc=CircuitOpenError())['retryable'])
+        self.assertFalse(CheapCarfaxAPI._failure('Insufficient API credits', status_code=402)['retryable'])
+
+        job = ReportJob.objects.create(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price=Decimal('14.99'))
+        unavailable = ReportFetchError('API Error: 503', status_code=503, retryable=True)
+        with mock.patch('apps.core.services.fetch_vehicle_report', side_effect=unavailable):
+            with self.assertRaises(Retry):
+                run_report_job(str(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, Decimal('100.00'))
+
+    @mock.patch('apps.core.services.fetch_vehicle_report', return_value=dict(FAKE_REPORT))
+    def test_error_after_fetch_not_retried(self, fetch):
+        """Netikėta klaida po (apmokėto) fetch'o - failed be retry, rezervas grąžinamas"""
+        job = ReportJob.objects.create(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price=Decimal('14.99'))
+        with mock.patch('apps.core.services.save_report', side_effect=DatabaseError('connection lost')):
+            self.assertEqual(run_report_job(str(job.id)), 'failed')
+
+        self.assertEqual(fetch.call_count, 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, Decimal('100.00'))
+
+    @mock.patch('apps.core.views.run_report_job')
+    def test_search_vin_async_returns_job(self, task):
+        """{"async": true} - 202 su job'u, task'as siunčiamas po commit'o"""
+        payload = json.dumps({'vin': '1HGBH41JXMN109186', 'reportType': 'carfax', 'async': True, 'idempotencyKey': 'k1'})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/search-vin/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job']['id']
+        task.delay.assert_called_once_with(job_id)
+
+        # Tas pats idempotency key - tas pats job'as
+        response = self.client.post('/api/search-vin/', payload, content_type='application/json')
+        self.assertEqual(response.json()['job']['id'], job_id)
+
+        status = self.client.get(f'/api/report-jobs/{job_id}/').json()
+        self.assertEqual(status['job']['status'], 'queued')
+
+
+class FakePubSub:
+    """job_events.subscribe() pakaitalas be Redis"""
+
+    def __init__(self, events):
+        self.messages = [{'data': json.dumps(event)} for event in events]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        return self.messages.pop(0) if self.messages else None
+
+
+class ReportJobEventsTestCase(TestCase):
+    """SSE job event stream'o testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.job = ReportJob.objects.create(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price=Decimal('14.99'))
+
+    async def test_stream_ends_on_final_status(self):
+        """Stream'as siunčia snapshot + perėjimus ir baigiasi ties saved"""
+        await self.async_client.aforce_login(self.user)
+        events = [
+            {'id': str(self.job.id), 'status': 'fetching'},
+            {'id': 'other-job', 'status': 'saved'},
+            {'id': str(self.job.id), 'status': 'saved'},
+        ]
+        with mock.patch('apps.core.job_events.subscribe', return_value=FakePubSub(events)):
+            response = await self.async_client.get(f'/api/report-jobs/events/?job={self.job.id}')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            body = ''.join([chunk.decode() if isinstance(chunk, bytes) else chunk async for chunk in response.streaming_content])
+
+        statuses = [json.loads(line[6:])['status'] for line in body.splitlines() if line.startswith('data: ')]
+        self.assertEqual(statuses, ['queued', 'fetching', 'saved'])
+
+    @override_settings(JOB_EVENTS_REDIS_URL='redis://events:6379')
+    async def test_publish_and_subscribe_share_server(self):
+        """publish ir subscribe - tas pats JOB_EVENTS_REDIS_URL (ne cache Redis)"""
+        client = mock.AsyncMock()
+        client.pubsub = mock.Mock(return_value=mock.AsyncMock())
+        with mock.patch('redis.Redis.from_url') as sync_from_url, \
+                mock.patch('redis.asyncio.from_url', return_value=client) as async_from_url:
+            job_events._sync_client.cache_clear()
+            await sync_to_async(job_events.publish)(self.job)
+            async with job_events.subscribe(self.user.id):
+                pass
+        job_events._sync_client.cache_clear()
+
+        sync_from_url.assert_called_once_with('redis://events:6379')
+        async_from_url.assert_called_once_with('redis://events:6379')
+        sync_from_url.return_value.publish.assert_called_once()
+
+    async def test_requires_login(self):
+        """Neprisijungęs - 401"""
+        response = await self.async_client.get('/api/report-jobs/events/')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BatchPurchaseTestCase(TestCase):
+    """Batch VIN pirkimo (CSV -> NDJSON + ZIP) testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user.profile.add_balance(100)
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_parse_vin_list(self):
+        """CSV antraštė, kabutės, dublikatai ir neteisingi VIN'ai"""
+        text = 'VIN,Note\n"1hgbh41jxmn109186",x\n1HGBH41JXMN109186\nJH4DC4360SS001610; BADVIN\n'
+        vins, invalid, duplicates = parse_vin_list(text)
+        self.assertEqual(vins, ['1HGBH41JXMN109186', 'JH4DC4360SS001610'])
+        self.assertEqual(invalid, ['NOTE', 'X', 'BADVIN'])
+        self.assertEqual(duplicates, 1)
+
+    @mock.patch('apps.core.services.fetch_vehicle_report', side_effect=lambda vin, report_type: dict(FAKE_REPORT, vin=vin))
+    def test_stream_and_zip(self, fetch):
+        """NDJSON: batch -> result x N -> done, po to ZIP su HTML"""
+        upload = io.BytesIO(b'1HGBH41JXMN109186\nJH4DC4360SS001610\n1HGBH41JXMN109186\n')
+        upload.name = 'vins.csv'
+        response = self.client.post('/api/search-vin/batch/', {'file': upload, 'reportType': 'carfax'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([line['type'] for line in lines], ['batch', 'result', 'result', 'done'])
+        self.assertEqual(lines[0]['duplicates'], 1)
+        self.assertEqual(lines[-1]['succeeded'], 2)
+        self.assertEqual(fetch.call_count, 2)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.balance, Decimal('70.02'))
+
+        response = self.client.get(lines[-1]['zip_url'])
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 2)
+        self.assertEqual(archive.read(archive.namelist()[0]).decode(), '<h1>Carfax</h1>')
+
+    async def test_asgi_stream_is_incremental(self):
+        """ASGI: async iterator - 'batch' eilutė pasiekia klientą dar nebaigus fetch'ų"""
+        release, fetched = threading.Event(), []
+
+        def slow_fetch(vin, report_type):
+            release.wait(5)
+            fetched.append(vin)
+            return dict(FAKE_REPORT, vin=vin)
+
+        await self.async_client.alogin(username='testuser', password='testpass123')
+        with mock.patch('apps.core.services.fetch_vehicle_report', side_effect=slow_fetch):
+            response = await self.async_client.post(
+                '/api/search-vin/batch/', {'vins': '1HGBH41JXMN109186', 'reportType': 'carfax'},
+            )
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            first = json.loads(await anext(chunks))
+            self.assertEqual((first['type'], fetched), ('batch', []))
+
+            release.set()
+            rest = [json.loads(chunk) async for chunk in chunks]
+        self.assertEqual([line['type'] for line in rest], ['result', 'done'])
+        self.assertEqual(rest[-1]['succeeded'], 1)
+
+    @mock.patch('apps.core.services.fetch_vehicle_report')
+    def test_total_cost_checked_upfront(self, fetch):
+        """Visa batch'o kaina viršija balansą - 400, upstream nekviečiamas"""
+        vins = '\n'.join(f'1HGBH41JXMN1{i:05d}' for i in range(10))
+        response = self.client.post('/api/search-vin/batch/', {'vins': vins, 'reportType': 'carfax'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('149.90', json.loads(response.content)['message'])
+        fetch.assert_not_called()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncViewsTestCase(TestCase):
+    """ASYNC_VIEWS variantų (search_vin, api_balance, api_recent_reports) testai"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user.profile.add_balance(100)
+        self.factory = AsyncRequestFactory()
+
+    def _request(self, method, path, user, **kwargs):
+        request = getattr(self.factory, method)(path, **kwargs)
+
+        async def auser():
+            return user
+        request.auser = auser
+        return request
+
+    @mock.patch('apps.core.services.afetch_vehicle_report', new_callable=mock.AsyncMock, return_value=dict(FAKE_REPORT))
+    async def test_search_vin_purchases_report(self, fetch):
+        """Async pirkimas: upstream per afetch, charge + save transakcijoje"""
+        request = self._request(
+            'post', '/api/search-vin/', self.user,
+            data=json.dumps({'vin': '1hgbh41jxmn109186', 'reportType': 'carfax'}), content_type='application/json',
+        )
+        response = await async_views.search_vin(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['report']['vin'], '1HGBH41JXMN109186')
+        fetch.assert_awaited_once_with('1HGBH41JXMN109186', 'carfax')
+        profile = await UserProfile.objects.aget(user=self.user)
+        self.assertEqual(profile.balance, Decimal('85.01'))
+
+    @override_settings(CACHES=LOCMEM_CACHES, CHEAPCARFAX_API_KEY='test-key')
+    async def test_search_vin_keeps_loop_responsive(self):
+        """Upstream atsakymo decode + parse vyksta thread'e - kitos coroutine'os nestovi"""
+        await sync_to_async(cache.clear)()
+        upstream = httpx.Response(200, json={'id': 'r1', 'html': '<ul><li>Owners: 2</li></ul>'})
+        request = self._request(
+            'post', '/api/search-vin/', self.user,
+            data=json.dumps({'vin': '1HGBH41JXMN109186', 'reportType': 'carfax'}), content_type='application/json',
+        )
+        with mock.patch('apps.core.cheapcarfax_async.AsyncCheapCarfaxAPI._arequest',
+                        new_callable=mock.AsyncMock, return_value=upstream), \
+                mock.patch('apps.core.cheapcarfax.extract_report_facts', side_effect=slow_extract_report_facts()), \
+                mock.patch('apps.core.tasks.refresh_upstream_limits.apply_async'):
+            response, ticks = await run_with_ticker(async_views.search_vin(request))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['report']['owners'], 2)
+        self.assertGreaterEqual(ticks, 10)
+
+    async def test_replayed_idempotency_key_returns_saved_job(self):
+        """Tas pats idempotencyKey async kelyje - esamas job'as su reportu, ne SynchronousOnlyOperation"""
+        report = await Report.objects.acreate(
+            user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price_paid=Decimal('14.99'),
+        )
+        job = await ReportJob.objects.acreate(
+            user=self.user, vin=report.vin, report_type='carfax', price=Decimal('14.99'),
+            idempotency_key='k1', status='saved', report=report,
+        )
+        request = self._request(
+            'post', '/api/search-vin/', self.user, content_type='application/json',
+            data=json.dumps({'vin': report.vin, 'reportType': 'carfax', 'async': True, 'idempotencyKey': 'k1'}),
+        )
+        response = await async_views.search_vin(request)
+
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.content)['job']
+        self.assertEqual((data['id'], data['report']['id']), (str(job.id), report.id))
+
+    async def test_balance_and_recent_reports(self):
+        """api_balance / api_recent_reports per async ORM"""
+        await Report.objects.acreate(user=self.user, vin='1HGBH41JXMN109186', report_type='carfax', price_paid=Decimal('14.99'))
+
+        response = await async_views.api_balance(self._request('get', '/api/balance/', self.user))
+        self.assertEqual(json.loads(response.content)['balance'], 100.0)
+
+        response = await async_views.api_recent_reports(self._request('get', '/api/recent-reports/', self.user))
+        self.assertEqual([r['vin'] for r in json.loads(response.content)['reports']], ['1HGBH41JXMN109186'])
+
+    async def test_requires_login(self):
+        """Neprisijungęs - 401 (ne redirect)"""
+        response = await async_views.api_balance(self._request('get', '/api/balance/', AnonymousUser()))
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,276 @@
+"""
+╔══════════════════════════════════════════════════════════╗
+║  UPSTREAM METRICS (PROMETHEUS)                           ║
+╠══════════════════════════════════════════════════════════╣
+║  LOKACIJA: /autoinfo/apps/core/upstream_metrics.py      ║
+║  PASKIRTIS: CheapCarfax latency histogramos, statusų /  ║
+║  timeout skaitikliai, in-flight gauge per endpoint'ą    ║
+║  Agreguojama Redis'e - bendra visiems worker'iams       ║
+╚══════════════════════════════════════════════════════════╝
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+from .api_log import provider_for_endpoint
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = 'upstream_metrics:counters'
+IN_FLIGHT_KEY = 'upstream_metrics:in_flight'
+WORKERS_KEY = 'upstream_metrics:workers'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRIC_PREFIX = 'autoinfo_upstream'
+
+# Einamos užklausos upstream laiko akumuliatorius [kiekis, sekundės]
+# (nustato RequestProfilingMiddleware; None - neprofiliuojama)
+request_upstream = ContextVar('request_upstream', default=None)
+
+
+def _client():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def latency_buckets():
+    return tuple(sorted(getattr(settings, 'UPSTREAM_METRICS_BUCKETS', (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30))))
+
+
+def _format_bound(bound):
+    return '+Inf' if bound is None else f'{float(bound):g}'
+
+
+# ═══════════════════════════════════════════════════════
+# PER-PROCESS AGGREGATION
+# ═══════════════════════════════════════════════════════
+# observe() tik padidina skaitiklius atmintyje (be I/O užklausos
+# thread'e). Fono thread'as kas UPSTREAM_METRICS_FLUSH_INTERVAL s
+# vienu Redis pipeline prideda delta'as prie bendrų hash'ų ir
+# įrašo savo in-flight reikšmes + heartbeat.
+
+class UpstreamMetrics:
+    """Procesui bendri upstream metrikų skaitikliai"""
+
+    def __init__(self, background=True):
+        self.background = background
+        self._lock = threading.Lock()
+        self._pid = None
+        self._counters = defaultdict(float)
+        self._in_flight = defaultdict(int)
+
+    @property
+    def worker_id(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _ensure_started(self):
+        """Skaitikliai ir flush thread'as - iš naujo po fork'o"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._counters = defaultdict(float)
+                self._in_flight = defaultdict(int)
+                if self.background:
+                    threading.Thread(target=self._run, name='upstream-metrics', daemon=True).start()
+                self._pid = os.getpid()
+
+    def observe(self, endpoint, status_code, latency, timeout=False):
+        """
+        Užregistruoti vieną HTTP bandymą
+
+        Args:
+            endpoint (str): endpoint'o vardas ('carfax_html', 'user_limits', ...)
+            status_code (int): HTTP statusas, 0 - transporto klaida
+            latency (float): trukmė sekundėmis
+            timeout (bool): transporto klaida buvo timeout
+        """
+        accumulator = request_upstream.get()
+        if accumulator is not None:
+            accumulator[0] += 1
+            accumulator[1] += latency
+        if not getattr(settings, 'UPSTREAM_METRICS_ENABLED', True):
+            return
+        self._ensure_started()
+        labels = f'{endpoint}|{provider_for_endpoint(endpoint)}'
+        bound = next((b for b in latency_buckets() if latency <= b), None)
+        with self._lock:
+            if status_code:
+                self._counters[f'requests|{labels}|{status_code}'] += 1
+            elif timeout:
+                self._counters[f'timeouts|{labels}'] += 1
+            else:
+                self._counters[f'errors|{labels}'] += 1
+            self._counters[f'bucket|{labels}|{_format_bound(bound)}'] += 1
+            self._counters[f'sum|{labels}'] += latency
+            self._counters[f'count|{labels}'] += 1
+
+    @contextmanager
+    def in_flight(self, endpoint):
+        """Gauge: kiek užklausų į endpoint'ą šiuo metu vykdoma šiame procese"""
+        if not getattr(settings, 'UPSTREAM_METRICS_ENABLED', True):
+            yield
+            return
+        self._ensure_started()
+        labels = f'{endpoint}|{provider_for_endpoint(endpoint)}'
+        with self._lock:
+            self._in_flight[labels] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[labels] -= 1
+
+    def flush(self, client=None):
+        """
+        Delta'os -> Redis vienu pipeline (niekada nemeta klaidų)
+
+        Returns:
+            bool: ar pavyko
+        """
+        if self._pid != os.getpid():
+            return True
+        with self._lock:
+            counters, self._counters = self._counters, defaultdict(float)
+            in_flight = dict(self._in_flight)
+
+        worker = self.worker_id
+        try:
+            pipe = (client or _client()).pipeline(transaction=False)
+            for field, delta in counters.items():
+                if field.startswith('sum|'):
+                    pipe.hincrbyfloat(COUNTERS_KEY, field, delta)
+                else:
+                    pipe.hincrby(COUNTERS_KEY, field, int(delta))
+            for labels, value in in_flight.items():
+                pipe.hset(IN_FLIGHT_KEY, f'{labels}|{worker}', value)
+            pipe.hset(WORKERS_KEY, worker, time.time())
+            pipe.execute()
+            return True
+        except Exception as e:
+            # Redis nepasiekiamas - delta'os grąžinamos kitam bandymui
+            with self._lock:
+                for field, delta in counters.items():
+                    self._counters[field] += delta
+            logger.warning(f"Upstream metrics flush failed: {str(e)}")
+            return False
+
+    def _run(self):
+        while True:
+            time.sleep(getattr(settings, 'UPSTREAM_METRICS_FLUSH_INTERVAL', 5))
+            self.flush()
+
+
+metrics = UpstreamMetrics()
+
+
+# ═══════════════════════════════════════════════════════
+# PROMETHEUS EXPORT
+# ═══════════════════════════════════════════════════════
+
+def _decode(mapping):
+    return {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in mapping.items()
+    }
+
+
+def collect(client=None):
+    """
+    Bendri skaitikliai iš Redis + gyvų worker'ių in-flight suma
+
+    Returns:
+        tuple: (counters dict, in_flight dict {labels: int})
+    """
+    client = client or _client()
+    metrics.flush(client)
+
+    counters = _decode(client.hgetall(COUNTERS_KEY))
+    workers = _decode(client.hgetall(WORKERS_KEY))
+    stale_after = time.time() - getattr(settings, 'UPSTREAM_METRICS_WORKER_TTL', 60)
+    live = {worker for worker, seen in workers.items() if float(seen) >= stale_after}
+
+    in_flight = defaultdict(int)
+    stale_fields = []
+    for field, value in _decode(client.hgetall(IN_FLIGHT_KEY)).items():
+        labels, worker = field.rsplit('|', 1)
+        if worker in live:
+            in_flight[labels] += int(value)
+        else:
+            stale_fields.append(field)
+
+    # Sustabdytų worker'ių gauge'ai nebeskaičiuojami (ir išvalomi)
+    if stale_fields:
+        client.hdel(IN_FLIGHT_KEY, *stale_fields)
+    dead = set(workers) - live
+    if dead:
+        client.hdel(WORKERS_KEY, *dead)
+    return counters, dict(in_flight)
+
+
+def _labels(endpoint, provider, **extra):
+    pairs = [('endpoint', endpoint), ('provider', provider), *extra.items()]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(counters, in_flight):
+    """Prometheus text exposition format (0.0.4)"""
+    grouped = defaultdict(list)
+    for field, value in counters.items():
+        kind, rest = field.split('|', 1)
+        grouped[kind].append((rest.split('|'), value))
+
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+
+    family('requests_total', 'counter', 'CheapCarfax HTTP responses by status code')
+    for (endpoint, provider, status), value in sorted(grouped['requests']):
+        lines.append(f'{METRIC_PREFIX}_requests_total{_labels(endpoint, provider, status=status)} {_number(value)}')
+
+    family('timeouts_total', 'counter', 'CheapCarfax requests that timed out')
+    for (endpoint, provider), value in sorted(grouped['timeouts']):
+        lines.append(f'{METRIC_PREFIX}_timeouts_total{_labels(endpoint, provider)} {_number(value)}')
+
+    family('errors_total', 'counter', 'CheapCarfax requests that failed without a response (not timeouts)')
+    for (endpoint, provider), value in sorted(grouped['errors']):
+        lines.append(f'{METRIC_PREFIX}_errors_total{_labels(endpoint, provider)} {_number(value)}')
+
+    family('request_duration_seconds', 'histogram', 'CheapCarfax HTTP attempt latency')
+    buckets = defaultdict(dict)
+    for (endpoint, provider, bound), value in grouped['bucket']:
+        buckets[(endpoint, provider)][bound] = float(value)
+    sums = {tuple(labels): value for labels, value in grouped['sum']}
+    counts = {tuple(labels): value for labels, value in grouped['count']}
+    for labels in sorted(counts):
+        endpoint, provider = labels
+        cumulative = 0
+        for bound in latency_buckets() + (None,):
+            cumulative += buckets[labels].get(_format_bound(bound), 0)
+            le = _format_bound(bound)
+            lines.append(
+                f'{METRIC_PREFIX}_request_duration_seconds_bucket{_labels(endpoint, provider, le=le)} {_number(cumulative)}'
+            )
+        lines.append(f'{METRIC_PREFIX}_request_duration_seconds_sum{_labels(endpoint, provider)} {_number(sums.get(labels, 0))}')
+        lines.append(f'{METRIC_PREFIX}_request_duration_seconds_count{_labels(endpoint, provider)} {_number(counts[labels])}')
+
+    family('in_flight', 'gauge', 'CheapCarfax requests currently in progress (all workers)')
+    for labels, value in sorted(in_flight.items()):
+        endpoint, provider = labels.split('|')
+        lines.append(f'{METRIC_PREFIX}_in_flight{_labels(endpoint, provider)} {value}')
+
+    return '\n'.join(lines) + '\n'
@@ -7,11 +7,16 @@
 ╚══════════════════════════════════════════════════════════╝
 """
 
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
+from . import async_views
 from . import payment_views  # ← PRIDĖTA
 
+# ASGI (uvicorn) - upstream laukiantys endpoint'ai be thread'o; WSGI - sync views
+api_views = async_views if getattr(settings, 'ASYNC_VIEWS', False) else views
+
 urlpatterns = [
     # ═══════════════════════════════════════════════════════
     # PAGRINDINIS PUSLAPIS
@@ -62,8 +67,13 @@ urlpatterns = [
     # ═══════════════════════════════════════════════════════
     # VIN SEARCH & REPORTS
     # ═══════════════════════════════════════════════════════
-    path('api/search-vin/', views.search_vin, name='search_vin'),
+    path('api/search-vin/', api_views.search_vin, name='search_vin'),
+    path('api/report-jobs/events/', async_views.report_job_events, name='report_job_events'),
+    path('api/report-jobs/<uuid:job_id>/', views.api_report_job_status, name='api_report_job_status'),
+    path('api/search-vin/batch/', views.batch_purchase, name='batch_purchase'),
+    path('api/search-vin/batch/<str:batch_id>/zip/', views.batch_reports_zip, name='batch_reports_zip'),
     path('report/<int:report_id>/', views.view_report, name='view_report'),
+    path('report/<int:report_id>/body/', views.report_body, name='report_body'),
 
     # ═══════════════════════════════════════════════════════
     # PAYMENT & CREDITS (STRIPE)
@@ -95,6 +105,9 @@ urlpatterns = [
     # ═══════════════════════════════════════════════════════
     # API ENDPOINTS
     # ═══════════════════════════════════════════════════════
-    path('api/balance/', views.api_balance, name='api_balance'),
-    path('api/recent-reports/', views.api_recent_reports, name='api_recent_reports'),
+    path('api/balance/', api_views.api_balance, name='api_balance'),
+    path('api/recent-reports/', api_views.api_recent_reports, name='api_recent_reports'),
+    path('api/reports/history/', views.api_report_history, name='api_report_history'),
+    path('api/report-cache/stats/', views.api_report_cache_stats, name='api_report_cache_stats'),
+    path('metrics/', views.upstream_metrics_view, name='upstream_metrics'),
 ]
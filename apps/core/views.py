@@ -4,19 +4,45 @@ VIEWS (KONTROLERIAI)
 ✅ UPDATED: Dabar išsaugo ir rodo HTML iš CheapCarfax API
 """
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.clickjacking import xframe_options_sameorigin
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
-from decimal import Decimal
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from datetime import datetime, timedelta
+import base64
+import binascii
 import json
 import logging
-
-from .models import Report, Transaction, UserProfile
+import tempfile
+import uuid
+import zipfile
+
+from .models import (
+    BalanceHold, Report, ReportContent, ReportJob, ReportPackage, Transaction, UserProfile, UserReportStats,
+)
+from .compression import CODEC_GZIP, encode_for_transfer, negotiate_encoding
 from .forms import RegistrationForm, LoginForm, VINSearchForm, AddFundsForm, ContactForm
-from .api import fetch_vehicle_report
+from .services import (
+    PurchaseError, batch_hold_ttl, iter_batch_purchase, parse_vin_list, purchase_report, report_price, report_summary,
+)
+from .tasks import run_report_job
+from .cheapcarfax import has_upstream_quota
+from . import job_events
+from . import report_cache
+from . import upstream_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -110,19 +136,29 @@ def dashboard(request):
     Vartotojo dashboard
     Rodo: balansą, VIN paieškos formą, ataskaitas
     """
-    # Gauti vartotojo ataskaitas (paskutines 10)
-    reports = Report.objects.filter(user=request.user).order_by('-created_at')[:10]
+    # Gauti vartotojo ataskaitas (paskutines 10) - tik rodomi stulpeliai, indeksas (user, -created_at)
+    reports = (
+        Report.objects
+        .filter(user=request.user)
+        .only('id', 'vin', 'report_type', 'created_at')
+        .order_by('-created_at')[:10]
+    )
 
     # VIN paieškos forma
     search_form = VINSearchForm()
 
-    # Statistika
-    total_reports = Report.objects.filter(user=request.user).count()
+    # Statistika - denormalizuoti skaitikliai (be COUNT per visą istoriją)
+    stats = UserReportStats.for_user(request.user)
+
+    # Likę paketų kreditai - vienas GROUP BY per aktyvių paketų indeksą
+    credits = ReportPackage.credits_for(request.user.id)
 
     context = {
         'reports': reports,
         'form': search_form,
-        'total_reports': total_reports,
+        'stats': stats,
+        'credits': credits,
+        'total_reports': stats.total_reports,
         'prices': settings.REPORT_PRICES,
     }
     return render(request, 'core/dashboard.html', context)
@@ -139,6 +175,7 @@ def search_vin(request):
     VIN paieška ir reporto generavimas
     ✅ UPDATED: Dabar išsaugo HTML iš CheapCarfax API
     AJAX endpoint - grąžina JSON
+    {"async": true} (arba REPORT_PURCHASE_ASYNC) - 202 su job'u, darbas Celery worker'yje
     """
     try:
         data = json.loads(request.body)
@@ -153,59 +190,45 @@ def search_vin(request):
             }, status=400)
 
         # Gauti kainą
-        prices = settings.REPORT_PRICES.get(report_type, {})
-        price = Decimal(str(prices.get('single', 0)))
+        price = report_price(report_type)
 
-        # Patikrinti balansą
+        # Patikrinti balansą (paketo kreditai - be balanso)
         profile = request.user.profile
-        if not profile.has_sufficient_balance(price):
+        has_credits = ReportPackage.active_for(request.user.id, report_type).exists()
+        if not has_credits and not profile.has_sufficient_balance(price):
             return JsonResponse({
                 'success': False,
                 'message': f'Insufficient balance. You need {price} PLN. Please add funds.'
             }, status=400)
 
-        # ✅ Gauti ataskaitą iš API (SU HTML!)
-        logger.info(f"Fetching {report_type} report for VIN: {vin}")
-        report_data = fetch_vehicle_report(vin, report_type)
-
-        if not report_data:
+        # Upstream dienos limitas (iš cache snapshot, be tinklo užklausos)
+        if not has_upstream_quota(report_type):
+            logger.warning(f"Upstream daily limit exhausted for {report_type}")
             return JsonResponse({
                 'success': False,
-                'message': 'Could not retrieve report. Please try again later.'
-            }, status=500)
-
-        # Nuskaičiuoti balansą
-        profile.deduct_balance(price)
-        logger.info(f"Deducted {price} PLN from {request.user.username}")
-
-        # ✅ Išsaugoti ataskaitą SU HTML!
-        report = Report.objects.create(
-            user=request.user,
-            vin=vin,
-            report_type=report_type,
-            report_data=report_data,  # JSON duomenys
-            report_html=report_data.get('html', ''),  # ✅ HTML iš CheapCarfax!
-            price_paid=price,
-            score=report_data.get('score', 0),
-            accidents=report_data.get('accidents', 0),
-            owners=report_data.get('owners', 0)
-        )
+                'message': f'{report_type.capitalize()} reports are temporarily unavailable. Please try again later.'
+            }, status=503)
 
-        logger.info(f"Report created: ID={report.id}, VIN={vin}, Has HTML={report.has_html}")
+        # Asinchroninis režimas - darbas Celery worker'yje, klientas seka job statusą
+        if data.get('async', getattr(settings, 'REPORT_PURCHASE_ASYNC', False)):
+            job = _enqueue_report_job(request.user, vin, report_type, price, data.get('idempotencyKey', ''))
+            return JsonResponse({
+                'success': True,
+                'job': job_summary(job),
+            }, status=202)
+
+        # ✅ Gauti ataskaitą iš API (SU HTML!) ir išsaugoti
+        try:
+            report = purchase_report(request.user, vin, report_type)
+        except PurchaseError as e:
+            return JsonResponse({
+                'success': False,
+                'message': e.message
+            }, status=e.status)
 
         return JsonResponse({
             'success': True,
-            'report': {
-                'id': report.id,
-                'vin': report.vin,
-                'type': report.get_report_type_display(),
-                'score': report.score,
-                'accidents': report.accidents,
-                'owners': report.owners,
-                'price': float(price),
-                'has_html': report.has_html,  # ✅ Info ar yra HTML
-                'created_at': report.created_at.strftime('%Y-%m-%d %H:%M')
-            }
+            'report': report_summary(report)
         })
 
     except json.JSONDecodeError:
@@ -221,11 +244,224 @@ def search_vin(request):
         }, status=500)
 
 
+def _enqueue_report_job(user, vin, report_type, price, idempotency_key=''):
+    """Sukurti ReportJob (arba grąžinti esamą pagal idempotency key) ir įdėti į Celery eilę"""
+    idempotency_key = str(idempotency_key or '')[:64]
+    if idempotency_key:
+        existing = ReportJob.objects.select_related('report').filter(user=user, idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                user=user, vin=vin, report_type=report_type, price=price, idempotency_key=idempotency_key,
+            )
+            # Task'as siunčiamas tik po commit'o - worker'is visada randa job'ą
+            transaction.on_commit(lambda: run_report_job.delay(str(job.id)))
+            transaction.on_commit(lambda: job_events.publish(job))
+    except IntegrityError:
+        # Lygiagretus POST su tuo pačiu raktu
+        return ReportJob.objects.select_related('report').get(user=user, idempotency_key=idempotency_key)
+
+    logger.info(f"Report job queued: {job.id} {report_type} {vin}")
+    return job
+
+
+def job_summary(job):
+    """ReportJob -> JSON dict"""
+    data = {
+        'id': str(job.id),
+        'vin': job.vin,
+        'report_type': job.report_type,
+        'status': job.status,
+        'error': job.error,
+        'status_url': reverse('api_report_job_status', args=[job.id]),
+    }
+    if job.status == 'saved' and job.report_id:
+        data['report'] = report_summary(job.report)
+    return data
+
+
+# ═══════════════════════════════════════════════════════
+# BATCH VIN PIRKIMAS (CSV -> NDJSON stream'as + ZIP)
+# ═══════════════════════════════════════════════════════
+
+def _batch_cache_key(user_id, batch_id):
+    return f'reportbatch:{user_id}:{batch_id}'
+
+
+_STREAM_END = object()
+
+
+async def _aiter_in_thread(iterator):
+    """
+    Sync generator -> async iterator (ASGI StreamingHttpResponse)
+
+    Django ASGI sync iteratorių sukaupia visą (sync_to_async(list)) - čia kiekvienas
+    elementas paimamas atskirai užklausos thread'e (tas pats thread'as - ta pati DB jungtis)
+    ir siunčiamas iškart. Klientui atsijungus generatorius uždaromas (finally blokai).
+    """
+    try:
+        while True:
+            chunk = await sync_to_async(next)(iterator, _STREAM_END)
+            if chunk is _STREAM_END:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(iterator.close)()
+
+
+def _read_batch_input(request):
+    """multipart 'file' (CSV/txt) arba 'vins' laukas (form / JSON) -> (tekstas, report_type)"""
+    upload = request.FILES.get('file')
+    if upload is not None:
+        if upload.size > getattr(settings, 'BATCH_PURCHASE_MAX_UPLOAD_BYTES', 256 * 1024):
+            raise PurchaseError('File is too large.')
+        return upload.read().decode('utf-8-sig', errors='replace'), request.POST.get('reportType', 'carfax')
+
+    if request.content_type == 'application/json':
+        data = json.loads(request.body)
+        return str(data.get('vins', '')), data.get('reportType', 'carfax')
+    return request.POST.get('vins', ''), request.POST.get('reportType', 'carfax')
+
+
+@login_required
+@require_http_methods(["POST"])
+def batch_purchase(request):
+    """
+    Daugelio VIN pirkimas vienu kartu (dealer'iams)
+
+    Įvestis: CSV/naujų eilučių sąrašas ('file' arba 'vins') + reportType.
+    VIN'ai validuojami ir dedupinami iš anksto, visa kaina rezervuojama
+    (BalanceHold) prieš pradedant, nepanaudotas likutis grąžinamas pabaigoje.
+    Atsakymas - NDJSON stream'as (application/x-ndjson):
+        {"type": "batch", ...}    - priimti / atmesti VIN'ai, kaina
+        {"type": "result", ...}   - po vieną kiekvienam VIN (baigimo tvarka)
+        {"type": "done", ...}     - suvestinė + zip_url
+    Stream'inama ir WSGI, ir ASGI (async iterator) režimu.
+    """
+    try:
+        text, report_type = _read_batch_input(request)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'message': 'Invalid request format.'}, status=400)
+    except PurchaseError as e:
+        return JsonResponse({'success': False, 'message': e.message}, status=e.status)
+
+    if report_type not in settings.REPORT_PRICES:
+        return JsonResponse({'success': False, 'message': 'Unknown report type.'}, status=400)
+
+    vins, invalid, duplicates = parse_vin_list(text)
+    max_vins = getattr(settings, 'BATCH_PURCHASE_MAX_VINS', 500)
+    if not vins:
+        return JsonResponse({'success': False, 'message': 'No valid VINs found.', 'invalid': invalid[:100]}, status=400)
+    if len(vins) > max_vins:
+        return JsonResponse({'success': False, 'message': f'Too many VINs. Maximum is {max_vins} per batch.'}, status=400)
+
+    if not has_upstream_quota(report_type):
+        return JsonResponse({
+            'success': False,
+            'message': f'{report_type.capitalize()} reports are temporarily unavailable. Please try again later.'
+        }, status=503)
+
+    # Visa suma (be paketų kreditų) rezervuojama iš anksto - nepradedame batch'o, kurio negalima apmokėti
+    price = report_price(report_type)
+    credits = ReportPackage.credits_for(request.user.id).get(report_type, 0)
+    total = price * max(0, len(vins) - credits)
+    batch_id = uuid.uuid4().hex
+    user = request.user
+    concurrency = getattr(settings, 'BATCH_PURCHASE_CONCURRENCY', 4)
+    # Rezervas pergyvena blogiausią vieno VIN laiką; iter_batch_purchase jį pratęsia po kiekvieno VIN
+    hold = BalanceHold.place(user, total, reference=f'batch:{batch_id}', ttl=batch_hold_ttl())
+    if hold is None:
+        return JsonResponse({
+            'success': False,
+            'message': f'Insufficient balance. You need {total} PLN for {len(vins)} reports. Please add funds.'
+        }, status=400)
+
+    logger.info(f"Batch purchase {batch_id}: {len(vins)} {report_type} VINs for {user.username}")
+
+    def stream():
+        try:
+            yield json.dumps({
+                'type': 'batch',
+                'batch_id': batch_id,
+                'report_type': report_type,
+                'total': len(vins),
+                'invalid': invalid[:100],
+                'duplicates': duplicates,
+                'price': float(price),
+                'package_credits': min(credits, len(vins)),
+                'estimated_cost': float(total),
+            }) + '\n'
+
+            report_ids = []
+            failed = 0
+            for vin, report, error in iter_batch_purchase(user, vins, report_type, concurrency, hold=hold):
+                if report is not None:
+                    report_ids.append(report.id)
+                    yield json.dumps({'type': 'result', 'vin': vin, 'success': True, 'report': report_summary(report)}) + '\n'
+                else:
+                    failed += 1
+                    yield json.dumps({'type': 'result', 'vin': vin, 'success': False, 'message': error}) + '\n'
+
+            done = {'type': 'done', 'batch_id': batch_id, 'succeeded': len(report_ids), 'failed': failed,
+                    'charged': float(hold.captured_amount), 'zip_url': None}
+            if report_ids:
+                cache.set(_batch_cache_key(user.id, batch_id), report_ids,
+                          timeout=getattr(settings, 'BATCH_PURCHASE_ZIP_TTL', 60 * 60 * 24))
+                done['zip_url'] = reverse('batch_reports_zip', args=[batch_id])
+            logger.info(f"Batch purchase {batch_id} done: {len(report_ids)} ok, {failed} failed")
+            yield json.dumps(done) + '\n'
+        finally:
+            hold.release()  # Ir kai klientas atsijungia anksčiau (no-op jei jau grąžintas)
+
+    # ASGI - async iterator, kitaip Django sukauptų visą batch'ą prieš siųsdamas
+    content = _aiter_in_thread(stream()) if isinstance(request, ASGIRequest) else stream()
+    response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx - nebuferizuoti
+    return response
+
+
+@login_required
+def batch_reports_zip(request, batch_id):
+    """Batch'o HTML reportai vienu ZIP failu"""
+    report_ids = cache.get(_batch_cache_key(request.user.id, batch_id))
+    if not report_ids:
+        raise Http404('Batch not found or expired.')
+
+    reports = (
+        Report.objects
+        .filter(user=request.user, id__in=report_ids, html_available=True)
+        .select_related('content')
+        .only('id', 'vin', 'report_type', 'content__codec', 'content__data')
+        .order_by('id')
+    )
+
+    # Dideli batch'ai išsilieja į diską, ne į atmintį
+    archive = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for report in reports.iterator(chunk_size=20):
+            zf.writestr(f'{report.vin}_{report.report_type}_{report.id}.html', report.content.html)
+    archive.seek(0)
+
+    return FileResponse(archive, as_attachment=True, filename=f'reports_{batch_id[:8]}.zip',
+                        content_type='application/zip')
+
+
+@login_required
+def api_report_job_status(request, job_id):
+    """Report job statusas (JSON) - dashboard JS polling"""
+    job = get_object_or_404(ReportJob.objects.select_related('report'), id=job_id, user=request.user)
+    return JsonResponse({'success': job.status != 'failed', 'job': job_summary(job)})
+
+
 @login_required
 def view_report(request, report_id):
     """
     Peržiūrėti konkrečią ataskaitą
-    ✅ UPDATED: Dabar perduoda HTML į template
+    ✅ UPDATED: Puslapis renderinamas be HTML - jį JS parsiunčia iš report_body
     """
     report = get_object_or_404(Report, id=report_id, user=request.user)
 
@@ -237,6 +473,59 @@ def view_report(request, report_id):
     return render(request, 'core/view_report.html', context)
 
 
+# Upstream HTML: be skriptų, formų ir app origin'o; paveikslėliai / stiliai - leidžiami
+REPORT_BODY_CSP = "sandbox; default-src 'none'; img-src * data:; style-src * 'unsafe-inline'; font-src * data:"
+
+
+@xframe_options_sameorigin
+@login_required
+def report_body(request, report_id):
+    """
+    Report HTML body (immutable, precompressed)
+
+    - ETag / Last-Modified iš Report.updated_at - 304 be blob'o skaitymo
+    - gzip siunčiamas tiesiai iš ReportContent (be perspaudimo)
+    - br / kiti encoding'ai perkoduojami vieną kartą ir laikomi cache
+    - upstream HTML nesanitizuotas: rodomas tik sandbox iframe'e, CSP sandbox
+      taikomas ir atidarius URL tiesiogiai
+    """
+    report = get_object_or_404(
+        Report.objects.only('id', 'user_id', 'html_available', 'updated_at'),
+        id=report_id, user=request.user, html_available=True,
+    )
+
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+    etag = f'"report-{report.id}-{report.body_version}-{encoding}"'
+    last_modified = int(report.updated_at.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content = get_object_or_404(ReportContent.objects.only('codec', 'data'), report_id=report.id)
+        if encoding == 'gzip' and content.codec == CODEC_GZIP:
+            body = bytes(content.data)
+        elif encoding == 'identity':
+            body = content.html.encode('utf-8')
+        else:
+            cache_key = f'reportbody:{report.id}:{report.body_version}:{encoding}'
+            body = cache.get(cache_key)
+            if body is None:
+                body = encode_for_transfer(content.html, encoding)
+                cache.set(cache_key, body, timeout=getattr(settings, 'REPORT_BODY_CACHE_TTL', 60 * 60 * 24))
+
+        response = HttpResponse(body, content_type='text/html; charset=utf-8')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # URL turi ?v=<body_version> - turinys po juo niekada nesikeičia
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    response['Content-Security-Policy'] = REPORT_BODY_CSP
+    response['X-Content-Type-Options'] = 'nosniff'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
 # ═══════════════════════════════════════════════════════
 # PINIGŲ ĮKĖLIMAS
 # ═══════════════════════════════════════════════════════
@@ -338,11 +627,38 @@ def api_balance(request):
     })
 
 
+# Laukas -> (DB stulpeliai, serializer) report history API projekcijai
+REPORT_HISTORY_FIELDS = {
+    'id': (('id',), lambda r: r.id),
+    'vin': (('vin',), lambda r: r.vin),
+    'report_type': (('report_type',), lambda r: r.report_type),
+    'type': (('report_type',), lambda r: r.get_report_type_display()),
+    'score': (('score',), lambda r: r.score),
+    'accidents': (('accidents',), lambda r: r.accidents),
+    'owners': (('owners',), lambda r: r.owners),
+    'price': (('price_paid',), lambda r: float(r.price_paid)),
+    'has_html': (('html_available',), lambda r: r.has_html),
+    'vehicle': (('report_data',), lambda r: r.vehicle_info),
+    'created_at': (('created_at',), lambda r: r.created_at.isoformat()),
+}
+REPORT_HISTORY_DEFAULT_FIELDS = ('id', 'vin', 'type', 'score', 'has_html', 'created_at')
+REPORT_HISTORY_MAX_PAGE_SIZE = getattr(settings, 'REPORT_HISTORY_MAX_PAGE_SIZE', 100)
+
+
 @login_required
 def api_recent_reports(request):
     """Gauti paskutines ataskaitas (JSON)"""
-    limit = int(request.GET.get('limit', 10))
-    reports = Report.objects.filter(user=request.user).order_by('-created_at')[:limit]
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    limit = max(1, min(limit, REPORT_HISTORY_MAX_PAGE_SIZE))
+    reports = (
+        Report.objects
+        .filter(user=request.user)
+        .only('id', 'vin', 'report_type', 'score', 'price_paid', 'html_available', 'created_at')
+        .order_by('-created_at')[:limit]
+    )
 
     data = [{
         'id': r.id,
@@ -355,3 +671,136 @@ def api_recent_reports(request):
     } for r in reports]
 
     return JsonResponse({'reports': data})
+
+
+def _encode_history_cursor(report):
+    raw = f'{report.created_at.isoformat()}|{report.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_history_cursor(cursor):
+    """Cursor -> (created_at, id); ValueError jei sugadintas"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, _, report_id = base64.urlsafe_b64decode(padded.encode()).decode().partition('|')
+    parsed = datetime.fromisoformat(created_at)
+    if parsed.tzinfo is None:
+        raise ValueError('cursor without timezone')
+    return parsed, int(report_id)
+
+
+def _parse_history_date(value, end_of_day=False):
+    """YYYY-MM-DD arba ISO datetime -> aware datetime"""
+    parsed = datetime.fromisoformat(value)
+    if len(value) == 10 and end_of_day:
+        parsed += timedelta(days=1)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@login_required
+def api_report_history(request):
+    """
+    Report istorija su keyset (cursor) puslapiavimu (JSON)
+
+    Query params:
+        cursor: ankstesnio atsakymo next_cursor
+        page_size: 1-REPORT_HISTORY_MAX_PAGE_SIZE (default 20)
+        report_type: carfax / autocheck / nmvtis
+        vin: VIN pradžia (prefix)
+        created_after / created_before: YYYY-MM-DD arba ISO datetime
+        fields: kableliais atskirti laukai (žr. REPORT_HISTORY_FIELDS)
+
+    Kiekvienas puslapis - vienas index range scan per (user, -created_at),
+    nepriklausomai nuo istorijos gylio.
+    """
+    params = request.GET
+
+    try:
+        page_size = int(params.get('page_size', 20))
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'page_size must be an integer.'}, status=400)
+    page_size = max(1, min(page_size, REPORT_HISTORY_MAX_PAGE_SIZE))
+
+    fields = [f.strip() for f in params.get('fields', '').split(',') if f.strip()] or list(REPORT_HISTORY_DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in REPORT_HISTORY_FIELDS]
+    if unknown:
+        return JsonResponse({
+            'success': False,
+            'message': f'Unknown fields: {", ".join(unknown)}. Allowed: {", ".join(REPORT_HISTORY_FIELDS)}.'
+        }, status=400)
+
+    reports = Report.objects.filter(user=request.user)
+
+    report_type = params.get('report_type')
+    if report_type:
+        if report_type not in dict(Report.REPORT_TYPES):
+            return JsonResponse({'success': False, 'message': f'Unknown report_type: {report_type}.'}, status=400)
+        reports = reports.filter(report_type=report_type)
+
+    vin_prefix = params.get('vin', '').strip().upper()
+    if vin_prefix:
+        reports = reports.filter(vin__startswith=vin_prefix)
+
+    try:
+        if params.get('created_after'):
+            reports = reports.filter(created_at__gte=_parse_history_date(params['created_after']))
+        if params.get('created_before'):
+            reports = reports.filter(created_at__lt=_parse_history_date(params['created_before'], end_of_day=True))
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Dates must be YYYY-MM-DD or ISO 8601.'}, status=400)
+
+    if params.get('cursor'):
+        try:
+            cursor_created_at, cursor_id = _decode_history_cursor(params['cursor'])
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            return JsonResponse({'success': False, 'message': 'Invalid cursor.'}, status=400)
+        reports = reports.filter(
+            Q(created_at__lt=cursor_created_at) | Q(created_at=cursor_created_at, id__lt=cursor_id)
+        )
+
+    columns = {'id', 'created_at'}
+    for field in fields:
+        columns.update(REPORT_HISTORY_FIELDS[field][0])
+
+    # +1 eilutė - sužinoti ar yra kitas puslapis be COUNT
+    page = list(reports.only(*columns).order_by('-created_at', '-id')[:page_size + 1])
+    has_more = len(page) > page_size
+    page = page[:page_size]
+
+    return JsonResponse({
+        'reports': [{field: REPORT_HISTORY_FIELDS[field][1](r) for field in fields} for r in page],
+        'next_cursor': _encode_history_cursor(page[-1]) if has_more else None,
+        'page_size': page_size,
+    })
+
+
+@staff_member_required
+def api_report_cache_stats(request):
+    """VIN report cache hit/miss statistika (JSON, tik staff)"""
+    return JsonResponse(report_cache.get_stats())
+
+
+def _metrics_scrape_allowed(request):
+    """Staff, Bearer METRICS_TOKEN arba tiesioginė (ne per proxy) užklausa iš leistino IP"""
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return (
+        'HTTP_X_FORWARDED_FOR' not in request.META
+        and request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    )
+
+
+def upstream_metrics_view(request):
+    """CheapCarfax latency / statusų / in-flight metrikos (Prometheus text format)"""
+    if not _metrics_scrape_allowed(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    try:
+        counters, in_flight = upstream_metrics.collect()
+    except Exception as e:
+        logger.error(f"Upstream metrics collect failed: {str(e)}")
+        return HttpResponse('Metrics backend unavailable', status=503, content_type='text/plain')
+    return HttpResponse(upstream_metrics.render(counters, in_flight), content_type=upstream_metrics.CONTENT_TYPE)
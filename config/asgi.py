@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+SSE (api/report-jobs/events/) ir kiti async views reikalauja ASGI serverio:
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
@@ -49,7 +49,7 @@ INSTALLED_APPS = [
 # ═══════════════════════════════════════════════════════
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.middleware.AsyncWhiteNoiseMiddleware',  # ← WhiteNoise + async (ASGI)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # ← Language support!
     'corsheaders.middleware.CorsMiddleware',
@@ -58,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.middleware.RequestProfilingMiddleware',  # ← po AuthenticationMiddleware (staff header)
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -174,7 +175,33 @@ LOGOUT_REDIRECT_URL = '/'
 # API KEYS
 # ═══════════════════════════════════════════════════════
 CHEAPCARFAX_API_KEY = 'tl9kx8yxkuc'
-CHEAPCARFAX_API_URL = 'https://panel.cheapcarfax.net/api'
+# Load testams: CHEAPCARFAX_API_URL=http://127.0.0.1:8765/api (manage.py fake_cheapcarfax)
+CHEAPCARFAX_API_URL = os.environ.get('CHEAPCARFAX_API_URL', 'https://panel.cheapcarfax.net/api')
+
+# CheapCarfax HTTP connection pool (per worker process)
+CHEAPCARFAX_POOL_SIZE = 10           # max keep-alive jungčių vienam worker'iui
+CHEAPCARFAX_POOL_IDLE_TIMEOUT = 60   # s - po tiek laiko be užklausų pool'as perkuriamas
+CHEAPCARFAX_CONNECT_TIMEOUT = 5      # s - TCP/TLS connect timeout
+CHEAPCARFAX_ASYNC_CONCURRENCY = 10   # max lygiagrečių užklausų AsyncCheapCarfaxAPI.gather_reports
+
+# Retry (tik saugiems, neapmokėtiems atvejams) su jittered backoff
+CHEAPCARFAX_REQUEST_DEADLINE = 40     # s - bendras laikas vienai užklausai su visais retry
+CHEAPCARFAX_RETRY_MAX_ATTEMPTS = 3
+CHEAPCARFAX_RETRY_BASE_DELAY = 0.5    # s
+CHEAPCARFAX_RETRY_MAX_DELAY = 4       # s
+
+# Circuit breaker kiekvienam endpoint'ui (būsena bendra per Redis)
+CHEAPCARFAX_BREAKER_WINDOW = 60               # s - statistikos langas
+CHEAPCARFAX_BREAKER_MIN_CALLS = 10            # min užklausų lange prieš vertinant
+CHEAPCARFAX_BREAKER_ERROR_RATE = 0.5          # klaidų dalis, kuri atidaro breaker'į
+CHEAPCARFAX_BREAKER_SLOW_CALL_SECONDS = 20    # s - lėtas atsakymas
+CHEAPCARFAX_BREAKER_SLOW_CALL_RATE = 0.5      # lėtų atsakymų dalis, kuri atidaro breaker'į
+CHEAPCARFAX_BREAKER_OPEN_SECONDS = 30         # s - kiek laiko fail-fast prieš half-open
+
+# CheapCarfax limits snapshot (Celery beat atnaujina fone)
+CHEAPCARFAX_LIMITS_TTL = 60 * 30          # s - kiek laiko snapshot galioja cache
+CHEAPCARFAX_LIMITS_REFRESH_INTERVAL = 300  # s - beat atnaujinimo intervalas
+CHEAPCARFAX_LIMITS_REFRESH_DEBOUNCE = 10   # s - po pirkimų: ne daugiau kaip vienas atnaujinimas per langą
 
 CARFAX_API_KEY = ''
 CARFAX_API_URL = 'https://api.carfax.com'
@@ -183,6 +210,123 @@ AUTOCHECK_API_URL = 'https://api.autocheck.com'
 NMVTIS_API_KEY = ''
 NMVTIS_API_URL = 'https://api.nmvtis.com'
 
+# ═══════════════════════════════════════════════════════
+# CACHE - REDIS
+# ═══════════════════════════════════════════════════════
+# Redis serveryje nustatyti: maxmemory-policy volatile-lru (NE allkeys-lru)
+# maxmemory-policy galioja visam instance'ui, o jame ir Celery broker'is (db 0),
+# lock'ai, single-flight ir breaker raktai. volatile-lru išmeta tik raktus su TTL:
+# VIN reportai / report body (su TTL) išmetami pirmi, broker'io eilės ir būsenos
+# raktai (timeout=None - breaker, skaitikliai, checkpoint'ai) lieka.
+# Visi disposable cache raktai turi turėti TTL (cache.set be timeout - TIMEOUT 300 s).
+# Didelis report cache - atskiras Redis instance per REDIS_CACHE_URL (taip pat volatile-lru).
+REDIS_URL = 'redis://localhost:6379'
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', f'{REDIS_URL}/1')
+# ReportJob event'ų pub/sub (publish ir SSE subscribe - tas pats serveris)
+JOB_EVENTS_REDIS_URL = os.environ.get('JOB_EVENTS_REDIS_URL', REDIS_URL)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+        'KEY_PREFIX': 'autoinfo',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'SOCKET_CONNECT_TIMEOUT': 1,
+            'SOCKET_TIMEOUT': 1,
+            'IGNORE_EXCEPTIONS': True,  # Redis neveikia -> cache miss, ne 500
+        },
+    }
+}
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
+# VIN report cache (bendras visiems vartotojams)
+REPORT_CACHE_TTL = 60 * 60 * 6  # s - kiek laiko tas pats VIN+provider reportas laikomas šviežiu
+REPORT_FETCH_LOCK_TIMEOUT = 45  # s - single-flight lock'as vienam VIN+provider upstream fetch'ui
+
+# Report HTML saugojimas (ReportContent)
+REPORT_HTML_CODEC = 'gzip'             # 'gzip' arba 'zstd' (reikia `zstandard` paketo)
+REPORT_HTML_COMPRESSION_LEVEL = None   # None - codec'o default (gzip 6, zstd 10)
+REPORT_BODY_CACHE_TTL = 60 * 60 * 24   # s - perkoduotas (br / gzip) report body cache
+REPORT_BODY_BROTLI_QUALITY = 9         # brotli kokybė (jei įdiegtas `brotli`)
+REPORT_HISTORY_MAX_PAGE_SIZE = 100     # max reportų viename history API puslapyje
+
+# ═══════════════════════════════════════════════════════
+# CELERY
+# ═══════════════════════════════════════════════════════
+CELERY_BROKER_URL = f'{REDIS_URL}/0'
+CELERY_RESULT_BACKEND = f'{REDIS_URL}/0'
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TIMEZONE = TIME_ZONE
+
+# Asinchroninis reporto pirkimas (search_vin -> ReportJob -> run_report_job)
+REPORT_PURCHASE_ASYNC = False   # True - visi pirkimai per Celery (klientas gali prašyti ir {"async": true})
+REPORT_JOB_MAX_RETRIES = 3      # upstream klaidos pakartojimai worker'yje
+REPORT_JOB_RETRY_DELAY = 10     # s - pirmo pakartojimo delay (toliau x2)
+REPORT_JOB_EVENTS_HEARTBEAT = 15       # s - SSE keepalive komentaro intervalas
+REPORT_JOB_EVENTS_MAX_DURATION = 300   # s - po tiek SSE stream'as uždaromas (EventSource persijungia)
+
+# Batch VIN pirkimas (CSV -> NDJSON)
+BATCH_PURCHASE_MAX_VINS = 500                  # max unikalių VIN viename batch'e
+BATCH_PURCHASE_MAX_UPLOAD_BYTES = 256 * 1024   # CSV failo dydžio riba
+BATCH_PURCHASE_CONCURRENCY = 4                 # lygiagrečių upstream fetch'ų viename batch'e
+BATCH_PURCHASE_ZIP_TTL = 60 * 60 * 24          # s - kiek laiko pasiekiamas batch'o ZIP
+
+# Native async views (search_vin, api_balance, api_recent_reports) - tik su ASGI (uvicorn)
+ASYNC_VIEWS = False
+
+# Balanso ledger snapshot'ai (BalanceSnapshot) - reconciliation / istorija be pilno ledger skenavimo
+BALANCE_SNAPSHOT_INTERVAL = 60 * 60   # s
+
+# Pirkimo rezervai (BalanceHold): place prieš upstream, capture išsaugant, release klaidos atveju
+BALANCE_HOLD_TTL = 120                 # s - po tiek nepanaudotas rezervas grąžinamas automatiškai
+BALANCE_HOLD_SWEEP_INTERVAL = 60       # s - sweep_balance_holds periodas
+
+# Upstream metrikos (/metrics/, Prometheus): skaitikliai procese -> Redis hash'ai
+UPSTREAM_METRICS_ENABLED = True
+UPSTREAM_METRICS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)  # s - latency histogramos ribos
+UPSTREAM_METRICS_FLUSH_INTERVAL = 5   # s - kas kiek worker'is siunčia delta'as į Redis
+UPSTREAM_METRICS_WORKER_TTL = 60      # s - worker'io in-flight nebeskaičiuojamas be heartbeat
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')  # lokalus scrape be autentifikacijos
+METRICS_TOKEN = ''                    # Authorization: Bearer <token> (scrape per proxy)
+
+# Užklausų profiliavimas (RequestProfile): sample rate arba staff header'is
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_RATE = 0.01          # atsitiktinai profiliuojama užklausų dalis (0 - tik header'is)
+PROFILING_HEADER = 'X-Profile'        # staff: '1' - laikai + Server-Timing, 'cprofile' - + cProfile
+PROFILING_CPROFILE = False            # cProfile ir atsitiktinai atrinktoms užklausoms
+PROFILING_CPROFILE_LINES = 40         # pstats eilučių skaičius ataskaitoje
+PROFILING_MAX_ROWS = 5000             # RequestProfile lentelėje laikomų įrašų skaičius
+PROFILING_EXCLUDE_PATHS = ('/static/', '/media/', '/metrics/')
+
+# Upstream API logai (APILog): buferis atmintyje -> bulk_create fono thread'e
+APILOG_ENABLED = True
+APILOG_BATCH_SIZE = 200               # įrašų viename bulk_create
+APILOG_FLUSH_INTERVAL_MS = 1000       # ms - ilgiausiai tiek įrašas laukia buferyje
+APILOG_MAX_QUEUE = 10000              # pilnoje eilėje nauji įrašai išmetami (DB nepasiekiama)
+APILOG_RETENTION_MONTHS = 6           # senesnės mėnesinės particijos pašalinamos
+APILOG_PARTITIONS_AHEAD = 2           # kiek mėnesių į priekį particijos sukuriamos iš anksto
+APILOG_MAINTENANCE_INTERVAL = 6 * 3600  # s - maintain_api_log_partitions periodas
+
+CELERY_BEAT_SCHEDULE = {
+    'refresh-upstream-limits': {
+        'task': 'apps.core.tasks.refresh_upstream_limits',
+        'schedule': CHEAPCARFAX_LIMITS_REFRESH_INTERVAL,
+    },
+    'snapshot-balances': {
+        'task': 'apps.core.tasks.snapshot_balances',
+        'schedule': BALANCE_SNAPSHOT_INTERVAL,
+    },
+    'sweep-balance-holds': {
+        'task': 'apps.core.tasks.sweep_balance_holds',
+        'schedule': BALANCE_HOLD_SWEEP_INTERVAL,
+    },
+    'maintain-api-log-partitions': {
+        'task': 'apps.core.tasks.maintain_api_log_partitions',
+        'schedule': APILOG_MAINTENANCE_INTERVAL,
+    },
+}
+
 # ═══════════════════════════════════════════════════════
 # REPORT PRICES (EUR)
 # ═══════════════════════════════════════════════════════